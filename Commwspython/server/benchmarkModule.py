@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import multiprocessing
+import numpy as np
+import networkGeneratorModule
+
+
+# Simulation settings of the benchmark (same format of ParametrosExecucao.txt)
+DEFAULT_SIMULATION_SETTINGS = {
+	'av_conf_indice_merito': {'k_load_flow': '1,0', 'k_crew_displacement': '1,0', 'k_outage_duration': '1,0', 'k_number_switching': '1,0'},
+	'chav_auxiliar': 'true', 'tipo_simulacao': 'e', 'motor_fluxo_carga': 'numpy',
+	'conf_ag_grafo': {'num_geracoes': '10', 'num_individuos': '10', 'pc': '0,9', 'pm': '0,2'},
+	'conf_ag_chv_otimo': {'num_geracoes': '5', 'num_individuos': '6', 'pc': '0,9', 'pm': '0,1', 'min_porc_fitness': '5,0'}}
+
+
+'''
+Function to return the peak memory (resident set) of the current process, in MB
+'''
+def peak_memory_mb():
+	if sys.platform == "win32":
+		import ctypes
+		import ctypes.wintypes
+
+		class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+			_fields_ = [('cb', ctypes.wintypes.DWORD), ('PageFaultCount', ctypes.wintypes.DWORD),
+			            ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+			            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+			            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+			            ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+		counters = PROCESS_MEMORY_COUNTERS()
+		counters.cb = ctypes.sizeof(counters)
+		ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+		return counters.PeakWorkingSetSize / 2. ** 20
+
+	import resource
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return peak / 2. ** 20 if sys.platform == "darwin" else peak / 2. ** 10  # bytes (macOS) or KB (Linux)
+
+
+'''
+Function to run one benchmark case: it generates the network (if necessary) and runs the simulator end to end.
+It is executed in its own process (see run_benchmark), so peak memory refers to this case only.
+'''
+def run_case(case):
+	import simuladorManobras
+
+	folder = os.path.join(case['output_folder'], "rede_%dx%d_s%d" % (case['num_feeders'], case['switches_per_feeder'], case['seed']))
+	generator = networkGeneratorModule.NetworkGenerator(case['num_feeders'], case['switches_per_feeder'], case['tie_density'],
+	                                                    seed=case['seed'])
+	dict_fault = generator.write(folder)
+
+	dados_simulacao = json.loads(json.dumps(case['simulation_settings']))
+	dados_simulacao['lis_chave_partida'] = dict_fault['lis_chave_partida']
+	dados_diretorios = {'local_dss': os.path.join(folder, "dss_files"), 'local_saida': folder}
+
+	random.seed(case['seed']) ; np.random.seed(case['seed'])
+	start_time = time.perf_counter()
+	simulador = simuladorManobras.SM(dados_diretorios, dict_fault['dados_isolacao_defeito'], dados_simulacao, "")
+	load_time = time.perf_counter() - start_time
+	simulador.run_simulator(0)
+	wall_time = time.perf_counter() - start_time
+
+	lf_statistics = simulador.lf_cache.statistics()
+	return {'alimentadores': case['num_feeders'], 'chaves_por_alimentador': case['switches_per_feeder'], 'semente': case['seed'],
+	        'chaves_operaveis': len(simulador.networks_data.list_graph_operable_switches_dicts),
+	        'tempo_total_s': round(wall_time, 3), 'tempo_carga_s': round(load_time, 3),
+	        'fluxos_de_carga': lf_statistics['misses'], 'acertos_cache': lf_statistics['hits'],
+	        'memoria_pico_mb': round(peak_memory_mb(), 1),
+	        'fitness': None if simulador.dict_results is None else simulador.dict_results.get('Fitness')}
+
+
+'''
+Function to run the benchmark: all combinations of network sizes and seeds, each one in a new process.
+Sizes: list of (num_feeders, switches_per_feeder)
+Output: list of results (one dict per case)
+'''
+def run_benchmark(output_folder, list_sizes, list_seeds, tie_density=0.3, simulation_settings=None):
+	if simulation_settings is None:
+		simulation_settings = DEFAULT_SIMULATION_SETTINGS
+	list_results = []
+	for num_feeders, switches_per_feeder in list_sizes:
+		for seed in list_seeds:
+			case = {'output_folder': output_folder, 'num_feeders': num_feeders, 'switches_per_feeder': switches_per_feeder,
+			        'tie_density': tie_density, 'seed': seed, 'simulation_settings': simulation_settings}
+			with multiprocessing.Pool(1) as pool:
+				result = pool.apply(run_case, (case,))
+			print("Benchmark: " + str(result))
+			list_results.append(result)
+	return list_results
+
+
+'''
+Function to print benchmark results as a table
+'''
+def print_table(list_results):
+	columns = ['alimentadores', 'chaves_por_alimentador', 'semente', 'chaves_operaveis', 'tempo_total_s', 'tempo_carga_s',
+	           'fluxos_de_carga', 'acertos_cache', 'memoria_pico_mb', 'fitness']
+	print("\t".join(columns))
+	for result in list_results:
+		print("\t".join(str(result[column]) for column in columns))
+
+
+'''
+Benchmark runner. Example:
+	python benchmarkModule.py --pasta C:\\Temp\\bench --tamanhos 3x4,6x8,12x16 --sementes 1,2,3 --saida resultados.json
+'''
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="Benchmark do simulador de manobras com redes sintéticas")
+	parser.add_argument('--pasta', required=True, help="pasta onde as redes sintéticas são geradas")
+	parser.add_argument('--tamanhos', default="3x4,6x8,12x16", help="alimentadores x chaves por alimentador, separados por vírgula")
+	parser.add_argument('--sementes', default="1,2,3", help="sementes, separadas por vírgula")
+	parser.add_argument('--densidade-nf', type=float, default=0.3, help="chaves de interligação por chave seccionadora")
+	parser.add_argument('--parametros', default="", help="arquivo JSON com 'dados_simulacao' (opcional)")
+	parser.add_argument('--saida', default="", help="arquivo JSON com os resultados (opcional)")
+	args = parser.parse_args()
+
+	simulation_settings = None
+	if args.parametros:
+		with open(args.parametros, "r") as f:
+			simulation_settings = json.load(f)
+	list_sizes = [tuple(int(n) for n in size.lower().split("x")) for size in args.tamanhos.split(",")]
+	list_seeds = [int(seed) for seed in args.sementes.split(",")]
+
+	list_results = run_benchmark(args.pasta, list_sizes, list_seeds, args.densidade_nf, simulation_settings)
+	print_table(list_results)
+	if args.saida:
+		with open(args.saida, "w") as f:
+			json.dump(list_results, f, indent=1)
@@ -0,0 +1,79 @@
+import time
+
+
+'''
+Class to represent the computational budget of a GA run ("anytime" mode): a deadline and/or a maximum
+number of evaluations (SSGA individuals evaluated). GA loops stop when the budget is exhausted, keeping
+the best individual found so far. A budget can be split into shares for nested runs (e.g., the SSGA runs
+of a GGA generation); evaluations of a share are also charged to its parent.
+Deadlines are absolute (time.time), so shares remain valid in worker processes.
+'''
+class Budget(object):
+	def __init__(self, time_limit=None, max_evaluations=None, deadline=None, parent=None):
+		if deadline is None and time_limit is not None:
+			deadline = time.time() + time_limit
+		self.deadline = deadline
+		self.max_evaluations = max_evaluations
+		self.num_evaluations = 0
+		self.parent = parent
+
+
+	'''
+	Method to create the budget of a simulation. Settings (dados_simulacao['conf_orcamento']), optional:
+		- 'tempo_maximo_s': deadline (seconds after the start of the simulation)
+		- 'max_avaliacoes': maximum number of SSGA individuals evaluated
+	Returns None if there is no limit.
+	'''
+	@staticmethod
+	def from_settings(dict_conf):
+		time_limit = dict_conf.get('tempo_maximo_s')
+		max_evaluations = dict_conf.get('max_avaliacoes')
+		if time_limit is None and max_evaluations is None:
+			return None
+		return Budget(None if time_limit is None else float(str(time_limit).replace(',', '.')),
+		              None if max_evaluations is None else int(max_evaluations))
+
+
+	'''
+	Method to verify if the budget is exhausted
+	'''
+	def expired(self):
+		if self.max_evaluations is not None and self.num_evaluations >= self.max_evaluations:
+			return True
+		return self.deadline is not None and time.time() >= self.deadline
+
+
+	'''
+	Method to charge evaluations to the budget (and to its parents)
+	'''
+	def add_evaluations(self, num_evaluations):
+		budget = self
+		while budget is not None:
+			budget.num_evaluations += num_evaluations
+			budget = budget.parent
+
+
+	'''
+	Method to create a share of the remaining budget, for one of "num_parts" nested runs, executed
+	"parallelism" at a time: each one gets parallelism/num_parts of the remaining time and 1/num_parts
+	of the remaining evaluations.
+	'''
+	def share(self, num_parts, parallelism=1):
+		num_parts = max(1, num_parts)
+		deadline = None
+		if self.deadline is not None:
+			now = time.time()
+			deadline = now + max(0., self.deadline - now) * min(1., float(parallelism) / num_parts)
+		max_evaluations = None
+		if self.max_evaluations is not None:
+			max_evaluations = max(0, self.max_evaluations - self.num_evaluations) // num_parts
+		return Budget(deadline=deadline, max_evaluations=max_evaluations, parent=self)
+
+
+	'''
+	Method to return budget information (report)
+	'''
+	def statistics(self):
+		return {'avaliacoes': self.num_evaluations, 'max_avaliacoes': self.max_evaluations,
+		        'tempo_restante_s': None if self.deadline is None else round(max(0., self.deadline - time.time()), 3),
+		        'esgotado': self.expired()}
@@ -4,6 +4,7 @@ import sys
 import gc
 import numpy as np
 import pythoncom
+import instrumentationModule
 
 '''
 	Class aimed to provide load flow calculation for 
@@ -36,6 +37,7 @@ class DSS(object):
 		self.dssObj.ClearAll()
 		self.dssText.Command = "set datapath=(" + self.dss_folder + ")"
 		self.dssText.Command = "compile " + self.dss_folder + "\\master.dss"
+		instrumentationModule.count('com_commands', 2)
 
 		# list "list_sw_dicts" with dictionaries containing switches information
 		for fd_info in feeders_info:
@@ -221,6 +223,7 @@ class DSS(object):
 			if change['action'] == 'cl': command += "true"
 			else: command += "false"
 			self.dssText.Command = command
+		instrumentationModule.count('com_commands', len(sw_changes))
 
 
 	'''
@@ -233,6 +236,7 @@ class DSS(object):
 		else:
 			command += "false"
 		self.dssText.Command = command
+		instrumentationModule.count('com_commands')
 
 
 	'''
@@ -246,6 +250,7 @@ class DSS(object):
 			else:
 				command += "true" # reverse command
 			self.dssText.Command = command
+		instrumentationModule.count('com_commands', len(sw_changes))
 
 
 	'''
@@ -291,8 +296,10 @@ class DSS(object):
 			sw_code = DSSLines.Name
 			if sw_code in dict_sw_states['closed_switches']:
 				self.dssText.Command = "edit line." + sw_code + " enabled=true"
+				instrumentationModule.count('com_commands')
 			elif sw_code in dict_sw_states['opened_switches']:
 				self.dssText.Command = "edit line." + sw_code + " enabled=false"
+				instrumentationModule.count('com_commands')
 			iLine = DSSLines.Next
 
 
@@ -1,10 +1,17 @@
 import graphModule
-import itertools
+import random
 import sequentialSwitchingGAModule
+import spanningTreeSamplerModule
+import instrumentationModule
+import logModule
+import logging
 import numpy as np
 import time
 
 
+logger = logModule.get_logger("gga")
+
+
 # ===================================================================================#
 '''  
 Class to represent Graph Genetic Algorithm (GGA) individual
@@ -12,9 +19,10 @@ Class to represent Graph Genetic Algorithm (GGA) individual
 
 
 class Indiv:
-	def __init__(self, graph, initial_edges):
-		self.initial_edges = initial_edges
-		self.graph = graph
+	def __init__(self, edge_catalog, edges_mask):
+		self.edge_catalog: graphModule.EdgeCatalog = edge_catalog  # shared catalog of candidate edges
+		self.edges_mask = edges_mask  # closed edges of the spanning tree (bitmask over the edge catalog)
+		self.initial_edges = edge_catalog.initial_edges
 		self.f_evaluation = 0.0
 		self.f_evaluation_components = {}
 		self.list_sw_changes = []
@@ -23,6 +31,13 @@ class Indiv:
 		self.list_effective_sw_inv_changes_codes = []  # Sintax: {'code':sw_code, 'action':'op'}), following cl(reconn), [cl,op], [cl,op], ...
 
 
+	'''
+	Method to build the individual's graph (candidate edges shared with the catalog)
+	'''
+	def get_graph(self):
+		return self.edge_catalog.graph_of(self.edges_mask)
+
+
 # ===================================================================================#
 
 '''
@@ -31,9 +46,19 @@ Class to represent GA applied to graphs
 
 
 class GraphGA:
-	def __init__(self, sm_folder, settings_graph_ga, settings_switching_ga, sw_assessment, networks_data, merit_index_conf):
+	def __init__(self, sm_folder, settings_graph_ga, settings_switching_ga, sw_assessment, networks_data, merit_index_conf, parallel_evaluator=None, checkpoint=None, budget=None):
 		self.sm_folder = sm_folder
 
+		# Optional computational budget (see budgetModule), shared between GGA generations and nested SSGA runs.
+		# When it is exhausted, the run stops with the best individual found so far ("anytime" mode)
+		self.budget = budget
+
+		# Optional function called at generation boundaries, where the run may be paused (see jobSchedulerModule)
+		self.checkpoint = checkpoint
+
+		# Optional pool of worker processes to evaluate individuals (None: serial evaluation)
+		self.parallel_evaluator = parallel_evaluator
+
 		# Configurations concerning merit index calculation
 		self.merit_index_conf = merit_index_conf
 
@@ -48,6 +73,9 @@ class GraphGA:
 		self.num_individuals = settings_graph_ga.get('num_individuals')
 		self.pc = settings_graph_ga.get('pc')
 		self.pm = settings_graph_ga.get('pm')
+		self.num_offspring = settings_graph_ga.get('num_offspring', self.num_individuals)  # offspring per generation
+		self.selection = settings_graph_ga.get('selection', 'tournament')  # parents' selection: 'tournament' or 'rank'
+		self.tournament_size = settings_graph_ga.get('tournament_size', 2)
 		self.settings_switching_ga = settings_switching_ga
 
 		# Get data concerning networks' graph
@@ -58,7 +86,36 @@ class GraphGA:
 			self.lista_arestas.append([dict_edge['v1'], dict_edge['v2'], 1])
 			if dict_edge['initial']:
 				self.initial_edges.append([dict_edge['v1'], dict_edge['v2'], 1])
-		
+
+		# Catalog of candidate edges, shared by all individuals (edges sets are stored as bitmasks)
+		self.edge_catalog = graphModule.EdgeCatalog(self.lista_arestas, self.initial_edges)
+
+		# Sampler of random spanning trees, to generate the initial population ('biased' or 'uniform'). Its generator
+		# is seeded from python's random module state, so runs are reproducible through random.seed
+		self.initial_population = settings_graph_ga.get('initial_population', 'biased')
+		self.tree_sampler = spanningTreeSamplerModule.SpanningTreeSampler(self.edge_catalog)
+
+		# Problems with up to "max_enumerated_topologies" radial topologies are solved exhaustively (see run_gga).
+		# Default: number of topologies the GA may evaluate (initial population + offspring of all generations)
+		self.max_enumerated_topologies = settings_graph_ga.get('max_enumerated_topologies')
+		if self.max_enumerated_topologies is None:
+			self.max_enumerated_topologies = round(1.3 * self.num_individuals) + self.num_geracoes * self.num_offspring
+
+		# Optional local search (memetic GA) applied to the best "local_search_elite" individuals of each generation:
+		# up to "local_search_neighbours" branch exchanges are screened, and up to "local_search_evaluations" of
+		# them are fully evaluated (see local_search)
+		self.local_search_elite = settings_graph_ga.get('local_search_elite', 0)
+		self.local_search_neighbours = settings_graph_ga.get('local_search_neighbours', 20)
+		self.local_search_evaluations = settings_graph_ga.get('local_search_evaluations', 3)
+		self.dict_screening_memo = {}  # edges bitmask => screening value (None: no switching needed)
+
+		# Edges of switches that should not be closed by mutation, if possible (sorted vertex pairs)
+		set_avoided_switches = set(sw_code.lower() for sw_code in settings_graph_ga.get('avoided_switches', []))
+		self.avoided_edges = set()
+		for edge in self.lista_arestas:
+			if networks_data.switch_code_of_edge(edge[0], edge[1]).lower() in set_avoided_switches:
+				self.avoided_edges.add((min(edge[0], edge[1]), max(edge[0], edge[1])))
+
 		# List of GA individuals. Each individuals contains:
 		# Initial graph, final graph, fitness value
 		self.list_ga_indiv = []
@@ -66,20 +123,25 @@ class GraphGA:
 		# Reference to Graph-based GA best individual
 		self.best_indiv: Indiv = None
 
+		# Memo of evaluated topologies: edges bitmask => SSGA best individual (None: no switching needed)
+		self.dict_topology_memo = {}
+		self.num_ssga_runs = 0
+		self.num_memo_hits = 0
+
 
+	'''
+	Method to log fitness functions of the population: summary (INFO) and each individual, sorted (DEBUG)
+	'''
 	def print_fitness_function(self):
-		tmp_list = list()
-		avg_fitness = 0.0
-		for indiv in self.list_ga_indiv:
-			tmp_list.append(indiv)
-			avg_fitness += indiv.f_evaluation
-		avg_fitness /= len(self.list_ga_indiv)
-		tmp_list.sort(key=self.f_eval_ga_obj)
-		best_fitness_indiv: Indiv = tmp_list[0]
-		print("Individuals' fitness functions:")
-		for indiv in tmp_list:
-			print("Fitness: " + str(round(indiv.f_evaluation, 5)) + " (" + str(indiv.f_evaluation_components) + ") " + str(indiv.list_effective_sw_inv_changes_codes))
-		print("Average individual: " + str(round(avg_fitness, 6)) + " Best individual: " + str(round(best_fitness_indiv.f_evaluation)))
+		if not logger.isEnabledFor(logging.INFO) or len(self.list_ga_indiv) == 0:
+			return
+		if logger.isEnabledFor(logging.DEBUG):
+			logger.debug("Individuals' fitness functions:")
+			for indiv in sorted(self.list_ga_indiv, key=self.f_eval_ga_obj):
+				logger.debug("Fitness: %s (%s) %s", round(indiv.f_evaluation, 5), indiv.f_evaluation_components, indiv.list_effective_sw_inv_changes_codes)
+		avg_fitness = sum(indiv.f_evaluation for indiv in self.list_ga_indiv) / len(self.list_ga_indiv)
+		best_fitness = min(indiv.f_evaluation for indiv in self.list_ga_indiv)
+		logger.info("Average individual: %s Best individual: %s", round(avg_fitness, 6), round(best_fitness, 5))
 
 
 	'''
@@ -103,6 +165,13 @@ class GraphGA:
 		return diff <= 0.01
 
 
+	'''
+	Method to verify if the computational budget is exhausted (False if there is no budget)
+	'''
+	def budget_expired(self):
+		return self.budget is not None and self.budget.expired()
+
+
 	'''
 	Method to determine if GA iterations are necessary
 	'''
@@ -120,9 +189,14 @@ class GraphGA:
 	'''
 	def run_gga(self):
 
-		print(" ============== 1st stage - Initial generation ===============")
-		self.generate_individuals()  # Fill self.list_ga_indiv
-		self.run_gga_optimal_switching()  # Evaluate each indiv and update self.best_indiv
+		# Small problems: all radial topologies are evaluated once (no GA generations)
+		if self.max_enumerated_topologies > 0 and self.run_exhaustive():
+			return
+
+		logger.info(" ============== 1st stage - Initial generation ===============", extra={'gga_generation': 0})
+		with instrumentationModule.stage('gga_generation'):
+			self.generate_individuals()  # Fill self.list_ga_indiv
+			self.run_gga_optimal_switching()  # Evaluate each indiv and update self.best_indiv
 
 		# Print fitness function
 		self.print_fitness_function()
@@ -133,11 +207,17 @@ class GraphGA:
 
 		# 1st stage GA generations
 		for i in range(self.num_geracoes):
-			print("=== GGA generation #" + str(i+1) + " ===")
-			self.graph_mutation()
-			self.graph_crossover()
-			self.run_gga_optimal_switching()
-			self.graph_selection()
+			if self.checkpoint is not None: self.checkpoint()
+			if self.budget_expired():
+				logger.info("=== GGA: budget exhausted after %d generation(s) ===", i)
+				break
+			logger.info("=== GGA generation #%d ===", i+1, extra={'gga_generation': i+1})
+			with instrumentationModule.stage('gga_generation'):
+				self.graph_reproduction()
+				self.run_gga_optimal_switching()
+				self.graph_selection()
+				if self.local_search_elite > 0:
+					self.local_search()
 
 			# Print fitness function
 			self.print_fitness_function()
@@ -146,12 +226,51 @@ class GraphGA:
 				break
 
 
+	'''
+	Method to solve the problem exhaustively, if the number of radial topologies (spanning trees of the graph of
+	operable switches, counted by the matrix-tree theorem) does not exceed "max_enumerated_topologies": each
+	topology is evaluated once by SSGA, so the best topology is found with fewer evaluations than the GA would
+	spend. Returns False if there are too many topologies.
+	'''
+	def run_exhaustive(self):
+		num_topologies = self.tree_sampler.count()
+		if num_topologies > self.max_enumerated_topologies:
+			return False
+
+		logger.info(" ============== Exhaustive search - %d radial topologies ===============", int(num_topologies), extra={'gga_generation': 0})
+		with instrumentationModule.stage('gga_generation'):
+			self.list_ga_indiv = [Indiv(self.edge_catalog, edges_mask) for edges_mask in self.tree_sampler.enumerate()]
+			self.run_gga_optimal_switching()  # Evaluate each indiv and update self.best_indiv
+			self.graph_selection()
+		self.print_fitness_function()
+		return True
+
+
 	''' 
 	Run GA 2nd stage, which consists of determining an
 	optimal switching sequence for a given alternative
 	'''
 	def run_gga_optimal_switching(self):
-		print("\n================ 2nd stage - SSGA =======================")
+		logger.debug("\n================ 2nd stage - SSGA =======================")
+		# Identical topologies are evaluated only once per generation
+		self.collapse_duplicate_individuals()
+
+		# Topologies not evaluated yet can be sent to worker processes all at once
+		set_evaluated_in_parallel = set()
+		if self.parallel_evaluator is not None:
+			list_pending = [indiv.edges_mask for indiv in self.list_ga_indiv if indiv.edges_mask not in self.dict_topology_memo]
+			if len(list_pending) > 0:
+				logger.debug("     EVALUATING %d GGA INDIVS IN PARALLEL", len(list_pending))
+				list_results = self.parallel_evaluator.evaluate(list_pending, self.settings_switching_ga, self.merit_index_conf, self.budget)
+				for edges_mask, best_ssga_indiv in zip(list_pending, list_results):
+					self.dict_topology_memo[edges_mask] = best_ssga_indiv
+				self.num_ssga_runs += len(list_pending)
+				instrumentationModule.count('evaluated_topologies', len(list_pending))
+				set_evaluated_in_parallel = set(list_pending)
+
+		# Topologies to be evaluated in this process (each one gets a share of the remaining budget)
+		num_pending = len(set(indiv.edges_mask for indiv in self.list_ga_indiv if indiv.edges_mask not in self.dict_topology_memo))
+
 		# LIST OF GGA INDIVIDUALS:
 		for i in reversed(range(len(self.list_ga_indiv))):
 		
@@ -160,33 +279,162 @@ class GraphGA:
 			# print("\n=== SSGA for G_ini => G_" + str(i+1) + " ====")			
 			indiv = self.list_ga_indiv[i]
 
-			# print("   Final graph: " + str(indiv.graph.edgesKRST) + "\n")
-			ssga = sequentialSwitchingGAModule.SSGA(indiv.graph,
-																 indiv.initial_edges,
-																 self.settings_switching_ga,
-																 self.sw_assessment,
-																 self.networks_data,
-																 self.merit_index_conf)
-
-			# debug
-			print("     EVALUATING GGA INDIV #" + str(i+1) + ":")
+			# Topology already evaluated (in this or previous generations): reuse SSGA best individual
+			if indiv.edges_mask in self.dict_topology_memo:
+				best_ssga_indiv = self.dict_topology_memo[indiv.edges_mask]
+				if indiv.edges_mask not in set_evaluated_in_parallel:
+					self.num_memo_hits += 1
+					instrumentationModule.count('reused_topologies')
+			elif self.best_indiv is not None and self.budget_expired():
+				# budget exhausted: individuals not evaluated yet are discarded (at least one is always evaluated)
+				self.list_ga_indiv.remove(indiv); del indiv; continue
+			else:
+				best_ssga_indiv = self.evaluate_topology(indiv, i, None if self.budget is None else self.budget.share(num_pending))
+				num_pending -= 1
 
-			# run SSGA (Sequential Switching Genetic Algorithm)
-			ssga_is_run = ssga.run_ssga()
-			if not ssga_is_run:
+			if best_ssga_indiv is None:
 				self.list_ga_indiv.remove(indiv); del indiv; continue
 						
-			# store fitness function of Graph GA individual based on SSGA best individual fitness
-			indiv.f_evaluation = ssga.best_indiv['fitness']
-			indiv.list_sw_changes = ssga.best_indiv['sw']
-			indiv.list_sw_changes_codes = ssga.best_indiv['sw_codes']
-			indiv.list_sw_inv_changes_codes = ssga.best_indiv['sw_inv_codes']
-			indiv.list_effective_sw_inv_changes_codes = ssga.best_indiv['effective_dicts_sw_inv_changes']
-			indiv.f_evaluation_components = ssga.best_indiv['fitness_components']
-									
-			# renew Graphic GA best individual
-			if self.best_indiv is None or indiv.f_evaluation < self.best_indiv.f_evaluation:
-				self.best_indiv = indiv
+			self.assign_evaluation(indiv, best_ssga_indiv)
+
+
+	'''
+	Method to store the fitness function of a Graph GA individual, based on SSGA best individual, and to renew
+	Graph GA best individual
+	'''
+	def assign_evaluation(self, indiv, best_ssga_indiv):
+		indiv.f_evaluation = best_ssga_indiv['fitness']
+		indiv.list_sw_changes = best_ssga_indiv['sw']
+		indiv.list_sw_changes_codes = best_ssga_indiv['sw_codes']
+		indiv.list_sw_inv_changes_codes = best_ssga_indiv['sw_inv_codes']
+		indiv.list_effective_sw_inv_changes_codes = best_ssga_indiv['effective_dicts_sw_inv_changes']
+		indiv.f_evaluation_components = best_ssga_indiv['fitness_components']
+
+		# renew Graphic GA best individual
+		if self.best_indiv is None or indiv.f_evaluation < self.best_indiv.f_evaluation:
+			self.best_indiv = indiv
+
+
+	'''
+	Method to run SSGA for a GGA individual (in this process), within an optional budget, and memoize its
+	best individual. Returns None if no switching operation is necessary.
+	'''
+	def evaluate_topology(self, indiv, i, budget=None):
+		# print("   Final graph: " + str(indiv.graph.edgesKRST) + "\n")
+		ssga = sequentialSwitchingGAModule.SSGA(indiv.get_graph(),
+															 indiv.initial_edges,
+															 self.settings_switching_ga,
+															 self.sw_assessment,
+															 self.networks_data,
+															 self.merit_index_conf,
+															 self.edge_catalog,
+															 budget)
+
+		# debug
+		logger.debug("     EVALUATING GGA INDIV #%d:", i+1)
+
+		# run SSGA (Sequential Switching Genetic Algorithm)
+		with instrumentationModule.stage('ssga_run'):
+			ssga_is_run = ssga.run_ssga()
+		self.num_ssga_runs += 1
+		instrumentationModule.count('evaluated_topologies')
+		best_ssga_indiv = ssga.best_indiv if ssga_is_run else None
+		self.dict_topology_memo[indiv.edges_mask] = best_ssga_indiv
+		return best_ssga_indiv
+
+
+	'''
+	Method to keep a single individual for each topology (closed edges set)
+	'''
+	def collapse_duplicate_individuals(self):
+		set_topologies = set()
+		list_unique_indiv = []
+		for indiv in self.list_ga_indiv:
+			if indiv.edges_mask in set_topologies: continue
+			set_topologies.add(indiv.edges_mask)
+			list_unique_indiv.append(indiv)
+		self.list_ga_indiv = list_unique_indiv
+
+
+	'''
+	Method of local search (memetic step), applied to the best individuals after selection. Neighbours of a
+	topology are single branch exchanges: one opened edge is closed and one edge of the cycle it forms is opened.
+	Neighbours are screened cheaply (LF, NS and CD merit indexes of a single switching sequence, see
+	SSGA.screen); only those which look better than the current topology are fully evaluated (SSGA), in
+	ascending order of screening value. The first improvement replaces the individual and the search goes on
+	from it, within "local_search_evaluations" full evaluations per individual.
+	'''
+	def local_search(self):
+		with instrumentationModule.stage('local_search'):
+			for position in range(min(self.local_search_elite, len(self.list_ga_indiv))):
+				indiv = self.list_ga_indiv[position]
+				num_evaluations = 0
+				improved = True
+				while improved and num_evaluations < self.local_search_evaluations and not self.budget_expired():
+					improved = False
+					indiv_screening = self.screen_topology(indiv.edges_mask)
+					list_candidates = []
+					for edges_mask in self.branch_exchange_neighbours(indiv.edges_mask):
+						screening = self.screen_topology(edges_mask)
+						if screening is not None and (indiv_screening is None or screening < indiv_screening):
+							list_candidates.append((screening, edges_mask))
+					list_candidates.sort(key=lambda item: item[0])
+
+					for screening, edges_mask in list_candidates:
+						if num_evaluations >= self.local_search_evaluations or self.budget_expired():
+							break
+						neighbour = Indiv(self.edge_catalog, edges_mask)
+						if edges_mask in self.dict_topology_memo:
+							best_ssga_indiv = self.dict_topology_memo[edges_mask]
+						else:
+							best_ssga_indiv = self.evaluate_topology(neighbour, position, None if self.budget is None else self.budget.share(1))
+							num_evaluations += 1
+						if best_ssga_indiv is None or best_ssga_indiv['fitness'] >= indiv.f_evaluation:
+							continue
+						self.assign_evaluation(neighbour, best_ssga_indiv)
+						logger.debug("     LOCAL SEARCH: GGA INDIV #%d improved: %s => %s", position+1, indiv.f_evaluation, neighbour.f_evaluation)
+						indiv = neighbour
+						improved = True
+						break
+				self.list_ga_indiv[position] = indiv
+
+			# keep population sorted, without duplicated topologies
+			self.collapse_duplicate_individuals()
+			self.list_ga_indiv.sort(key=self.f_eval_ga_obj)
+
+
+	'''
+	Method to return the topologies obtained from a topology (bitmask) by a single branch exchange, up to
+	"local_search_neighbours" of them (picked at random)
+	'''
+	def branch_exchange_neighbours(self, edges_mask):
+		graph = self.edge_catalog.graph_of(edges_mask)
+		parent, parent_edge, depth, root = graph.rooted_forest()
+		list_exchanges = []  # (index of edge to be closed, index of edge to be opened)
+		for i in self.edge_catalog.indexes(~edges_mask & ((1 << len(self.edge_catalog.edges)) - 1)):
+			u, v, w = self.edge_catalog.edges[i]
+			if u == v or root[u] != root[v]: continue
+			while u != v:
+				if depth[u] < depth[v]:
+					u, v = v, u
+				list_exchanges.append((i, self.edge_catalog.index_of(parent_edge[u])))
+				u = parent[u]
+		if len(list_exchanges) > self.local_search_neighbours:
+			list_exchanges = random.sample(list_exchanges, self.local_search_neighbours)
+		return [edges_mask & ~(1 << i_open) | (1 << i_close) for i_close, i_open in list_exchanges]
+
+
+	'''
+	Method to return the screening value of a topology (bitmask, memoized), see SSGA.screen
+	'''
+	def screen_topology(self, edges_mask):
+		if edges_mask not in self.dict_screening_memo:
+			ssga = sequentialSwitchingGAModule.SSGA(self.edge_catalog.graph_of(edges_mask), self.edge_catalog.initial_edges,
+			                                        self.settings_switching_ga, self.sw_assessment, self.networks_data,
+			                                        self.merit_index_conf, self.edge_catalog)
+			self.dict_screening_memo[edges_mask] = ssga.screen()
+			instrumentationModule.count('screened_topologies')
+		return self.dict_screening_memo[edges_mask]
 
 
 	''' 
@@ -250,81 +498,74 @@ class GraphGA:
 	Creation of GA initial individuals 
 	'''
 	def generate_individuals(self):
-		# determine number of vertices
-		list_of_vertices = []
-		for edge in self.lista_arestas:  # list with all operable switches
-			if edge[0] not in list_of_vertices: list_of_vertices.append(edge[0])
-			if edge[1] not in list_of_vertices:	list_of_vertices.append(edge[1])
-		number_of_vertices = len(list_of_vertices)
-
-		for i in range(round(1.3 * self.num_individuals)):
-			graph = graphModule.Graph(number_of_vertices)  # graph obj
-			for edge in self.lista_arestas:                # inserts all possible edges
-				graph.addEdge(edge[0], edge[1], edge[2])
-			# graph.KruskalRST()
-			bias_probability = 99  # integer value within [0,100]
-			graph.KruskalRST_biased(self.initial_edges, bias_probability)   # generate initial radial graph in a biased way: initial edges are more likely to be picked
-			indiv = Indiv(graph, self.initial_edges)
+		# generate initial radial graphs: biased (initial edges are picked first) or uniform spanning trees
+		for edges_mask in self.tree_sampler.sample(round(1.3 * self.num_individuals), self.initial_population):
+			indiv = Indiv(self.edge_catalog, edges_mask)
 			self.list_ga_indiv.append(indiv)               # stores individual in list
 
 			
 	''' 
-	MUTATION operator for graphs
+	MUTATION operator for graphs (tree edge exchange, see Graph.mutation)
 	'''
-	def graph_mutation(self):
-		# print("\nMutation: ")
-		for indiv in self.list_ga_indiv:
-			graph = indiv.graph
-			# print("Graph before mutation: ") ; graph.print_graph()
-			graph.mutation()
-			# print("Graph after mutation: ") ; graph.print_graph()
-		# # debug
-		# linha = ""
-		# for indiv in self.list_ga_indiv:
-		# 	graph = indiv.graph
-		# 	linha = linha + " " + str(indiv.f_evaluation)
-		# print("Avaliacoes dos individuos: " + linha)
+	def graph_mutation(self, edges_mask):
+		graph = self.edge_catalog.graph_of(edges_mask)
+		# print("Graph before mutation: ") ; graph.print_graph()
+		graph.mutation(self.avoided_edges)
+		# print("Graph after mutation: ") ; graph.print_graph()
+		return self.edge_catalog.mask(graph.edgesKRST)
 	
 	
 	''' 
-	UNION operator for graphs 
+	UNION operator for graphs
 	'''
 	def unite_graphs(self, lista_edges1, lista_edges2):
-		final_edges = []
-		for edge in lista_edges1:
-			final_edges.append(edge)
-		for edge in lista_edges2:
-			if edge not in final_edges:
-				final_edges.append(edge)
-		return final_edges
+		union_mask = self.edge_catalog.mask(lista_edges1) | self.edge_catalog.mask(lista_edges2)
+		return self.edge_catalog.edges_of(union_mask)
 	
 	
 	'''
-	CROSSOVER OPERATOR for graphs
-	'''
-	def graph_crossover(self):
-		# Generates pairs of indexes
-		indexes = list(range(len(self.list_ga_indiv)))
-		indexes_combinations = itertools.combinations(indexes, 2)
-		for i_comb in indexes_combinations:
-			indiv1 = self.list_ga_indiv[i_comb[0]] ; graph1 = indiv1.graph
-			indiv2 = self.list_ga_indiv[i_comb[1]] ; graph2 = indiv2.graph
-			#print("Graphs before crossover: ")
-			#print("Graph 1:") ; graph1.print_graph()
-			#print("Graph 2:") ; graph2.print_graph()			
-			
-			# Generates offspring graph
-			nVertices = graph1.V
-			lista_arestas = self.unite_graphs(graph1.edgesKRST, graph2.edgesKRST)
-			new_graph = graphModule.Graph(nVertices)
-			for edge in lista_arestas:
-				new_graph.addEdge(edge[0], edge[1], edge[2])
-			new_graph.KruskalRST() 		
-			#print ("Final graph:") ; new_graph.print_graph()
-			
-			# Appends new graph individual into list of individuals
-			indiv = Indiv(new_graph, self.initial_edges)
-			self.list_ga_indiv.append(indiv)
-		# # debug
-		# for indiv in self.list_ga_indiv:
-		# 	print(indiv.graph.edgesKRST)
\ No newline at end of file
+	CROSSOVER OPERATOR for graphs: offspring graph is a random spanning tree of the union of both parents' edges
+	'''
+	def graph_crossover(self, indiv1, indiv2):
+		union_mask = indiv1.edges_mask | indiv2.edges_mask
+		new_graph = graphModule.Graph(self.edge_catalog.num_vertices)
+		new_graph.graph = self.edge_catalog.edges_of(union_mask)
+		new_graph.KruskalRST()
+		#print ("Final graph:") ; new_graph.print_graph()
+		return self.edge_catalog.mask(new_graph.edgesKRST)
+
+
+	'''
+	Method to generate the offspring of a generation ("num_offspring" individuals). For each child, parents
+	are picked by tournament or rank selection; crossover happens with probability pc (otherwise the child
+	is a copy of the 1st parent) and mutation with probability pm. Parents are kept unchanged, and the
+	selection of survivors (graph_selection) keeps the best individuals of parents + offspring (elitism).
+	'''
+	def graph_reproduction(self):
+		list_parents = list(self.list_ga_indiv)
+		if len(list_parents) == 0:
+			return
+		select_parent = self.parent_selector(list_parents)
+		for i in range(self.num_offspring):
+			indiv1 = select_parent()
+			if random.random() <= self.pc:
+				edges_mask = self.graph_crossover(indiv1, select_parent())
+			else:
+				edges_mask = indiv1.edges_mask
+			if random.random() <= self.pm:
+				edges_mask = self.graph_mutation(edges_mask)
+			self.list_ga_indiv.append(Indiv(self.edge_catalog, edges_mask))
+
+
+	'''
+	Method to return a function that picks a parent from a list of evaluated individuals:
+		- 'tournament': best of "tournament_size" individuals picked at random;
+		- 'rank': individuals sorted by fitness function, picked with probability proportional to (N - rank).
+	'''
+	def parent_selector(self, list_parents):
+		if self.selection == 'rank':
+			list_sorted = sorted(list_parents, key=self.f_eval_ga_obj)
+			list_weights = list(range(len(list_sorted), 0, -1))
+			return lambda: random.choices(list_sorted, weights=list_weights)[0]
+		tournament_size = min(self.tournament_size, len(list_parents))
+		return lambda: min(random.sample(list_parents, tournament_size), key=self.f_eval_ga_obj)
@@ -9,6 +9,405 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 
+'''
+Class to represent a disjoint-set (union-find) structure over graph vertices.
+It counts edges that close cycles, so radiality is known without re-scanning edges.
+'''
+
+
+class DisjointSet:
+	def __init__(self, vertices):
+		self.parent = list(range(vertices))
+		self.rank = [0] * vertices
+		self.num_cycles = 0   # number of inserted edges whose vertices were already connected
+		self.cycle_edges = [] # edges that closed cycles, in insertion order
+
+
+	'''
+	Function to find set of an element i (iterative, with path compression)
+	'''
+	def find(self, i):
+		root = i
+		while self.parent[root] != root:
+			root = self.parent[root]
+		while self.parent[i] != root:
+			self.parent[i], i = root, self.parent[i]
+		return root
+
+
+	'''
+	Function to insert an edge. Returns False if the edge closes a cycle.
+	'''
+	def add_edge(self, edge):
+		x = self.find(edge[0]) ; y = self.find(edge[1])
+		if x == y:
+			self.num_cycles += 1
+			self.cycle_edges.append(edge)
+			return False
+		if self.rank[x] < self.rank[y]:
+			x, y = y, x
+		self.parent[y] = x
+		if self.rank[x] == self.rank[y]:
+			self.rank[x] += 1
+		return True
+
+
+'''
+List of edges which keeps its owner graph's connectivity structure up to date: appended
+edges are inserted incrementally, any other change invalidates the structure, which is
+then rebuilt on demand.
+'''
+
+
+class EdgeList(list):
+	def __init__(self, owner, edges=()):
+		super().__init__(edges)
+		self.owner = owner
+
+	# rebuild from plain items when pickled/copied, without triggering the owner's hooks
+	def __reduce__(self):
+		return (EdgeList, (None, list(self)), {'owner': self.owner})
+
+	def notify_append(self, edge):
+		if self.owner is not None: self.owner.edge_appended(edge)
+
+	def notify_change(self):
+		if self.owner is not None: self.owner.edges_changed()
+
+	def append(self, edge):
+		super().append(edge)
+		self.notify_append(edge)
+
+	def extend(self, edges):
+		for edge in edges:
+			self.append(edge)
+
+	def __iadd__(self, edges):
+		self.extend(edges)
+		return self
+
+	def remove(self, edge):
+		super().remove(edge)
+		self.notify_change()
+
+	def pop(self, *args):
+		edge = super().pop(*args)
+		self.notify_change()
+		return edge
+
+	def insert(self, index, edge):
+		super().insert(index, edge)
+		self.notify_change()
+
+	def clear(self):
+		super().clear()
+		self.notify_change()
+
+	def __setitem__(self, index, value):
+		super().__setitem__(index, value)
+		self.notify_change()
+
+	def __delitem__(self, index):
+		super().__delitem__(index)
+		self.notify_change()
+
+
+'''
+Class to represent the immutable catalog of all candidate edges (operable switches).
+It is built once and shared: a set of edges is then represented as an integer bitmask,
+where bit i corresponds to edge i of the catalog.
+'''
+
+
+class EdgeCatalog:
+	def __init__(self, list_edges, initial_edges=()):
+		self.edges = tuple([edge[0], edge[1], edge[2]] for edge in list_edges)  # format: [u, v, w]
+		self.dict_index = {}  # (u, v) and (v, u) => bit index (first of parallel edges)
+		self.dict_identity = {id(edge): i for i, edge in enumerate(self.edges)}  # catalog edge object => bit index
+		set_vertices = set()
+		for i, edge in enumerate(self.edges):
+			self.dict_index.setdefault((edge[0], edge[1]), i)
+			self.dict_index.setdefault((edge[1], edge[0]), i)
+			set_vertices.add(edge[0]) ; set_vertices.add(edge[1])
+		self.num_vertices = len(set_vertices)
+		self.initial_mask = self.mask(initial_edges)
+		self.initial_edges = self.edges_of(self.initial_mask)
+
+
+	'''
+	Method to return the bit index of an edge: catalog edges (shared by graphs, see graph_of) are found by
+	identity, so parallel edges are told apart; other edges (format: [u, v, w] or {u, v}) by their vertices
+	'''
+	def index_of(self, edge):
+		i = self.dict_identity.get(id(edge))
+		if i is not None and self.edges[i] is edge:
+			return i
+		u, v = list(edge)[:2]
+		return self.dict_index[(u, v)]
+
+
+	'''
+	Method to convert a list of edges (format: [u, v, w] or {u, v}) into a bitmask
+	'''
+	def mask(self, list_edges):
+		mask = 0
+		for edge in list_edges:
+			mask |= 1 << self.index_of(edge)
+		return mask
+
+
+	'''
+	Method to return the catalog indexes of the edges in a bitmask, in ascending order
+	'''
+	def indexes(self, mask):
+		list_indexes = []
+		while mask:
+			low_bit = mask & -mask
+			list_indexes.append(low_bit.bit_length() - 1)
+			mask ^= low_bit
+		return list_indexes
+
+
+	'''
+	Method to convert a bitmask into a list of edges (format: [u, v, w], shared with the catalog)
+	'''
+	def edges_of(self, mask):
+		return [self.edges[i] for i in self.indexes(mask)]
+
+
+	'''
+	Method to return the number of edges in a bitmask
+	'''
+	def count(self, mask):
+		return bin(mask).count("1")
+
+
+	'''
+	Method to build a Graph object from a bitmask. All candidate edges are shared with the catalog.
+	'''
+	def graph_of(self, mask):
+		graph = Graph(self.num_vertices)
+		graph.graph = list(self.edges)
+		graph.edgesKRST.extend(self.edges_of(mask))
+		return graph
+
+
+'''
+Class to represent a graph topology in compressed-sparse-row (CSR) format. It is built once from a list of
+edges [u, v, ...]; the state of edges (closed/opened) is then given by a mask (one boolean per edge), so
+energized (reachable) vertices are determined by a linear-time BFS.
+'''
+
+
+class CSRTopology:
+	def __init__(self, list_edges):
+		array_u = np.array([int(edge[0]) for edge in list_edges], dtype=int)
+		array_v = np.array([int(edge[1]) for edge in list_edges], dtype=int)
+		self.num_edges = len(array_u)
+
+		# vertices' ids ==> dense indexes
+		self.vertices = np.unique(np.concatenate((array_u, array_v)))
+		self.dict_vertex_index = {vertex: i for i, vertex in enumerate(self.vertices.tolist())}
+		self.edge_u = np.searchsorted(self.vertices, array_u)
+		self.edge_v = np.searchsorted(self.vertices, array_v)
+
+		# each edge is stored twice (u ==> v and v ==> u), sorted by origin vertex
+		origins = np.concatenate((self.edge_u, self.edge_v))
+		order = np.argsort(origins, kind='stable')
+		self.indptr = np.concatenate(([0], np.cumsum(np.bincount(origins, minlength=len(self.vertices))))).tolist()
+		self.indices = np.concatenate((self.edge_v, self.edge_u))[order].tolist()
+		self.edge_ids = np.concatenate((np.arange(self.num_edges), np.arange(self.num_edges)))[order].tolist()
+
+
+	'''
+	Method to run a BFS from vertex "source" (id), through edges whose mask is True.
+	Output: list of parent edges (-1: not reached, -2: source), indexed by dense vertex index; list of reached
+	dense vertex indexes, in BFS order
+	'''
+	def bfs(self, edge_mask, source=0):
+		parent_edge = [-1] * len(self.vertices)
+		order = []
+		index_source = self.dict_vertex_index.get(source)
+		if index_source is None:
+			return parent_edge, order
+
+		edge_mask = edge_mask.tolist() if isinstance(edge_mask, np.ndarray) else edge_mask
+		indptr, indices, edge_ids = self.indptr, self.indices, self.edge_ids
+		parent_edge[index_source] = -2 ; order.append(index_source)
+		k = 0
+		while k < len(order):
+			i = order[k] ; k += 1
+			for pos in range(indptr[i], indptr[i + 1]):
+				j = indices[pos]
+				if parent_edge[j] == -1 and edge_mask[edge_ids[pos]]:
+					parent_edge[j] = edge_ids[pos]
+					order.append(j)
+		return parent_edge, order
+
+
+	'''
+	Method to return a boolean array of energized vertices (dense indexes), i.e., those reached from "source"
+	'''
+	def energized(self, edge_mask, source=0):
+		array_energized = np.zeros(len(self.vertices), dtype=bool)
+		array_energized[self.bfs(edge_mask, source)[1]] = True
+		return array_energized
+
+
+	'''
+	Method to return a boolean array of isolated vertices (dense indexes): vertices of closed edges
+	which are not reached from "source"
+	'''
+	def isolated(self, edge_mask, source=0):
+		edge_mask = np.asarray(edge_mask, dtype=bool)
+		array_isolated = np.zeros(len(self.vertices), dtype=bool)
+		array_isolated[self.edge_u[edge_mask]] = True
+		array_isolated[self.edge_v[edge_mask]] = True
+		array_isolated[self.energized(edge_mask, source)] = False
+		return array_isolated
+
+
+	'''
+	Method to return the list of isolated vertices (ids)
+	'''
+	def isolated_vertices(self, edge_mask, source=0):
+		return self.vertices[self.isolated(edge_mask, source)].tolist()
+
+
+'''
+Class to represent the rooted tree of energized vertices (feeder tree) over a CSRTopology, given the current
+state of edges. For each energized vertex it keeps: parent edge, depth and nearest automated ancestor edge
+(circuit breaker or recloser). It also keeps the number of interrupted customers (customers of vertices of
+closed edges which are not energized). It is updated incrementally as edges are closed or opened.
+'''
+
+
+class FeederTree:
+	def __init__(self, topology, edge_automated, edge_mask, source=0, vertex_customers=None):
+		self.topology: CSRTopology = topology
+		self.edge_automated = list(edge_automated)  # edge index ==> True if automated switch
+		self.edge_mask = [bool(closed) for closed in edge_mask]  # edge index ==> True if closed
+
+		num_vertices = len(topology.vertices)
+		self.parent_edge = [-1] * num_vertices        # -1: not energized, -2: source
+		self.depth = [-1] * num_vertices
+		self.nearest_automated = [-1] * num_vertices  # index of nearest automated edge towards source (-1: none)
+
+		# interrupted customers: all vertices of closed edges start de-energized
+		self.vertex_customers = [0] * num_vertices if vertex_customers is None else list(vertex_customers)
+		self.closed_degree = [0] * num_vertices       # number of closed edges of each vertex
+		for edge, closed in enumerate(self.edge_mask):
+			if not closed: continue
+			self.closed_degree[int(topology.edge_u[edge])] += 1 ; self.closed_degree[int(topology.edge_v[edge])] += 1
+		self.interrupted_customers = sum(customers for customers, degree in zip(self.vertex_customers, self.closed_degree) if degree > 0)
+
+		index_source = topology.dict_vertex_index.get(source)
+		if index_source is not None:
+			self.parent_edge[index_source] = -2 ; self.depth[index_source] = 0
+			if self.closed_degree[index_source] > 0: self.interrupted_customers -= self.vertex_customers[index_source]
+			self.attach([index_source])
+
+
+	'''
+	Method to return True if a vertex (dense index) is energized
+	'''
+	def energized(self, i):
+		return self.parent_edge[i] != -1
+
+
+	'''
+	Method to energize vertex "child" (dense index) through edge "edge" from energized vertex "parent"
+	'''
+	def set_parent(self, child, edge, parent):
+		self.interrupted_customers -= self.vertex_customers[child]  # child has a closed edge (counted as interrupted)
+		self.parent_edge[child] = edge
+		self.depth[child] = self.depth[parent] + 1
+		self.nearest_automated[child] = edge if self.edge_automated[edge] else self.nearest_automated[parent]
+
+
+	'''
+	Method to energize, through closed edges, all vertices reachable from the given energized vertices
+	'''
+	def attach(self, list_roots):
+		indptr, indices, edge_ids = self.topology.indptr, self.topology.indices, self.topology.edge_ids
+		order = list(list_roots) ; k = 0
+		while k < len(order):
+			i = order[k] ; k += 1
+			for pos in range(indptr[i], indptr[i + 1]):
+				j = indices[pos]
+				if self.parent_edge[j] == -1 and self.edge_mask[edge_ids[pos]]:
+					self.set_parent(j, edge_ids[pos], i)
+					order.append(j)
+
+
+	'''
+	Method to close an edge (index). If it connects an energized vertex to a de-energized one, the latter's
+	area is attached to the tree.
+	'''
+	def close_edge(self, edge):
+		if self.edge_mask[edge]: return
+		self.edge_mask[edge] = True
+		u, v = int(self.topology.edge_u[edge]), int(self.topology.edge_v[edge])
+		for i in (u, v):
+			self.closed_degree[i] += 1
+			if self.closed_degree[i] == 1 and not self.energized(i): self.interrupted_customers += self.vertex_customers[i]
+		if self.energized(u) and not self.energized(v):
+			self.set_parent(v, edge, u) ; self.attach([v])
+		elif self.energized(v) and not self.energized(u):
+			self.set_parent(u, edge, v) ; self.attach([u])
+
+
+	'''
+	Method to open an edge (index). If it is a tree edge, its downstream subtree is de-energized and
+	then re-attached through any other closed edge (meshed operation).
+	'''
+	def open_edge(self, edge):
+		if not self.edge_mask[edge]: return
+		self.edge_mask[edge] = False
+		u, v = int(self.topology.edge_u[edge]), int(self.topology.edge_v[edge])
+		for i in (u, v):
+			self.closed_degree[i] -= 1
+			if self.closed_degree[i] == 0 and not self.energized(i): self.interrupted_customers -= self.vertex_customers[i]
+		if self.parent_edge[v] == edge: child = v
+		elif self.parent_edge[u] == edge: child = u
+		else: return
+
+		# 1 - Downstream subtree (children are attached through their parent edges)
+		indptr, indices, edge_ids = self.topology.indptr, self.topology.indices, self.topology.edge_ids
+		subtree = [child] ; k = 0
+		while k < len(subtree):
+			i = subtree[k] ; k += 1
+			for pos in range(indptr[i], indptr[i + 1]):
+				if self.parent_edge[indices[pos]] == edge_ids[pos] and indices[pos] != i:
+					subtree.append(indices[pos])
+		for i in subtree:
+			self.parent_edge[i] = -1 ; self.depth[i] = -1 ; self.nearest_automated[i] = -1
+			if self.closed_degree[i] > 0: self.interrupted_customers += self.vertex_customers[i]
+
+		# 2 - Re-attach vertices still connected to energized ones
+		for i in subtree:
+			if self.energized(i): continue
+			for pos in range(indptr[i], indptr[i + 1]):
+				j = indices[pos]
+				if self.edge_mask[edge_ids[pos]] and self.energized(j):
+					self.set_parent(i, edge_ids[pos], j) ; self.attach([i])
+					break
+
+
+	'''
+	Method to return the nearest automated edge upstream a given closed and energized edge (index),
+	towards the source. Returns -1 if there is no automated edge upstream, or None if the edge is not energized.
+	'''
+	def upstream_automated_edge(self, edge):
+		if not self.edge_mask[edge]: return None
+		u, v = int(self.topology.edge_u[edge]), int(self.topology.edge_v[edge])
+		if not self.energized(u) or not self.energized(v): return None
+		if self.parent_edge[v] == edge: upstream = u
+		elif self.parent_edge[u] == edge: upstream = v
+		else: upstream = u if self.depth[u] <= self.depth[v] else v  # meshed operation
+		return self.nearest_automated[upstream]
+
+
 '''
 Class to represent a graph 
 '''
@@ -18,7 +417,34 @@ class Graph:
 	def __init__(self, vertices):
 		self.V = vertices  # Number of vertices
 		self.graph = []  # Default dictionary to store graph
-		self.edgesKRST = []  # Store edges after KruskalRST procedure
+		self.dsu = None  # Connectivity of edgesKRST (None: must be rebuilt)
+		self.edgesKRST = EdgeList(self)  # Store edges after KruskalRST procedure
+
+
+	'''
+	Hook called by EdgeList when an edge is appended to edgesKRST
+	'''
+	def edge_appended(self, edge):
+		if self.dsu is not None:
+			self.dsu.add_edge(edge)
+
+
+	'''
+	Hook called by EdgeList when edgesKRST is changed in any other way
+	'''
+	def edges_changed(self):
+		self.dsu = None
+
+
+	'''
+	Method to return the disjoint-set structure of edgesKRST, rebuilding it if necessary
+	'''
+	def connectivity(self):
+		if self.dsu is None:
+			self.dsu = DisjointSet(self.V)
+			for edge in self.edgesKRST:
+				self.dsu.add_edge(edge)
+		return self.dsu
 
 
 	'''
@@ -33,9 +459,12 @@ class Graph:
 	(uses path compression technique) 
 	'''
 	def find(self, parent, i): 
-		if parent[i] == i: 
-			return i 
-		return self.find(parent, parent[i]) 
+		root = i
+		while parent[root] != root:
+			root = parent[root]
+		while parent[i] != root:
+			parent[i], i = root, parent[i]
+		return root
 
 		
 	''' 
@@ -65,31 +494,14 @@ class Graph:
 		# Assess initially isolated vertices. There is no edge connecting them.
 		isol_vertices_1 = set(range(self.V))
 		for edge in self.graph:
-			if edge[0] in isol_vertices_1:
-				isol_vertices_1.remove(edge[0])
-			if edge[1] in isol_vertices_1:
-				isol_vertices_1.remove(edge[1])
-
-		# Assess initially connected vertices.
-		edges_list = self.graph.copy()
-		repeat = True
-		find_vertice_set = {0}
-		while repeat:
-			repeat = False
-			for i in reversed(range(len(edges_list))):
-				edge = edges_list[i]
-				if edge[0] in find_vertice_set or edge[1] in find_vertice_set:
-					find_vertice_set.add(edge[0])
-					find_vertice_set.add(edge[1])
-					edges_list.remove(edge)
-					repeat = True
-
-		# fill list of isolated vertices based on remaining edges
+			isol_vertices_1.discard(edge[0])
+			isol_vertices_1.discard(edge[1])
+
+		# Vertices of edges which are not connected to vertex 0
 		isol_vertices_2 = set()
-		if len(edges_list) > 0:
-			for edge in edges_list:
-				isol_vertices_2.add(edge[0])
-				isol_vertices_2.add(edge[1])
+		if len(self.graph) > 0:
+			topology = CSRTopology(self.graph)
+			isol_vertices_2 = set(topology.isolated_vertices([True] * topology.num_edges))
 
 		# determine the list of all isolated vertices
 		list_isolated_vertices = list(isol_vertices_1.union(isol_vertices_2))
@@ -178,54 +590,121 @@ class Graph:
 		
 		
 			
-	'''		
-	Mutation operator. It deletes a random edge and inserts a new one.
-	To guarantee radiality, it verifies if newly added edge creates mesh.
 	'''
-	def mutation(self):
+	Mutation operator (tree edge exchange). It closes a random edge out of the tree, then opens a random edge
+	of the fundamental cycle formed (path between the new edge's vertices, found by climbing parent pointers
+	up to their lowest common ancestor). The result is always radial, so a mutation is never wasted.
+	Cost: O(V+E) per call, since the tree is rooted again (rooted_forest) and all edges are scanned for
+	candidates; only the cycle search itself is O(depth).
+	avoided_edges: optional set of edges (sorted vertex pairs) that should not be closed, unless no other
+	edge can be closed
+	'''
+	def mutation(self, avoided_edges=None):
 		if len(self.edgesKRST) == 0:
 			return
-			
-		# determines edge to be removed
-		i_remove = random.randint(0, len(self.edgesKRST)-1)
-		removed_edge = self.edgesKRST[i_remove]
+		parent, parent_edge, depth, root = self.rooted_forest()
+
+		# candidate edges: out of the tree, connecting vertices of the same tree
+		set_tree_edges = set((min(edge[0], edge[1]), max(edge[0], edge[1])) for edge in self.edgesKRST)
+		candidate_edges = []
+		for edge in self.graph:
+			key = (min(edge[0], edge[1]), max(edge[0], edge[1]))
+			if key in set_tree_edges or edge[0] == edge[1] or root[edge[0]] != root[edge[1]]:
+				continue
+			candidate_edges.append(edge)
+		if avoided_edges:
+			preferred_edges = [edge for edge in candidate_edges if (min(edge[0], edge[1]), max(edge[0], edge[1])) not in avoided_edges]
+			if len(preferred_edges) > 0:
+				candidate_edges = preferred_edges
+		if len(candidate_edges) == 0:
+			return
+
+		# edge to be closed and fundamental cycle formed
+		new_edge = candidate_edges[random.randint(0, len(candidate_edges)-1)]
+		list_cycle_edges = []
+		u = new_edge[0] ; v = new_edge[1]
+		while u != v:
+			if depth[u] < depth[v]:
+				u, v = v, u
+			list_cycle_edges.append(parent_edge[u])
+			u = parent[u]
+
+		# edge to be opened
+		removed_edge = list_cycle_edges[random.randint(0, len(list_cycle_edges)-1)]
 		self.edgesKRST.remove(removed_edge)
-		
-		# adds edge at random, provided that it does not create mesh
-		new_edge = self.pick_radial_edge(removed_edge)
-		if new_edge != None:	
-			self.edgesKRST.append(new_edge)
-		else:
-			self.edgesKRST.append(removed_edge)
+		self.edgesKRST.append(new_edge)
+
+
+	'''
+	Method to root each tree of edgesKRST (BFS). Returns, for each vertex: parent vertex, edge to the parent,
+	depth and root of its tree (roots are their own parents, with no edge).
+	'''
+	def rooted_forest(self):
+		adjacency = [[] for i in range(self.V)]
+		for edge in self.edgesKRST:
+			adjacency[edge[0]].append((edge[1], edge))
+			adjacency[edge[1]].append((edge[0], edge))
+		parent = list(range(self.V)) ; parent_edge = [None] * self.V
+		depth = [0] * self.V ; root = [None] * self.V
+		for source in range(self.V):
+			if root[source] is not None: continue
+			root[source] = source ; queue = [source]
+			for vertex in queue:
+				for neighbour, edge in adjacency[vertex]:
+					if root[neighbour] is None:
+						root[neighbour] = source ; parent[neighbour] = vertex ; parent_edge[neighbour] = edge
+						depth[neighbour] = depth[vertex] + 1 ; queue.append(neighbour)
+		return parent, parent_edge, depth, root
+
 
 	'''
 	Method to determine if current graph topology is radial
 	'''
 	def is_radial(self):
-		parent = []; rank = []
-		for node in range(self.V): parent.append(node); rank.append(0)
-		for edge in self.edgesKRST:
-			x = self.find(parent, edge[0]); y = self.find(parent, edge[1])
-			self.union(parent, rank, x, y)
-			if x == y: return False
-		return True
+		return self.connectivity().num_cycles == 0
 
 
 	'''
 	Method to determine if closing edge causes mesh
 	'''
 	def creates_mesh(self, candidate_edge):
-		parent = [] ; rank = []
-		for node in range(self.V):
-			parent.append(node) ; rank.append(0)
-		for edge in self.edgesKRST:
-			x = self.find(parent, edge[0]) ; y = self.find(parent, edge[1])
-			self.union(parent, rank, x, y)
-
-		# tries to insert candidate edge
-		x = self.find(parent, candidate_edge[0]); y = self.find(parent, candidate_edge[1])
+		dsu = self.connectivity()
 		# returns if candidate edge creates mesh
-		return x == y
+		return dsu.find(candidate_edge[0]) == dsu.find(candidate_edge[1])
+
+
+	'''
+	Method to return edges (as sorted vertex pairs) belonging to the single mesh of edgesKRST.
+	Returns None if there is no mesh or more than one.
+	'''
+	def mesh_edges(self):
+		dsu = self.connectivity()
+		if dsu.num_cycles != 1: return None
+
+		# path between closing edge's vertices, through the remaining (radial) edges
+		closing_edge = dsu.cycle_edges[0]
+		adjacency = {}
+		skipped = False
+		for edge in self.edgesKRST:
+			if not skipped and edge is closing_edge:
+				skipped = True ; continue
+			adjacency.setdefault(edge[0], []).append(edge[1])
+			adjacency.setdefault(edge[1], []).append(edge[0])
+		origin = closing_edge[0] ; target = closing_edge[1]
+		previous = {origin: None} ; queue = [origin]
+		for vertex in queue:
+			if vertex == target: break
+			for neighbour in adjacency.get(vertex, []):
+				if neighbour not in previous:
+					previous[neighbour] = vertex ; queue.append(neighbour)
+
+		set_edges = {(min(origin, target), max(origin, target))}
+		vertex = target
+		while previous.get(vertex) is not None:
+			u = previous[vertex]
+			set_edges.add((min(u, vertex), max(u, vertex)))
+			vertex = u
+		return set_edges
 
 
 	'''
@@ -237,19 +716,14 @@ class Graph:
 		if list_switches_to_open is None: return None
 		if len(list_switches_to_open) == 0: return None
 
-		str_conn_edges = ""
-		for edge in self.edgesKRST:
-			str_conn_edges += str(edge) + " "
-		str_sw_to_open = ""
-		for edge in list_switches_to_open:
-			str_sw_to_open += str(edge) + " "
-		# print("connected edges: " + str_conn_edges + " switches to open: " + str_sw_to_open)
+		# Edges whose removal restores radiality: any edge, if graph is already radial;
+		# edges of the mesh, if there is a single one; none, otherwise.
+		radial = self.is_radial()
+		set_mesh_edges = None if radial else self.mesh_edges()
 
 		# Among the edges that need to be opened, picks an edge
 		# to be opened in order to restore radiality
 		for edge_to_be_opened in list_switches_to_open:
-			# edge_list = list(edge) ; edge_to_be_opened = [edge_list[0], edge_list[1], 1]
-
 			# tries to remove edge_to_be_opened from graph
 			edge_to_be_opened_1 = [edge_to_be_opened[0], edge_to_be_opened[1], 1]
 			edge_to_be_opened_2 = [edge_to_be_opened[1], edge_to_be_opened[0], 1]
@@ -257,52 +731,17 @@ class Graph:
 				edge_to_be_opened = edge_to_be_opened_1
 			elif edge_to_be_opened_2 in self.edgesKRST:
 				edge_to_be_opened = edge_to_be_opened_2
-
-			# print("edge_to_be_opened: " + str(edge_to_be_opened))
-			self.edgesKRST.remove(edge_to_be_opened)
+			else:
+				self.edgesKRST.remove(edge_to_be_opened)  # edge is not in graph (raises ValueError)
 
 			# if resulting graph is radial, returns.
-			if self.is_radial(): return edge_to_be_opened
-			else: self.edgesKRST.append(edge_to_be_opened)
+			u = edge_to_be_opened[0] ; v = edge_to_be_opened[1]
+			if radial or (set_mesh_edges is not None and (min(u, v), max(u, v)) in set_mesh_edges):
+				self.edgesKRST.remove(edge_to_be_opened)
+				return edge_to_be_opened
 		return None
 
 
-	'''
-	Method to pick edge that does not cause mesh
-	'''
-	def pick_radial_edge(self, removed_edge):
-		parent = [] ; rank = []
-		for node in range(self.V): 
-			parent.append(node) 
-			rank.append(0) 
-		for edge in self.edgesKRST:
-			u = edge[0]; v = edge[1]
-			x = self.find(parent, u); y = self.find(parent, v)
-			self.union(parent, rank, x, y)	
-			
-		# gets all candidate edges
-		candidate_edges = []
-		for edge in self.graph:
-			if edge in self.edgesKRST or edge == removed_edge:
-				continue
-			candidate_edges.append(edge)
-			
-		#print("total candidates: %d" % (len(candidate_edges)))
-		#for edge in candidate_edges:
-		#	print("candidate: %d -- %d" % (edge[0], edge[1]))
-		
-		# Picks an edge at random. If it does not create cycle, returns the edge.
-		random_index = -1
-		for i in range(len(candidate_edges)):
-			random_index = random.randint(0, len(candidate_edges)-1)
-			edge = candidate_edges[random_index]
-			u = edge[0] ; v = edge[1]
-			x = self.find(parent, u); y = self.find(parent, v)
-			if x != y:
-				return edge
-		return None
-
-		
 	''' 
 	Function to print graph 
 	'''
@@ -321,16 +760,16 @@ class Graph:
 		i = 0  # An index variable, used for sorted edges
 		e = 0  # An index variable, used for result[]
 
-		# randomly rearrange the graph
-		random.shuffle(self.graph)
-
-		# arrange graph in such a way that initially closed edges appear first
+		# randomly rearrange the graph (a copy: self.graph is kept), in such a way that initially closed edges
+		# appear first (see spanningTreeSamplerModule for a keyed-sort version)
+		set_initial_edges = set()
 		for ini_edge in initial_edges:
-			if np.random.randint(0, 100) > bias_prob:
-				continue
-			index = self.graph.index(ini_edge)
-			item = self.graph.pop(index)
-			self.graph.insert(0, item)
+			if np.random.randint(0, 100) <= bias_prob:
+				set_initial_edges.add((ini_edge[0], ini_edge[1]))
+		list_edges = list(self.graph)
+		random.shuffle(list_edges)
+		list_edges = [edge for edge in list_edges if (edge[0], edge[1]) in set_initial_edges] + \
+		             [edge for edge in list_edges if (edge[0], edge[1]) not in set_initial_edges]
 		parent = []; rank = []
 
 		# Create V subsets with single elements
@@ -339,11 +778,11 @@ class Graph:
 			rank.append(0)
 
 		# Number of edges to be taken is equal to V-1
-		while e < self.V - 1:
+		while e < self.V - 1 and i < len(list_edges):
 
 			# Step 2: Pick the smallest edge and increment
 			# the index for next iteration
-			u, v, w = self.graph[i]
+			u, v, w = list_edges[i]
 			i = i + 1
 			x = self.find(parent, u)
 			y = self.find(parent, v)
@@ -355,7 +794,7 @@ class Graph:
 				e = e + 1
 				result.append([u, v, w])
 				self.union(parent, rank, x, y)
-				self.edgesKRST.append([u, v, w])  # saves spanning tree generated randomly
+				self.edgesKRST.append(list_edges[i - 1])  # saves spanning tree generated randomly (same edge object)
 
 	# Else discard the edge
 
@@ -403,5 +842,5 @@ class Graph:
 				e = e + 1	
 				result.append([u,v,w]) 
 				self.union(parent, rank, x, y)			 
-				self.edgesKRST.append([u,v,w]) # saves spanning tree generated randomly
+				self.edgesKRST.append(self.graph[i - 1]) # saves spanning tree generated randomly (same edge object)
 			# Else discard the edge 
\ No newline at end of file
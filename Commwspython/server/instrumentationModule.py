@@ -0,0 +1,131 @@
+import json
+import time
+import threading
+
+
+'''
+Module to record per-stage timings and counters of a simulation (hot path instrumentation).
+A Recorder is activated for the current thread (see start); the hot path records stages with
+	with instrumentationModule.stage('name'):
+		...
+and counters with instrumentationModule.count('name'). When no recorder is active, stage() returns a
+shared no-op context manager and count() returns at once, so disabled instrumentation costs a lookup.
+Stages may be nested (e.g., LF_MI inside ssga_run): the time of a stage includes its inner stages.
+Work done in worker processes (parallel evaluation) is not recorded.
+'''
+
+# Active recorder of each thread (simulations of the resident server run in their own threads)
+local_state = threading.local()
+
+
+'''
+Class of the no-op context manager used when instrumentation is disabled
+'''
+class NullStage(object):
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		return False
+
+
+NULL_STAGE = NullStage()
+
+
+'''
+Class of the context manager that measures the time of a stage
+'''
+class Stage(object):
+	__slots__ = ('recorder', 'name', 'start_time')
+
+	def __init__(self, recorder, name):
+		self.recorder = recorder
+		self.name = name
+		self.start_time = 0.
+
+	def __enter__(self):
+		self.start_time = time.perf_counter()
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.recorder.add_time(self.name, time.perf_counter() - self.start_time)
+		return False
+
+
+'''
+Class to store timings (number of calls, total and maximum time) and counters of a simulation
+'''
+class Recorder(object):
+	def __init__(self):
+		self.start_time = time.perf_counter()
+		self.dict_stages = {}    # stage ==> [calls, total time (s), maximum time (s)]
+		self.dict_counters = {}  # counter ==> value
+
+
+	def add_time(self, name, elapsed):
+		item = self.dict_stages.get(name)
+		if item is None:
+			self.dict_stages[name] = [1, elapsed, elapsed]
+		else:
+			item[0] += 1 ; item[1] += elapsed
+			if elapsed > item[2]: item[2] = elapsed
+
+
+	def count(self, name, n=1):
+		self.dict_counters[name] = self.dict_counters.get(name, 0) + n
+
+
+	'''
+	Method to return the report (dict, JSON serializable)
+	'''
+	def report(self):
+		dict_stages = {}
+		for name, (calls, total, maximum) in self.dict_stages.items():
+			dict_stages[name] = {'calls': calls, 'total_s': round(total, 6), 'mean_ms': round(1000. * total / calls, 4),
+			                     'max_ms': round(1000. * maximum, 4)}
+		return {'elapsed_s': round(time.perf_counter() - self.start_time, 6), 'stages': dict_stages,
+		        'counters': dict(self.dict_counters)}
+
+
+	'''
+	Method to save the report in a JSON file
+	'''
+	def save(self, path_file):
+		with open(path_file, "w") as f:
+			json.dump(self.report(), f, indent=1)
+
+
+'''
+Function to activate a new recorder for the current thread. Returns the recorder.
+'''
+def start():
+	recorder = Recorder()
+	local_state.recorder = recorder
+	return recorder
+
+
+'''
+Function to deactivate the recorder of the current thread. Returns None.
+'''
+def stop():
+	local_state.recorder = None
+	return None
+
+
+'''
+Function to measure a stage: "with stage('name'):"
+'''
+def stage(name):
+	recorder = getattr(local_state, 'recorder', None)
+	if recorder is None:
+		return NULL_STAGE
+	return Stage(recorder, name)
+
+
+'''
+Function to increment a counter
+'''
+def count(name, n=1):
+	recorder = getattr(local_state, 'recorder', None)
+	if recorder is not None:
+		recorder.count(name, n)
@@ -0,0 +1,290 @@
+import heapq
+import itertools
+import threading
+import time
+import logModule
+try:
+	import pythoncom  # jobs' threads may create COM objects (OpenDSS engine)
+except ImportError:
+	pythoncom = None
+
+
+# Priority classes (lower value ==> higher priority)
+PRIORITY_SELF_HEALING = 0
+PRIORITY_EMERGENCY = 1
+PRIORITY_SCHEDULED = 2
+
+logger = logModule.get_logger("scheduler")
+
+
+'''
+Exception raised at a job's checkpoint when the job is cancelled (see JobScheduler.shutdown)
+'''
+class JobCancelled(Exception):
+	pass
+
+
+'''
+Class to represent a simulation job. Its function receives the job itself, so it can call
+job.checkpoint() at GA generation boundaries (points where the job may be paused).
+'''
+class Job(object):
+	def __init__(self, job_id, priority, cost, func, preemptible, exclusive=None):
+		self.job_id = job_id
+		self.priority = priority
+		self.cost = cost                # estimated cost (admission control)
+		self.func = func
+		self.preemptible = preemptible  # True if it can be paused in favour of higher priority jobs
+		self.exclusive = exclusive      # resource used by one job at a time (None: no restriction)
+		self.scheduler = None
+
+		self.status = 'queued'          # queued, running, paused, done, failed, rejected, cancelled
+		self.result = None
+		self.exception = None
+		self.finished = threading.Event()
+
+		# pause and cancellation control
+		self.pause_requested = False
+		self.cancel_requested = False
+		self.resumed = threading.Event()
+
+		# times (seconds)
+		self.time_submitted = time.time()
+		self.time_started = None
+		self.time_finished = None
+		self.queue_wait = 0.    # time waiting for a slot (before start and while paused)
+		self.run_time = 0.      # time effectively running
+		self.num_pauses = 0
+		self.time_last_event = self.time_submitted
+
+
+	'''
+	Method to be called by the job's function at safe points (e.g., GA generation boundaries).
+	If a higher priority job requested its slot, the job is paused here until it is resumed.
+	If the job was cancelled, JobCancelled is raised.
+	'''
+	def checkpoint(self):
+		if self.pause_requested:
+			self.scheduler.pause(self)
+		if self.cancel_requested:
+			raise JobCancelled()
+
+
+	'''
+	Method to return job times and status (report)
+	'''
+	def statistics(self):
+		return {'id': self.job_id, 'prioridade': self.priority, 'custo': self.cost, 'status': self.status,
+		        'espera_fila_s': round(self.queue_wait, 3), 'execucao_s': round(self.run_time, 3), 'pausas': self.num_pauses}
+
+
+'''
+Class to schedule simulation jobs, considering:
+	- bounded concurrency: at most "max_concurrency" jobs running at the same time;
+	- priority classes: waiting (or paused) jobs run in order of priority, then submission;
+	- admission control: jobs whose estimated cost exceeds "max_job_cost", or that would make the total
+	  cost of waiting jobs exceed "max_queued_cost", are rejected (self-healing jobs are always admitted);
+	- preemption: a job that finds all slots busy pauses the lowest priority preemptible running job, at its
+	  next checkpoint (GA generation boundary);
+	- exclusive resources: jobs with the same "exclusive" resource (e.g., the OpenDSS engine, which is unique
+	  per process) never run at the same time. Such jobs are not preemptible, since a paused job would still
+	  hold its resource.
+Each job runs in its own thread, with COM initialized (if available).
+'''
+class JobScheduler(object):
+	def __init__(self, max_concurrency=1, max_job_cost=None, max_queued_cost=None):
+		self.max_concurrency = max_concurrency
+		self.max_job_cost = max_job_cost
+		self.max_queued_cost = max_queued_cost
+
+		self.lock = threading.Lock()
+		self.heap_waiting = []   # (priority, sequence, job): queued and paused jobs
+		self.list_running = []
+		self.sequence = itertools.count()
+		self.list_finished = []  # finished jobs (report), most recent last
+		self.max_finished = 100
+		self.closed = False      # True after shutdown: no job is accepted
+
+
+	'''
+	Method to submit a job. Returns the Job object (status 'rejected' if not admitted, 'cancelled' if the
+	scheduler was shut down).
+	'''
+	def submit(self, job_id, priority, cost, func, preemptible=None, exclusive=None):
+		if preemptible is None:
+			preemptible = priority == PRIORITY_SCHEDULED
+		job = Job(job_id, priority, cost, func, preemptible and exclusive is None, exclusive)
+		job.scheduler = self
+
+		with self.lock:
+			if self.closed:
+				job.status = 'cancelled'
+				job.finished.set()
+				return job
+			if not self.admit(job):
+				job.status = 'rejected'
+				job.finished.set()
+				return job
+			heapq.heappush(self.heap_waiting, (job.priority, next(self.sequence), job))
+			self.preempt()
+			self.dispatch()
+		return job
+
+
+	'''
+	Method of admission control (called with lock acquired)
+	'''
+	def admit(self, job):
+		if job.priority == PRIORITY_SELF_HEALING:
+			return True
+		if self.max_job_cost is not None and job.cost > self.max_job_cost:
+			return False
+		if self.max_queued_cost is not None:
+			queued_cost = sum(item[2].cost for item in self.heap_waiting)
+			if queued_cost + job.cost > self.max_queued_cost:
+				return False
+		return True
+
+
+	'''
+	Method to request a pause of the lowest priority preemptible running job, if the best waiting job has
+	higher priority and there is no free slot (called with lock acquired)
+	'''
+	def preempt(self):
+		if len(self.heap_waiting) == 0 or len(self.list_running) < self.max_concurrency:
+			return
+		list_ready = [item for item in sorted(self.heap_waiting) if not self.blocked(item[2])]
+		if len(list_ready) == 0:
+			return
+		best_waiting = list_ready[0][2]
+		candidates = [job for job in self.list_running if job.preemptible and not job.pause_requested and job.priority > best_waiting.priority]
+		if len(candidates) > 0:
+			max(candidates, key=lambda job: (job.priority, job.time_submitted)).pause_requested = True
+
+
+	'''
+	Method to start (or resume) waiting jobs while there are free slots (called with lock acquired)
+	'''
+	def dispatch(self):
+		list_blocked = []
+		while len(self.heap_waiting) > 0 and len(self.list_running) < self.max_concurrency:
+			item = heapq.heappop(self.heap_waiting)
+			job = item[2]
+			if self.blocked(job):
+				list_blocked.append(item)
+				continue
+			now = time.time()
+			job.queue_wait += now - job.time_last_event
+			job.time_last_event = now
+			self.list_running.append(job)
+			if job.status == 'paused':
+				job.status = 'running'
+				job.resumed.set()
+			else:
+				job.status = 'running'
+				job.time_started = now
+				threading.Thread(target=self.run_job, args=(job,), daemon=True).start()
+		for item in list_blocked:
+			heapq.heappush(self.heap_waiting, item)
+
+
+	'''
+	Method to check whether a waiting job must wait for its exclusive resource (called with lock acquired)
+	'''
+	def blocked(self, job):
+		return job.exclusive is not None and any(other.exclusive == job.exclusive for other in self.list_running)
+
+
+	'''
+	Method to run a job (in its own thread) and release its slot at the end
+	'''
+	def run_job(self, job):
+		if pythoncom is not None:
+			pythoncom.CoInitialize()
+		try:
+			job.result = job.func(job)
+			job.status = 'done'
+		except JobCancelled:
+			job.status = 'cancelled'
+		except Exception as e:
+			job.exception = e
+			job.status = 'failed'
+		finally:
+			if pythoncom is not None:
+				pythoncom.CoUninitialize()
+			logModule.clear_context()  # job's log settings (see simuladorManobras.SM) do not apply to the report
+
+		with self.lock:
+			now = time.time()
+			job.run_time += now - job.time_last_event
+			job.time_last_event = job.time_finished = now
+			self.list_running.remove(job)
+			self.list_finished.append(job)
+			del self.list_finished[:-self.max_finished]
+			self.dispatch()
+		logger.info("Job %s: %s", job.job_id, job.statistics())
+		job.finished.set()
+
+
+	'''
+	Method to pause a running job (called from job's thread, see Job.checkpoint). Its slot is given to
+	higher priority jobs, and the job waits until it is dispatched again.
+	'''
+	def pause(self, job):
+		with self.lock:
+			now = time.time()
+			job.run_time += now - job.time_last_event
+			job.time_last_event = now
+			job.pause_requested = False
+			job.status = 'paused'
+			job.num_pauses += 1
+			job.resumed.clear()
+			self.list_running.remove(job)
+			heapq.heappush(self.heap_waiting, (job.priority, next(self.sequence), job))
+			self.dispatch()
+		job.resumed.wait()
+
+
+	'''
+	Method to shut the scheduler down: new jobs are no longer accepted, jobs that have not started are
+	cancelled, preemptible jobs (running or paused) are cancelled at their next checkpoint and the others
+	run to the end. Waits (up to "timeout" seconds, None: no limit) until all jobs finish.
+	Returns True if all jobs finished.
+	'''
+	def shutdown(self, timeout=None):
+		with self.lock:
+			self.closed = True
+			list_jobs = list(self.list_running)
+			list_waiting = []
+			for item in self.heap_waiting:
+				job = item[2]
+				if job.status == 'queued':
+					job.status = 'cancelled'
+					job.time_finished = time.time()
+					job.finished.set()
+				else:  # paused: cancelled as soon as it is resumed
+					job.cancel_requested = True
+					list_waiting.append(item)
+					list_jobs.append(job)
+			self.heap_waiting = list_waiting
+			heapq.heapify(self.heap_waiting)
+			for job in self.list_running:
+				if job.preemptible:
+					job.cancel_requested = True
+			self.dispatch()
+
+		deadline = None if timeout is None else time.time() + timeout
+		for job in list_jobs:
+			if not job.finished.wait(None if deadline is None else max(0., deadline - time.time())):
+				return False
+		return True
+
+
+	'''
+	Method to return the report of waiting, running and recently finished jobs
+	'''
+	def statistics(self):
+		with self.lock:
+			return {'em_espera': [item[2].statistics() for item in sorted(self.heap_waiting)],
+			        'em_execucao': [job.statistics() for job in self.list_running],
+			        'finalizados': [job.statistics() for job in reversed(self.list_finished)]}
@@ -0,0 +1,162 @@
+import os
+import glob
+import json
+import hashlib
+import sqlite3
+from collections import OrderedDict
+import instrumentationModule
+
+
+# Hashes of network folders already computed: folder ==> (files signature, hash), see network_file_hash
+dict_network_hashes = {}
+
+
+'''
+Function to compute a hash representing the network files (all DSS scripts
+of a given folder). Cached results are only valid for the same hash.
+Files are only read again if their names, sizes or modification times changed
+since the last hash (e.g., resident server).
+'''
+def network_file_hash(dss_folder):
+	list_paths = sorted(glob.glob(os.path.join(dss_folder, "*.dss")))
+	signature = []
+	for path_file in list_paths:
+		stat = os.stat(path_file)
+		signature.append((os.path.basename(path_file).lower(), stat.st_size, stat.st_mtime_ns))
+	folder = os.path.abspath(dss_folder)
+	item = dict_network_hashes.get(folder)
+	if item is not None and item[0] == signature:
+		return item[1]
+
+	sha = hashlib.sha1()
+	for path_file in list_paths:
+		sha.update(os.path.basename(path_file).lower().encode())
+		with open(path_file, "rb") as f:
+			sha.update(f.read())
+	dict_network_hashes[folder] = (signature, sha.hexdigest())
+	return sha.hexdigest()
+
+
+'''
+Function to compute the hash that identifies cached results: network files and load flow engine
+(engines do not provide identical currents, so their results are not shared)
+'''
+def cache_network_hash(dss_folder, power_flow_engine):
+	return network_file_hash(dss_folder) + "|" + power_flow_engine
+
+
+'''
+Class to store load flow results (feeder currents), keyed by the set of closed
+switches. It keeps a bounded LRU in memory and, optionally, a persistent tier
+(SQLite file) shared across executions.
+'''
+class LoadFlowCache(object):
+	def __init__(self, network_hash, max_size=512, path_file=None):
+		self.network_hash = network_hash
+		self.max_size = max_size
+		self.dict_memory = OrderedDict()
+
+		# counters
+		self.hits = 0
+		self.misses = 0
+		self.disk_hits = 0
+
+		# optional persistent tier
+		self.db = None
+		if path_file:
+			# used by one simulation at a time, but not always from the thread that created it (server jobs)
+			self.db = sqlite3.connect(path_file, timeout=30., check_same_thread=False)
+			self.db.execute("CREATE TABLE IF NOT EXISTS load_flow_cache (key TEXT PRIMARY KEY, currents TEXT NOT NULL)")
+			self.db.commit()
+
+
+	'''
+	Method to compute the canonical key of a switching state
+	'''
+	def key(self, closed_switches):
+		str_state = self.network_hash + "|" + ",".join(sorted(set(sw.lower() for sw in closed_switches)))
+		return hashlib.sha1(str_state.encode()).hexdigest()
+
+
+	'''
+	Method to get feeder currents of a given switching state. Returns None if not cached.
+	Format: [{'sw_name':sw_name, 'currents':[ia, ib, ic]}, ...]
+	'''
+	def get(self, closed_switches):
+		key = self.key(closed_switches)
+
+		# 1 - memory tier
+		currents = self.dict_memory.get(key)
+		if currents is not None:
+			self.dict_memory.move_to_end(key)
+			self.hits += 1
+			instrumentationModule.count('lf_cache_hits')
+			return self.copy_currents(currents)
+
+		# 2 - persistent tier
+		if self.db is not None:
+			row = self.db.execute("SELECT currents FROM load_flow_cache WHERE key = ?", (key,)).fetchone()
+			if row is not None:
+				currents = json.loads(row[0])
+				self.store_memory(key, currents)
+				self.hits += 1 ; self.disk_hits += 1
+				instrumentationModule.count('lf_cache_hits')
+				return self.copy_currents(currents)
+
+		self.misses += 1
+		instrumentationModule.count('lf_cache_misses')
+		return None
+
+
+	'''
+	Method to store feeder currents of a given switching state
+	'''
+	def put(self, closed_switches, currents):
+		key = self.key(closed_switches)
+		currents = self.copy_currents(currents)
+		self.store_memory(key, currents)
+		if self.db is not None:
+			self.db.execute("INSERT OR REPLACE INTO load_flow_cache (key, currents) VALUES (?, ?)", (key, json.dumps(currents)))
+			self.db.commit()
+
+
+	'''
+	Method to insert an item in memory tier, evicting the least recently used one if necessary
+	'''
+	def store_memory(self, key, currents):
+		self.dict_memory[key] = currents
+		self.dict_memory.move_to_end(key)
+		while len(self.dict_memory) > self.max_size:
+			self.dict_memory.popitem(last=False)
+
+
+	'''
+	Method to copy a list of currents' dicts, so cached items are never shared with callers
+	'''
+	def copy_currents(self, currents):
+		return [{'sw_name': item['sw_name'], 'currents': list(item['currents'])} for item in currents]
+
+
+	'''
+	Method to return cache counters
+	'''
+	def statistics(self):
+		return {'hits': self.hits, 'misses': self.misses, 'disk_hits': self.disk_hits, 'size': len(self.dict_memory)}
+
+
+	'''
+	Method to add counters of other caches (e.g., of worker processes, see parallelEvaluationModule)
+	'''
+	def add_counters(self, dict_counters):
+		self.hits += dict_counters.get('hits', 0)
+		self.misses += dict_counters.get('misses', 0)
+		self.disk_hits += dict_counters.get('disk_hits', 0)
+
+
+	'''
+	Method to release persistent tier
+	'''
+	def close(self):
+		if self.db is not None:
+			self.db.close()
+			self.db = None
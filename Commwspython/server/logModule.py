@@ -0,0 +1,133 @@
+import sys
+import logging
+import threading
+import collections
+
+
+'''
+Module to configure the leveled logging of the simulator. GGA and SSGA log through child loggers of
+"simulador_manobras" (see get_logger), with lazy messages (arguments are only formatted if the record is
+emitted). Levels:
+	- INFO: GGA generations and fitness summary
+	- DEBUG: every GGA/SSGA individual (debug-only sorting and formatting only happen at this level)
+Optionally, records of the most recent GGA generations (DEBUG level included) are kept in a ring buffer.
+Level and ring buffer belong to a log context of the current thread (see configure), so simulations that
+run in different threads (server jobs) neither change each other's level nor mix their records.
+'''
+
+LOGGER_NAME = "simulador_manobras"
+
+logger = logging.getLogger(LOGGER_NAME)
+logger.propagate = False
+logger.setLevel(logging.DEBUG)  # records are filtered by the log context (see ContextLoggerAdapter)
+
+local_data = threading.local()
+
+
+'''
+Class of a logging handler that keeps records of the last "max_generations" GGA generations. A new
+generation starts with a record that has the attribute "gga_generation" (extra={'gga_generation': n}).
+Records are formatted only when read (lines).
+'''
+class GenerationRingBuffer(logging.Handler):
+	def __init__(self, max_generations):
+		logging.Handler.__init__(self, logging.DEBUG)
+		self.setFormatter(logging.Formatter("%(message)s"))
+		self.buffer = collections.deque([[]], maxlen=max_generations)
+
+
+	def emit(self, record):
+		if getattr(record, 'gga_generation', None) is not None:
+			self.buffer.append([])
+		self.buffer[-1].append(record)
+
+
+	'''
+	Method to return formatted records kept in the buffer (oldest first)
+	'''
+	def lines(self):
+		return [self.format(record) for list_records in self.buffer for record in list_records]
+
+
+'''
+Class of the log settings of a simulation: console level and optional ring buffer of GGA generations
+'''
+class LogContext(object):
+	def __init__(self, level=logging.INFO, ring_generations=0):
+		self.level = level
+		self.ring_buffer = GenerationRingBuffer(ring_generations) if ring_generations > 0 else None
+		self.record_level = logging.DEBUG if self.ring_buffer is not None else level  # lowest level emitted
+
+
+default_context = LogContext()
+
+
+'''
+Function to return the log context of the current thread (default context if not configured)
+'''
+def current_context():
+	return getattr(local_data, 'context', default_context)
+
+
+'''
+Class of a logging handler that sends records to the ring buffer of their log context (if any)
+'''
+class ContextRingHandler(logging.Handler):
+	def __init__(self):
+		logging.Handler.__init__(self, logging.DEBUG)
+
+
+	def emit(self, record):
+		context = getattr(record, 'log_context', default_context)
+		if context.ring_buffer is not None:
+			context.ring_buffer.handle(record)
+
+
+'''
+Class of logger adapter that checks levels against the log context of the current thread and attaches
+the context to records (console and ring buffer handlers use it)
+'''
+class ContextLoggerAdapter(logging.LoggerAdapter):
+	def isEnabledFor(self, level):
+		return level >= current_context().record_level
+
+
+	def process(self, msg, kwargs):
+		extra = dict(kwargs.get('extra') or {})
+		extra['log_context'] = current_context()
+		kwargs['extra'] = extra
+		return msg, kwargs
+
+
+console_handler = logging.StreamHandler(sys.stdout)
+console_handler.setFormatter(logging.Formatter("%(message)s"))
+console_handler.addFilter(lambda record: record.levelno >= getattr(record, 'log_context', default_context).level)
+logger.addHandler(console_handler)
+logger.addHandler(ContextRingHandler())
+
+
+'''
+Function to get the logger of a module (child of "simulador_manobras")
+'''
+def get_logger(name):
+	return ContextLoggerAdapter(logging.getLogger(LOGGER_NAME + "." + name), {})
+
+
+'''
+Function to configure logging of the current thread (e.g., a simulation): console level ('DEBUG', 'INFO',
+'WARNING', ...) and number of GGA generations kept in the ring buffer (0: no buffer). Other threads are not
+affected. Returns the ring buffer (or None).
+'''
+def configure(level="INFO", ring_generations=0):
+	console_level = logging.getLevelName(level.upper()) if isinstance(level, str) else level
+	if not isinstance(console_level, int):
+		console_level = logging.INFO
+	local_data.context = LogContext(console_level, ring_generations)
+	return local_data.context.ring_buffer
+
+
+'''
+Function to discard the log context of the current thread (the default context is used again)
+'''
+def clear_context():
+	local_data.__dict__.pop('context', None)
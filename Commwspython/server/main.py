@@ -12,7 +12,20 @@ if __name__ == '__main__':
 	path_chv_sem_manobra_anel = ""
 	id_plano = -1
 	self_healing = 0    # 0: no, 1: yes
-	if len(sys.argv) == 1:
+	if len(sys.argv) >= 2 and sys.argv[1].lower() == "--servidor":
+		# Resident server mode: simulations are requested via HTTP (see wsserver.py), optional port as 2nd argument
+		import wsserver
+		wsserver.run(int(sys.argv[2]) if len(sys.argv) >= 3 else 5010)
+		sys.exit(0)
+	elif len(sys.argv) >= 3 and sys.argv[1].lower() == "--exportar-resultados":
+		# Export of the results store to the legacy text file (newest first): path of Dat folder, optional self_healing (0/1)
+		import resultsStoreModule
+		path_store_file, path_text_file = resultsStoreModule.results_paths(sys.argv[2], int(sys.argv[3]) if len(sys.argv) >= 4 else 0)
+		results_store = resultsStoreModule.ResultsStore(path_store_file, path_text_file)
+		results_store.export_text(path_text_file)
+		results_store.close()
+		sys.exit(0)
+	elif len(sys.argv) == 1:
 		path_arq_parametros = "Z:\\SINAPgrid\\PlataformaSinap\\Tmp\\Bin\\Win64\\Dat\\DMS\\DadosSimulacoesManobra\\Executando\\ParametrosExecucao.txt"
 		path_chv_sem_manobra_anel = "Z:\\SINAPgrid\\PlataformaSinap\\Tmp\\Bin\\Win64\\Dat\\DMS\\DadosSimulacoesManobra\\Executando\\ChavesSemManobraAnel.txt"
 		path_dat = "Z:\\SINAPgrid\\PlataformaSinap\\Tmp\\Bin\\Win64\\Dat\\"
@@ -0,0 +1,225 @@
+import os
+import math
+import random
+
+
+'''
+Class to generate synthetic distribution networks, with the same files of a real network folder:
+DadosRedes.xml (networks' data and graph of operable switches) and dss_files/master.dss (load flow model,
+with dss_files/coordenadas.dss). Both files describe the same network, already with the fault isolated.
+Network model:
+	- each feeder is a tree of blocks (network sections between switches), supplied by a circuit breaker
+	  at the substation (vertex 0 of the graph); each sectionalizing switch connects a block to its parent;
+	- tie switches (initially open) connect close blocks of different feeders;
+	- the fault is in the first block of the first feeder: its breaker is tripped and the switches
+	  downstream of the block are opened (isolation), so the remaining blocks of the feeder must be
+	  restored through tie switches.
+Parameters:
+	- num_feeders: number of feeders (>= 2)
+	- switches_per_feeder: number of sectionalizing switches of each feeder (>= 1)
+	- tie_density: number of tie switches per sectionalizing switch (at least 1 tie switch leaves each
+	  part of the faulted feeder downstream of the fault)
+	- customers: (min, max) number of customers of each block
+	- load_kw: (min, max) load of each block (kW)
+	- spacing_m: distance between consecutive blocks (coordinates in meters)
+	- current_margin: feeder maximum current = margin x initial feeder current
+	- seed: seed of the random generator (same parameters and seed ==> same network)
+'''
+class NetworkGenerator(object):
+	def __init__(self, num_feeders=3, switches_per_feeder=4, tie_density=0.3, customers=(5, 100), load_kw=(50, 300),
+	             spacing_m=300., current_margin=1.5, seed=0):
+		if num_feeders < 2 or switches_per_feeder < 1:
+			raise ValueError("At least 2 feeders with 1 sectionalizing switch are necessary")
+		self.num_feeders = num_feeders
+		self.switches_per_feeder = switches_per_feeder
+		self.tie_density = tie_density
+		self.customers = customers
+		self.load_kw = load_kw
+		self.spacing_m = spacing_m
+		self.current_margin = current_margin
+		self.base_kv = 13.8
+		self.power_factor = 0.9
+		self.rnd = random.Random(seed)
+
+		self.list_blocks = []    # {'feeder', 'parent', 'switch', 'x', 'y', 'customers', 'kw'}
+		self.list_feeders = []   # {'code', 'breaker', 'blocks': [block indexes]}
+		self.list_ties = []      # {'code', 'block1', 'block2'}
+		self.list_isolation_switches = []
+		self.faulted_block = None
+
+
+	'''
+	Method to generate the network (blocks, feeders, tie switches and fault)
+	'''
+	def generate(self):
+		self.generate_feeders()
+
+		# fault: first block of the first feeder
+		self.faulted_block = self.list_feeders[0]['blocks'][0]
+		self.list_isolation_switches = [block['switch'] for block in self.list_blocks if block['parent'] == self.faulted_block]
+
+		self.generate_ties()
+
+
+	'''
+	Method to generate the blocks of each feeder. Feeders leave the substation in different directions,
+	and each new block is attached to one of the last blocks of its feeder (trunk with short branches).
+	'''
+	def generate_feeders(self):
+		for id_feeder in range(self.num_feeders):
+			angle = 2. * math.pi * id_feeder / self.num_feeders
+			feeder = {'code': 'alim%d' % (id_feeder + 1), 'breaker': 'dj%d' % (id_feeder + 1), 'blocks': []}
+			for k in range(self.switches_per_feeder + 1):
+				if k == 0:
+					parent = None ; switch = feeder['breaker'] ; x0 = y0 = 0.
+				else:
+					parent = feeder['blocks'][self.rnd.randint(max(0, k - 3), k - 1)]
+					switch = 'cf%d_%d' % (id_feeder + 1, k) ; x0 = self.list_blocks[parent]['x'] ; y0 = self.list_blocks[parent]['y']
+				direction = angle + self.rnd.uniform(-math.pi / 4., math.pi / 4.)
+				self.list_blocks.append({'feeder': id_feeder, 'parent': parent, 'switch': switch,
+				                         'x': x0 + self.spacing_m * math.cos(direction), 'y': y0 + self.spacing_m * math.sin(direction),
+				                         'customers': self.rnd.randint(*self.customers), 'kw': self.rnd.randint(*self.load_kw)})
+				feeder['blocks'].append(len(self.list_blocks) - 1)
+			self.list_feeders.append(feeder)
+
+
+	'''
+	Method to generate tie switches, connecting a random block to the closest block of another feeder.
+	The first tie switches leave each part of the faulted feeder downstream of the fault (one per
+	isolation switch), so all interrupted blocks can be restored.
+	'''
+	def generate_ties(self):
+		# blocks of each part of the faulted feeder downstream of the fault
+		list_isolated_parts = []
+		for i in self.list_feeders[0]['blocks'][1:]:
+			if self.list_blocks[i]['parent'] == self.faulted_block:
+				list_isolated_parts.append([i])
+			else:
+				next(part for part in list_isolated_parts if self.list_blocks[i]['parent'] in part).append(i)
+
+		num_ties = max(len(list_isolated_parts), int(round(self.tie_density * self.num_feeders * self.switches_per_feeder)))
+		set_pairs = set()
+		for id_tie in range(num_ties):
+			if id_tie < len(list_isolated_parts):
+				id_feeder = 0 ; block1 = self.rnd.choice(list_isolated_parts[id_tie])
+			else:
+				id_feeder = self.rnd.randrange(self.num_feeders) ; block1 = self.rnd.choice(self.list_feeders[id_feeder]['blocks'][1:])
+			x1 = self.list_blocks[block1]['x'] ; y1 = self.list_blocks[block1]['y']
+			list_candidates = [(math.hypot(block['x'] - x1, block['y'] - y1), i) for i, block in enumerate(self.list_blocks)
+			                   if block['feeder'] != id_feeder and block['parent'] is not None and (min(block1, i), max(block1, i)) not in set_pairs]
+			if len(list_candidates) == 0:
+				continue
+			block2 = min(list_candidates)[1]
+			set_pairs.add((min(block1, block2), max(block1, block2)))
+			self.list_ties.append({'code': 'nf%d' % (len(self.list_ties) + 1), 'block1': block1, 'block2': block2})
+
+
+	'''
+	Method to write network files in a given folder: DadosRedes.xml, dss_files/master.dss and dss_files/coordenadas.dss
+	Output: dict with data to simulate the fault ('dados_isolacao_defeito' and 'lis_chave_partida', as in ParametrosExecucao.txt)
+	'''
+	def write(self, folder):
+		if self.faulted_block is None:
+			self.generate()
+		os.makedirs(os.path.join(folder, "dss_files"), exist_ok=True)
+		self.write_xml_file(os.path.join(folder, "DadosRedes.xml"))
+		self.write_dss_files(os.path.join(folder, "dss_files"))
+
+		dados_isolacao_defeito = {'chave' + str(i + 1): code for i, code in enumerate(self.list_isolation_switches)}
+		return {'dados_isolacao_defeito': dados_isolacao_defeito,
+		        'lis_chave_partida': [{'chave_partida': code} for code in self.list_isolation_switches]}
+
+
+	'''
+	Method to write the XML file. Vertices of the graph: 0 (substation) and blocks, except the faulted one.
+	'''
+	def write_xml_file(self, path_file):
+		dict_vertex = {}
+		for i in range(len(self.list_blocks)):
+			if i != self.faulted_block:
+				dict_vertex[i] = len(dict_vertex) + 1
+
+		list_lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<DadosRedes>', '\t<CadastroAlimentadores>']
+		for id_feeder, feeder in enumerate(self.list_feeders):
+			kw = sum(self.list_blocks[i]['kw'] for i in feeder['blocks'])
+			max_current = int(math.ceil(self.current_margin * kw / (math.sqrt(3.) * self.base_kv * self.power_factor)))
+			list_lines += ['\t\t<Alimentador>', '\t\t\t<CodigoAlimentador>%s</CodigoAlimentador>' % feeder['code'],
+			               '\t\t\t<ChaveProtecao>%s</ChaveProtecao>' % feeder['breaker'],
+			               '\t\t\t<MaximaCorrente>%d</MaximaCorrente>' % max_current, '\t\t</Alimentador>']
+
+		list_lines.append('\t</CadastroAlimentadores>\n\t<CadastroChaves>')
+		list_switches = [(block['switch'], self.switch_type(block), block['x'], block['y']) for block in self.list_blocks]
+		for tie in self.list_ties:
+			block1 = self.list_blocks[tie['block1']] ; block2 = self.list_blocks[tie['block2']]
+			list_switches.append((tie['code'], 'faca', (block1['x'] + block2['x']) / 2., (block1['y'] + block2['y']) / 2.))
+		for id_switch, (code, type_sw, x, y) in enumerate(list_switches):
+			list_lines += ['\t\t<Chave>', '\t\t\t<Id>%d</Id>' % id_switch, '\t\t\t<Codigo>%s</Codigo>' % code, '\t\t\t<Tipo>%s</Tipo>' % type_sw,
+			               '\t\t\t<CoordXmetros>%d</CoordXmetros>' % int(round(x)), '\t\t\t<CoordYmetros>%d</CoordYmetros>' % int(round(y)), '\t\t</Chave>']
+
+		list_lines += ['\t</CadastroChaves>', '\t<CadastroNos>', '\t\t<No>', '\t\t\t<Id>0</Id>', '\t\t\t<Clientes>0</Clientes>', '\t\t</No>']
+		for i, vertex in dict_vertex.items():
+			list_lines += ['\t\t<No>', '\t\t\t<Id>%d</Id>' % vertex, '\t\t\t<Clientes>%d</Clientes>' % self.list_blocks[i]['customers'], '\t\t</No>']
+
+		list_lines.append('\t</CadastroNos>\n\t<GrafoArestasOperaveis>')
+		list_edges = []
+		for i, block in enumerate(self.list_blocks):
+			if i == self.faulted_block or block['parent'] == self.faulted_block:
+				continue
+			list_edges.append((0 if block['parent'] is None else dict_vertex[block['parent']], dict_vertex[i], block['switch'], 'sim'))
+		for tie in self.list_ties:
+			if self.faulted_block not in (tie['block1'], tie['block2']):
+				list_edges.append((dict_vertex[tie['block1']], dict_vertex[tie['block2']], tie['code'], 'nao'))
+		for v1, v2, code, initial in list_edges:
+			list_lines += ['\t\t<Aresta>', '\t\t\t<V1>%d</V1>' % v1, '\t\t\t<V2>%d</V2>' % v2, '\t\t\t<Chave>%s</Chave>' % code,
+			               '\t\t\t<Inicial>%s</Inicial>' % initial, '\t\t</Aresta>']
+		list_lines += ['\t</GrafoArestasOperaveis>', '</DadosRedes>']
+
+		with open(path_file, "w") as f:
+			f.write("\n".join(list_lines) + "\n")
+
+
+	'''
+	Method to write DSS files. Each block has an input bus (where its switch arrives) and an output bus
+	(where its load and downstream switches are connected).
+	'''
+	def write_dss_files(self, dss_folder):
+		list_lines = ['!suprimento', 'new circuit.SINT bus1=MT basekv=%g pu=1.0000 r1=0.001 x1=0.1' % self.base_kv, '',
+		              '!arranjos', 'new linecode.arranjo nphases=3 r0=0.2 x0=0.4 r1=0.1 x1=0.25 units=km', '', '!trechos']
+		length_km = max(0.1, self.spacing_m / 1000.)
+		for i in range(len(self.list_blocks)):
+			list_lines.append('new line.t%d phases=3 bus1=%d_in.1.2.3 bus2=%d_out.1.2.3 length=%.3f linecode=arranjo' % (i, i, i, length_km))
+
+		list_lines += ['', '!chaves']
+		set_open = set(self.list_isolation_switches) | {self.list_feeders[0]['breaker']}
+		for i, block in enumerate(self.list_blocks):
+			bus1 = 'MT' if block['parent'] is None else '%d_out' % block['parent']
+			enabled = 'false' if block['switch'] in set_open else 'true'
+			list_lines.append('new line.%s phases=3 bus1=%s.1.2.3 bus2=%d_in.1.2.3 switch=yes enabled=%s' % (block['switch'], bus1, i, enabled))
+		for tie in self.list_ties:
+			list_lines.append('new line.%s phases=3 bus1=%d_out.1.2.3 bus2=%d_out.1.2.3 switch=yes enabled=false' % (tie['code'], tie['block1'], tie['block2']))
+
+		list_lines += ['', '!cargas']
+		for i, block in enumerate(self.list_blocks):
+			list_lines.append('new load.carga_%d kv=%g kw=%d pf=%g bus1=%d_out.1.2.3 phases=3' % (i, self.base_kv, block['kw'], self.power_factor, i))
+
+		list_lines += ['', 'set voltagebases=[%g]' % self.base_kv, 'calcv', 'Buscoords coordenadas.dss']
+		with open(os.path.join(dss_folder, "master.dss"), "w") as f:
+			f.write("\n".join(list_lines) + "\n")
+
+		list_coords = ['MT 0 0']
+		for i, block in enumerate(self.list_blocks):
+			list_coords.append('%d_out %d %d' % (i, int(round(block['x'])), int(round(block['y']))))
+		with open(os.path.join(dss_folder, "coordenadas.dss"), "w") as f:
+			f.write("\n".join(list_coords) + "\n")
+
+
+	'''
+	Method to define the type of a block's switch: circuit breaker at the substation, a recloser in the
+	middle of each feeder and knife switches (faca) elsewhere
+	'''
+	def switch_type(self, block):
+		if block['parent'] is None:
+			return 'disjuntor'
+		if block['switch'] == 'cf%d_%d' % (block['feeder'] + 1, (self.switches_per_feeder + 1) // 2):
+			return 'religadora'
+		return 'faca'
@@ -1,4 +1,14 @@
+import os
+import shutil
+import hashlib
+import tempfile
 import xml.etree.ElementTree as ET
+import numpy as np
+import graphModule
+
+
+# Hashes of XML files already computed: path ==> (size, modification time, hash), see xml_file_hash
+dict_xml_hashes = {}
 
 
 '''
@@ -11,83 +21,385 @@ networks (power feeders). Contents:
 '''
 
 class NetworksData(object):
-	def __init__(self, sm_folder_path):
-		self.xml_file = None
+	# Columns of networks' registrations (name: "<registration>.<field>") and their types
+	COLUMNS = {'feeders.code': str, 'feeders.protection': str, 'feeders.max_current': float,
+	           'switches.id': int, 'switches.code': str, 'switches.type': str, 'switches.coord_x_m': int, 'switches.coord_y_m': int,
+	           'nodes.id': int, 'nodes.customers': int,
+	           'edges.v1': int, 'edges.v2': int, 'edges.switch': str, 'edges.initial': bool}
+
+	def __init__(self, sm_folder_path, use_snapshot=True):
 		self.xml_file_path = sm_folder_path + "DadosRedes.xml"
+		self.snapshot_folder = sm_folder_path + "snapshot_redes"  # binary snapshots of XML file (see save_snapshot)
+		self.use_snapshot = use_snapshot
 
 		# initializations
 		self.list_feeders_dicts = []
-		self.list_switches_dicts = []
-		self.list_vertices_dicts = []
 		self.list_graph_operable_switches_dicts = []
 
+		# switches' registration, kept in columns (switch index ==> value); records are built on demand (switch_record)
+		self.array_switch_ids = None
+		self.list_switch_codes = []
+		self.list_switch_types = []
+
+		# indexes (built once, see build_indexes). Switches are internally identified by
+		# integer indexes (position in switches' columns); codes are used only as keys.
+		self.dict_switch_index = {}        # switch code (lower case) ==> switch index
+		self.dict_edge_switch_code = {}    # (u, v), with u < v ==> switch code
+		self.dict_switch_edge = {}         # switch code (lower case) ==> edge dict (list_graph_operable_switches_dicts)
+		self.dict_vertex_customers = {}    # vertex id ==> number of customers
+		self.dict_feeder_capacity = {}     # protection switch code ==> feeder maximum current
+		self.array_switch_automated = None # switch index ==> True if circuit breaker (disjuntor) or recloser (religadora)
+		self.array_switch_coords = None    # switch index ==> [x, y] (meters)
+		self.matrix_travel_times = None    # crew travel times (minutes) between switches, see build_travel_times
+		self.dict_switch_edge_index = {}   # switch code (lower case) ==> edge index (list_graph_operable_switches_dicts)
+		self.topology = None               # CSR adjacency of operable edges graph (graphModule.CSRTopology)
+		self.array_vertex_customers = None # number of customers, indexed by topology's dense vertex indexes
+		self.array_edge_automated = None   # edge index ==> True if its switch is automated
+		self.list_switches = None          # switches' registration, built on demand (see get_list_switches)
+		self.list_edges = None             # edges' registration, built on demand (see get_list_edges)
+
 
 	def initialize(self):
-		self.xml_file = ET.parse(self.xml_file_path)
-		root_node = self.xml_file.getroot()
+		dict_columns = self.load_columns(self.xml_file_hash())
+		self.read_feeders_registration(dict_columns)
+		self.read_switches_registration(dict_columns)
+		self.read_nodes_registration(dict_columns)
+		self.read_graph_operable_switches(dict_columns)
+		self.build_indexes()
+
+
+	'''
+	Method to return the number of operable switches (edges of the graph) without loading all registrations:
+	columns come from the binary snapshot, if available (e.g., to estimate the cost of a simulation)
+	'''
+	def num_operable_switches(self, xml_hash=None):
+		if xml_hash is None:
+			xml_hash = self.xml_file_hash()
+		return len(self.load_columns(xml_hash)['edges.v1'])
+
+
+	'''
+	Method to return columnar arrays of all registrations: from binary snapshot (if available) or from XML file
+	'''
+	def load_columns(self, xml_hash):
+		dict_columns = None
+		if self.use_snapshot:
+			dict_columns = self.load_snapshot(xml_hash)
+		if dict_columns is None:
+			dict_columns = self.read_xml_file()
+			if self.use_snapshot:
+				self.save_snapshot(xml_hash, dict_columns)
+		return dict_columns
 
-		self.read_feeders_registration(root_node)
-		self.read_switches_registration(root_node)
-		self.read_nodes_registration(root_node)
-		self.read_graph_operable_switches(root_node)
 
+	'''
+	Method to compute the hash of XML file (binary snapshots are only valid for the same hash). The file is
+	only read again if its size or modification time changed since the last hash (e.g., resident server).
+	'''
+	def xml_file_hash(self):
+		path_file = os.path.abspath(self.xml_file_path)
+		stat = os.stat(path_file)
+		item = dict_xml_hashes.get(path_file)
+		if item is not None and item[:2] == (stat.st_size, stat.st_mtime_ns):
+			return item[2]
+		sha = hashlib.sha1()
+		with open(path_file, "rb") as f:
+			for chunk in iter(lambda: f.read(1 << 20), b""):
+				sha.update(chunk)
+		dict_xml_hashes[path_file] = (stat.st_size, stat.st_mtime_ns, sha.hexdigest())
+		return sha.hexdigest()
+
+
+	'''
+	Method to read XML file in streaming mode (iterparse). Each record (child of a registration node) is
+	converted into columns as soon as it is parsed, and then freed.
+	Output: dict of columnar arrays, named as "<registration>.<field>" (see COLUMNS)
+	'''
+	def read_xml_file(self):
+		dict_lists = {name: [] for name in self.COLUMNS}
+		dict_readers = {'CadastroAlimentadores': self.read_feeder_record, 'CadastroChaves': self.read_switch_record,
+		                'CadastroNos': self.read_node_record, 'GrafoArestasOperaveis': self.read_operable_edge_record}
+		depth = 0 ; registration = None
+		for event, XMLnode in ET.iterparse(self.xml_file_path, events=("start", "end")):
+			if event == "start":
+				depth += 1
+				if depth == 2: registration = XMLnode.tag
+				continue
+			depth -= 1
+			if depth == 2 and registration in dict_readers:  # end of a record
+				dict_readers[registration](XMLnode, dict_lists)
+				XMLnode.clear()
+			elif depth == 1:  # end of a registration node
+				XMLnode.clear()
+
+		dict_columns = {}
+		for name, dtype in self.COLUMNS.items():
+			if dtype == str: dict_columns[name] = np.array(dict_lists[name], dtype=str).reshape(-1)
+			else: dict_columns[name] = np.array(dict_lists[name], dtype=dtype)
+		return dict_columns
+
+
+	def read_feeder_record(self, XMLnode, dict_lists):
+		dict_lists['feeders.code'].append(XMLnode.find('CodigoAlimentador').text)
+		dict_lists['feeders.protection'].append(XMLnode.find('ChaveProtecao').text)
+		dict_lists['feeders.max_current'].append(float(XMLnode.find('MaximaCorrente').text))
+
+
+	def read_switch_record(self, XMLnode, dict_lists):
+		dict_lists['switches.id'].append(int(XMLnode.find('Id').text))
+		dict_lists['switches.code'].append(XMLnode.find('Codigo').text.replace('.', ''))
+		dict_lists['switches.type'].append(XMLnode.find('Tipo').text)
+		dict_lists['switches.coord_x_m'].append(int(XMLnode.find('CoordXmetros').text))
+		dict_lists['switches.coord_y_m'].append(int(XMLnode.find('CoordYmetros').text))
+
+
+	def read_node_record(self, XMLnode, dict_lists):
+		dict_lists['nodes.id'].append(int(XMLnode.find('Id').text))
+		dict_lists['nodes.customers'].append(int(XMLnode.find('Clientes').text))
+
+
+	def read_operable_edge_record(self, XMLnode, dict_lists):
+		dict_lists['edges.v1'].append(int(XMLnode.find('V1').text))
+		dict_lists['edges.v2'].append(int(XMLnode.find('V2').text))
+		dict_lists['edges.switch'].append(XMLnode.find('Chave').text.replace('.', ''))  # code of its corresponding switch
+		dict_lists['edges.initial'].append(XMLnode.find('Inicial').text == "sim")  # if it is initially closed
+
+
+	'''
+	Method to load binary snapshot corresponding to a given XML hash. Arrays are memory-mapped.
+	Returns None if there is no valid snapshot.
+	'''
+	def load_snapshot(self, xml_hash):
+		snapshot_folder = os.path.join(self.snapshot_folder, xml_hash)
+		if not os.path.isdir(snapshot_folder):
+			return None
+		try:
+			return {name: np.load(os.path.join(snapshot_folder, name + ".npy"), mmap_mode='r') for name in self.COLUMNS}
+		except (OSError, ValueError):
+			return None
+
+
+	'''
+	Method to save columnar arrays as a binary snapshot (one .npy file per column), keyed by XML hash.
+	Snapshots of previous XML files are removed.
+	'''
+	def save_snapshot(self, xml_hash, dict_columns):
+		try:
+			os.makedirs(self.snapshot_folder, exist_ok=True)
+			tmp_folder = tempfile.mkdtemp(dir=self.snapshot_folder)
+			for name, array in dict_columns.items():
+				np.save(os.path.join(tmp_folder, name + ".npy"), array)
+			try:
+				os.rename(tmp_folder, os.path.join(self.snapshot_folder, xml_hash))
+			except OSError:  # already saved by another process
+				shutil.rmtree(tmp_folder, ignore_errors=True)
+			for folder in os.listdir(self.snapshot_folder):
+				if folder != xml_hash and not folder.startswith("tmp"):
+					shutil.rmtree(os.path.join(self.snapshot_folder, folder), ignore_errors=True)
+		except OSError:  # snapshot is optional (e.g., read-only folder)
+			pass
 
 
 	'''
 	Method to read all registration regarding power feeders
 	'''
-	def read_feeders_registration(self, root_node):
-		node_feeders_registration = root_node.find('CadastroAlimentadores')
-		for XMLnode in node_feeders_registration:
+	def read_feeders_registration(self, dict_columns):
+		for code, protection, max_current in zip(dict_columns['feeders.code'].tolist(), dict_columns['feeders.protection'].tolist(),
+		                                         dict_columns['feeders.max_current'].tolist()):
 			dict_fd = {} # dict
-			dict_fd.update({'code': XMLnode.find('CodigoAlimentador').text})
-			dict_fd.update({'protection': XMLnode.find('ChaveProtecao').text})
-			dict_fd.update({'max_current': float(XMLnode.find('MaximaCorrente').text)})
+			dict_fd.update({'code': code})
+			dict_fd.update({'protection': protection})
+			dict_fd.update({'max_current': max_current})
 			self.list_feeders_dicts.append(dict_fd)
 
 
 	'''
-	Method to read all registration regarding switches
+	Method to read all registration regarding switches (kept in columns, no record is built)
 	'''
-	def read_switches_registration(self, root_node):
-		node_switches_registration = root_node.find('CadastroChaves')
-		for XMLnode in node_switches_registration:
-			dict_sw = {} # dict
-			dict_sw.update({'id': int(XMLnode.find('Id').text)})
-			dict_sw.update({'code': XMLnode.find('Codigo').text.replace('.', '')})
-			dict_sw.update({'type': XMLnode.find('Tipo').text})
-			dict_sw.update({'coord_x_m': int(XMLnode.find('CoordXmetros').text)})
-			dict_sw.update({'coord_y_m': int(XMLnode.find('CoordYmetros').text)})
-			self.list_switches_dicts.append(dict_sw)
+	def read_switches_registration(self, dict_columns):
+		self.array_switch_ids = np.asarray(dict_columns['switches.id'], dtype=int)
+		self.list_switch_codes = dict_columns['switches.code'].tolist()
+		self.list_switch_types = dict_columns['switches.type'].tolist()
+		self.array_switch_coords = np.column_stack((dict_columns['switches.coord_x_m'], dict_columns['switches.coord_y_m'])).astype(float).reshape(-1, 2)
 
 
 	'''
-	Method to read all registration regarding nodes and their customers
+	Method to read all registration regarding nodes and their customers, straight into the customers index
+	(the first register prevails)
 	'''
-	def read_nodes_registration(self, root_node):
-		node_node_registration = root_node.find('CadastroNos')
-		for XMLnode in node_node_registration:
-			dict_node = {} # dict
-			dict_node.update({'id': int(XMLnode.find('Id').text)})
-			dict_node.update({'customers': int(XMLnode.find('Clientes').text)})
-			self.list_vertices_dicts.append(dict_node)
+	def read_nodes_registration(self, dict_columns):
+		self.dict_vertex_customers = {}
+		for node_id, customers in zip(dict_columns['nodes.id'].tolist(), dict_columns['nodes.customers'].tolist()):
+			self.dict_vertex_customers.setdefault(node_id, customers)
 
 
 	'''
 	Method to read all data concerning the graph that represents the power networks, considering all
 	possible operable switches.
 	'''
-	def read_graph_operable_switches(self, root_node):
-		node_operable_edges = root_node.find('GrafoArestasOperaveis')
-		for XMLnode in node_operable_edges:
+	def read_graph_operable_switches(self, dict_columns):
+		for v1, v2, switch, initial in zip(dict_columns['edges.v1'].tolist(), dict_columns['edges.v2'].tolist(),
+		                                   dict_columns['edges.switch'].tolist(), dict_columns['edges.initial'].tolist()):
 			dict_edge = {} # dict
-			dict_edge.update({'v1': int(XMLnode.find('V1').text)})
-			dict_edge.update({'v2': int(XMLnode.find('V2').text)})
-			dict_edge.update({'switch': XMLnode.find('Chave').text.replace('.', '')}) # code of its corresponding switch
-			dict_edge.update({'initial': XMLnode.find('Inicial').text == "sim"}) # if it is initially closed
+			dict_edge.update({'v1': v1})
+			dict_edge.update({'v2': v2})
+			dict_edge.update({'switch': switch}) # code of its corresponding switch
+			dict_edge.update({'initial': initial}) # if it is initially closed
 			self.list_graph_operable_switches_dicts.append(dict_edge)
 
 
+	'''
+	Method to build indexes for switch, edge, vertex and feeder lookups
+	'''
+	def build_indexes(self):
+		# 1 - Switches (coordinates are read in read_switches_registration)
+		self.dict_switch_index = {}
+		for index, code in enumerate(self.list_switch_codes):
+			self.dict_switch_index.setdefault(code.lower(), index)
+		self.array_switch_automated = np.array([sw_type.lower() in ("disjuntor", "religadora") for sw_type in self.list_switch_types], dtype=bool)
+
+		# 2 - Edges (the first register prevails, as in a sequential search)
+		self.dict_edge_switch_code = {} ; self.dict_switch_edge = {} ; self.dict_switch_edge_index = {}
+		for index, dict_edge in enumerate(self.list_graph_operable_switches_dicts):
+			self.dict_edge_switch_code.setdefault(self.edge_key(dict_edge['v1'], dict_edge['v2']), dict_edge['switch'])
+			self.dict_switch_edge.setdefault(dict_edge['switch'].lower(), dict_edge)
+			self.dict_switch_edge_index.setdefault(dict_edge['switch'].lower(), index)
+
+		# 3 - Feeders (customers of vertices are indexed in read_nodes_registration)
+		self.dict_feeder_capacity = {}
+		for dict_fd in self.list_feeders_dicts:
+			self.dict_feeder_capacity.setdefault(dict_fd['protection'], float(dict_fd['max_current']))
+
+		# 4 - Topology of operable edges graph (CSR adjacency) and customers of its vertices
+		self.topology = graphModule.CSRTopology([[dict_edge['v1'], dict_edge['v2']] for dict_edge in self.list_graph_operable_switches_dicts])
+		self.array_vertex_customers = np.array([self.customers_of_vertex(vertex) for vertex in self.topology.vertices.tolist()], dtype=int)
+		self.array_edge_automated = np.array([self.is_automated(dict_edge['switch']) for dict_edge in self.list_graph_operable_switches_dicts], dtype=bool)
+
+		# 5 - Crew travel times between switches
+		self.matrix_travel_times = self.build_travel_times()
+
+
+	'''
+	Method to compute crew travel times (minutes) between all pairs of switches [origin, destination], based on
+	their geographic positions and an average displacement speed. Travel time is zero if:
+		- destination switch is automatic (circuit breaker or recloser), as it is remotely operated;
+		- one of the switches has no coordinates, or it is not registered (last row/column, see switch_indexes).
+	'''
+	def build_travel_times(self, avg_spd_km_h=50.):
+		num_switches = len(self.list_switch_codes)
+		coords = self.array_switch_coords
+		dist_m = np.sqrt(((coords[:, np.newaxis, :] - coords[np.newaxis, :, :]) ** 2).sum(axis=2))
+
+		matrix = np.zeros((num_switches + 1, num_switches + 1))
+		matrix[:num_switches, :num_switches] = (dist_m / (avg_spd_km_h / 3.6)) / 60.
+
+		no_coords = np.append((coords == 0.).all(axis=1), True)
+		matrix[no_coords, :] = 0. ; matrix[:, no_coords] = 0.
+		matrix[:, np.append(self.array_switch_automated, True)] = 0.
+		return matrix
+
+
+	'''
+	Method to return an array with indexes of given switches. Switches not registered are mapped to
+	the last row/column of travel times matrix (zero travel time).
+	'''
+	def switch_indexes(self, list_sw_codes):
+		num_switches = len(self.list_switch_codes)
+		list_indexes = []
+		for sw_code in list_sw_codes:
+			index = self.switch_index(sw_code)
+			list_indexes.append(num_switches if index is None else index)
+		return np.array(list_indexes, dtype=int)
+
+
+	'''
+	Method to provide the key of an edge (u,v) regardless of its direction
+	'''
+	def edge_key(self, u, v):
+		u = int(u) ; v = int(v)
+		return (u, v) if u < v else (v, u)
+
+
+	'''
+	Method to return the index of a given switch (None if not registered)
+	'''
+	def switch_index(self, sw_code):
+		return self.dict_switch_index.get(sw_code.replace('.', '').lower())
+
+
+	'''
+	Method to return the registration of a given switch (None if not registered), built from switches' columns
+	'''
+	def switch_record(self, sw_code):
+		index = self.switch_index(sw_code)
+		if index is None: return None
+		return {'id': int(self.array_switch_ids[index]), 'code': self.list_switch_codes[index], 'type': self.list_switch_types[index],
+		        'coord_x_m': int(self.array_switch_coords[index, 0]), 'coord_y_m': int(self.array_switch_coords[index, 1])}
+
+
+	'''
+	Method to return True if a given switch is a circuit breaker (disjuntor) or recloser (religadora)
+	'''
+	def is_automated(self, sw_code):
+		index = self.switch_index(sw_code)
+		return index is not None and bool(self.array_switch_automated[index])
+
+
+	'''
+	Method to return the code of the switch corresponding to edge (u,v) ("" if not found)
+	'''
+	def switch_code_of_edge(self, u, v):
+		return self.dict_edge_switch_code.get(self.edge_key(u, v), "")
+
+
+	'''
+	Method to return the edge dict corresponding to a given switch (None if not found)
+	'''
+	def edge_of_switch(self, sw_code):
+		return self.dict_switch_edge.get(sw_code.lower())
+
+
+	'''
+	Method to convert a list of edge dicts (format of list_graph_operable_switches_dicts) into
+	a mask of closed edges (see topology)
+	'''
+	def closed_edges_mask(self, list_edge_dicts):
+		edge_mask = np.zeros(self.topology.num_edges, dtype=bool)
+		for dict_edge in list_edge_dicts:
+			index = self.edge_index_of_switch(dict_edge['switch'])
+			if index is not None: edge_mask[index] = True
+		return edge_mask
+
+
+	'''
+	Method to build the feeder tree (graphModule.FeederTree) for a given list of closed edge dicts
+	'''
+	def feeder_tree(self, list_closed_edge_dicts):
+		return graphModule.FeederTree(self.topology, self.array_edge_automated, self.closed_edges_mask(list_closed_edge_dicts),
+		                              vertex_customers=self.array_vertex_customers.tolist())
+
+
+	'''
+	Method to return the index of the edge corresponding to a given switch (None if not found)
+	'''
+	def edge_index_of_switch(self, sw_code):
+		return self.dict_switch_edge_index.get(sw_code.lower())
+
+
+	'''
+	Method to return the number of customers of a given vertex
+	'''
+	def customers_of_vertex(self, vertex):
+		return self.dict_vertex_customers.get(int(vertex), 0)
+
+
+	'''
+	Method to return the maximum current of the feeder protected by a given switch (0 if not found)
+	'''
+	def feeder_capacity(self, prot_switch):
+		return self.dict_feeder_capacity.get(prot_switch, 0.)
+
+
 	'''
 	Method to provide all available edges and all initially closed edges
 	'''
@@ -128,12 +440,18 @@ class NetworksData(object):
 	Method to return list with switches' registration
 	'''
 	def get_list_switches(self):
+		if self.list_switches is None:
+			self.list_switches = self.build_list_switches()
+		return self.list_switches
+
+
+	def build_list_switches(self):
 		sw_list = []
-		for sw in self.list_switches_dicts:
+		for sw_id, code, sw_type in zip(self.array_switch_ids.tolist(), self.list_switch_codes, self.list_switch_types):
 			dict_sw = {}
-			dict_sw.update({'id_sw':sw['id']})
-			dict_sw.update({'code_sw': sw['code'].replace('.', '')})
-			dict_sw.update({'type_sw': sw['type']})
+			dict_sw.update({'id_sw': sw_id})
+			dict_sw.update({'code_sw': code.replace('.', '')})
+			dict_sw.update({'type_sw': sw_type})
 			sw_list.append(dict_sw)
 		return sw_list
 
@@ -143,17 +461,20 @@ class NetworksData(object):
 	all operable switches.
 	'''
 	def get_list_edges(self):
+		if self.list_edges is None:
+			self.list_edges = self.build_list_edges()
+		return self.list_edges
+
+
+	def build_list_edges(self):
 		edges_list = []
 
 		list_edges_dicts = self.list_graph_operable_switches_dicts
 		for dict_item in list_edges_dicts:
 
 			# get switch ID
-			sw_id = -1
-			for sw in self.list_switches_dicts:
-				if sw['code'] == dict_item['switch']:
-					sw_id = int(sw['id'])
-					break
+			index = self.switch_index(dict_item['switch'])
+			sw_id = int(self.array_switch_ids[index]) if index is not None and self.list_switch_codes[index] == dict_item['switch'] else -1
 			dict_edge = {}
 			dict_edge.update({'id_sw': sw_id})
 			dict_edge.update({'vertice_1': dict_item['v1']})
@@ -0,0 +1,104 @@
+import random
+import multiprocessing
+import numpy as np
+import graphModule
+import networksData
+import loadFlowCacheModule
+import switchingAssessmentModule
+import sequentialSwitchingGAModule
+
+
+# State of each worker process: network data, load flow engine and load flow cache (loaded once)
+worker_state = {}
+
+# Load flow cache counters reported by workers
+LF_COUNTERS = ('hits', 'misses', 'disk_hits')
+
+
+'''
+Function to initialize a worker process. It loads its own network data and load flow engine,
+which are kept warm for all topologies evaluated by the worker, in all simulations (see ParallelEvaluator).
+'''
+def init_worker(worker_settings):
+	networks_data = networksData.NetworksData(worker_settings['sm_folder'])
+	networks_data.initialize()
+
+	cache_conf = worker_settings['cache_conf']
+	power_flow_engine = switchingAssessmentModule.power_flow_engine_in_use(worker_settings['power_flow_engine'])
+	lf_cache = loadFlowCacheModule.LoadFlowCache(loadFlowCacheModule.cache_network_hash(worker_settings['dss_folder'], power_flow_engine),
+	                                             int(cache_conf.get('tamanho_memoria', 512)), cache_conf.get('arquivo', ''))
+	sw_assessment = switchingAssessmentModule.AssessSSGAIndiv(worker_settings['dss_folder'], networks_data,
+	                                                          worker_settings['power_flow_engine'], lf_cache)
+
+	worker_state.update({'networks_data': networks_data, 'sw_assessment': sw_assessment, 'lf_cache': lf_cache,
+	                     'edge_catalog': graphModule.EdgeCatalog(worker_settings['edges'], worker_settings['initial_edges'])})
+
+
+'''
+Function to run SSGA for a given topology (bitmask of closed edges) in a worker process, with the simulation's
+SSGA settings and merit index configuration, within an optional budget (share of the GGA budget, see budgetModule).
+Returns (SSGA best individual, or None if no switching operation is necessary; number of evaluations;
+increments of the worker's load flow cache counters)
+'''
+def evaluate_topology(task):
+	edges_mask, seed, budget, settings_switching_ga, merit_index_conf = task
+	random.seed(seed) ; np.random.seed(seed % (2 ** 32))
+
+	lf_statistics = worker_state['lf_cache'].statistics()
+	edge_catalog = worker_state['edge_catalog']
+	ssga = sequentialSwitchingGAModule.SSGA(edge_catalog.graph_of(edges_mask),
+	                                        edge_catalog.initial_edges,
+	                                        settings_switching_ga,
+	                                        worker_state['sw_assessment'],
+	                                        worker_state['networks_data'],
+	                                        merit_index_conf,
+	                                        edge_catalog,
+	                                        budget)
+	best_indiv = ssga.best_indiv if ssga.run_ssga() else None
+	lf_statistics_end = worker_state['lf_cache'].statistics()
+	return best_indiv, ssga.num_evaluations, {key: lf_statistics_end[key] - lf_statistics[key] for key in LF_COUNTERS}
+
+
+'''
+Class to evaluate GGA individuals (topologies) in a pool of worker processes. Workers are started on the
+first evaluation and kept (warm) until close, so the pool can serve several simulations of the same network
+(see simuladorManobras.NetworkState). Load flow cache counters of workers are added to "lf_cache", if given.
+'''
+class ParallelEvaluator(object):
+	def __init__(self, num_workers, worker_settings, lf_cache=None):
+		self.num_workers = num_workers
+		self.worker_settings = worker_settings
+		self.lf_cache = lf_cache
+		self.pool = None
+
+
+	'''
+	Method to evaluate a list of topologies. Each task receives a seed drawn from the main
+	process random generator, so results do not depend on how tasks are scheduled.
+	If a budget is given, each topology gets a share of it, and evaluations are charged to it.
+	Output: list of SSGA best individuals (None if no switching operation is necessary)
+	'''
+	def evaluate(self, list_edges_masks, settings_switching_ga, merit_index_conf, budget=None):
+		if self.pool is None:
+			self.pool = multiprocessing.Pool(self.num_workers, init_worker, (self.worker_settings,))
+		tasks = []
+		for edges_mask in list_edges_masks:
+			share = None if budget is None else budget.share(len(list_edges_masks), self.num_workers)
+			tasks.append((edges_mask, random.getrandbits(32), share, settings_switching_ga, merit_index_conf))
+		list_results = self.pool.map(evaluate_topology, tasks, chunksize=1)
+		if budget is not None:
+			budget.add_evaluations(sum(num_evaluations for best_indiv, num_evaluations, lf_counters in list_results))
+		if self.lf_cache is not None:
+			for best_indiv, num_evaluations, lf_counters in list_results:
+				self.lf_cache.add_counters(lf_counters)
+		return [best_indiv for best_indiv, num_evaluations, lf_counters in list_results]
+
+
+	'''
+	Method to terminate worker processes
+	'''
+	def close(self):
+		if self.pool is not None:
+			self.pool.close()
+			self.pool.join()
+			self.pool = None
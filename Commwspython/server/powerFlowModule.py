@@ -0,0 +1,490 @@
+import os
+import re
+import math
+import numpy as np
+
+'''
+	Class aimed to provide load flow calculation for a given power distribution
+	network without OpenDSS. It reads the same "master.dss" file, stores the
+	network in NumPy arrays and solves it through a three-phase backward/forward
+	sweep. It exposes the same methods as dss.DSS, so it can be used in its place.
+'''
+class PowerFlow(object):
+	def __init__(self, dss_folder):
+		self.dss_folder = dss_folder
+
+		# solution settings
+		self.base_frequency = 60.
+		self.max_iterations = 50
+		self.tolerance_pu = 1.e-7
+
+		# raw network data, as read from DSS files
+		self.dict_source = {}
+		self.dict_linecodes = {}
+		self.list_lines = []
+		self.list_loads = []
+
+		# list of switches' dictionaries
+		self.list_sw_dicts = []
+
+		# list of buses' dictionaries
+		self.list_dict_buses = []
+
+		# network arrays (filled by "build_arrays")
+		self.bus_names = []
+		self.dict_bus_index = {}
+		self.dict_line_index = {}
+		self.line_enabled = None
+		self.V = None
+		self.I_lines = None
+		self.topology_changed = True
+
+
+	'''
+	Set initial settings
+	'''
+	def initialize(self, feeders_info):
+		self.dict_source = {}
+		self.dict_linecodes = {}
+		self.list_lines = []
+		self.list_loads = []
+		self.list_sw_dicts = []
+		self.read_dss_file(os.path.join(self.dss_folder, "master.dss"))
+		self.build_arrays()
+
+		# list "list_sw_dicts" with dictionaries containing switches information
+		for fd_info in feeders_info:
+			dict_sw = {'name':fd_info['prot_switch'], 'currents': [0.0, 0.0, 0.0]}
+			self.list_sw_dicts.append(dict_sw)
+
+		# gets phases strings for each switch
+		self.get_sections_phases()
+
+		# gets phases strings for each bus
+		self.get_buses_phases()
+
+
+	'''
+	Method to read a DSS script. Only the commands needed to describe the network are
+	interpreted: new/edit (circuit, linecode, line, load), set and compile/redirect.
+	'''
+	def read_dss_file(self, path_file):
+		folder = os.path.dirname(path_file)
+		with open(path_file, "r") as f:
+			for line in f:
+				# remove comments
+				pos = line.find("!")
+				if pos > -1: line = line[:pos]
+				pos = line.find("//")
+				if pos > -1: line = line[:pos]
+				line = line.strip()
+				if line == "": continue
+
+				tokens = line.split(None, 1)
+				command = tokens[0].lower()
+				args = tokens[1] if len(tokens) > 1 else ""
+
+				if command in ("compile", "redirect"):
+					self.read_dss_file(os.path.join(folder, args.strip().strip('"()')))
+				elif command in ("new", "edit"):
+					obj_tokens = args.split(None, 1)
+					obj_name = obj_tokens[0].lower()
+					if obj_name.startswith("object="): obj_name = obj_name[7:]
+					props = self.parse_properties(obj_tokens[1] if len(obj_tokens) > 1 else "")
+					self.define_element(command, obj_name, props)
+				elif command == "set":
+					props = self.parse_properties(args)
+					if 'defaultbasefrequency' in props:
+						self.base_frequency = float(props['defaultbasefrequency'])
+
+
+	'''
+	Method to split "key=value" properties of a DSS command into a dictionary
+	'''
+	def parse_properties(self, str_props):
+		props = {}
+		pattern = r'(\w+)\s*=\s*(\[[^\]]*\]|\([^)]*\)|"[^"]*"|\'[^\']*\'|\S+)'
+		for key, value in re.findall(pattern, str_props):
+			props[key.lower()] = value.strip('"\'').lower()
+		return props
+
+
+	'''
+	Method to create or edit a network element, from its DSS properties
+	'''
+	def define_element(self, command, obj_name, props):
+		elem_class = obj_name[:obj_name.find(".")]
+		elem_name = obj_name[obj_name.find(".") + 1:]
+
+		if elem_class == "circuit":
+			self.dict_source = {'name': 'source', 'bus': props.get('bus1', 'sourcebus').split(".")[0],
+			                    'basekv': float(props.get('basekv', 115.)), 'pu': float(props.get('pu', 1.)),
+			                    'angle': float(props.get('angle', 0.))}
+			r1 = float(props.get('r1', 1.65)); x1 = float(props.get('x1', 6.6))
+			r0 = float(props.get('r0', r1));  x0 = float(props.get('x0', x1))
+			self.dict_source.update({'z_matrix': self.sequence_to_phase(complex(r1, x1), complex(r0, x0))})
+
+		elif elem_class == "linecode":
+			dict_lc = self.dict_linecodes.get(elem_name, {'r1': 0.058, 'x1': 0.1206, 'r0': 0.1784, 'x0': 0.4047,
+			                                              'c1': 3.4, 'c0': 1.6, 'units': 'none'})
+			for key in ('r1', 'x1', 'r0', 'x0', 'c1', 'c0'):
+				if key in props: dict_lc[key] = float(props[key])
+			if 'units' in props: dict_lc['units'] = props['units']
+			self.dict_linecodes[elem_name] = dict_lc
+
+		elif elem_class == "line":
+			if command == "edit":
+				for dict_line in self.list_lines:
+					if dict_line['name'] == elem_name:
+						if 'enabled' in props: dict_line['enabled'] = props['enabled'] in ("true", "yes", "y", "t")
+						break
+				return
+			dict_line = {'name': elem_name, 'phases': int(props.get('phases', 3)), 'switch': False,
+			             'bus1': props.get('bus1', ''), 'bus2': props.get('bus2', ''),
+			             'enabled': props.get('enabled', 'true') in ("true", "yes", "y", "t")}
+			dict_lc = dict(self.dict_linecodes.get(props.get('linecode', ''), {'r1': 0.058, 'x1': 0.1206, 'r0': 0.1784,
+			                                       'x0': 0.4047, 'c1': 3.4, 'c0': 1.6, 'units': 'none'}))
+			length = float(props.get('length', 1.))
+			for key in ('r1', 'x1', 'r0', 'x0', 'c1', 'c0'):
+				if key in props: dict_lc[key] = float(props[key])
+			if props.get('switch', 'no') in ("true", "yes", "y", "t"):
+				# same convention as OpenDSS: switch is a tiny 1 ohm/unit section, 0.001 unit long
+				dict_lc.update({'r1': 1., 'x1': 1., 'r0': 1., 'x0': 1., 'c1': 0., 'c0': 0., 'units': 'none'})
+				length = 0.001 ; dict_line['switch'] = True
+			elif 'units' in props and dict_lc['units'] != 'none':
+				length *= self.length_factor_km(props['units']) / self.length_factor_km(dict_lc['units'])
+
+			z_matrix = self.sequence_to_phase(complex(dict_lc['r1'], dict_lc['x1']), complex(dict_lc['r0'], dict_lc['x0'])) * length
+			omega = 2. * math.pi * self.base_frequency
+			y_matrix = self.sequence_to_phase(complex(0., omega * dict_lc['c1'] * 1.e-9), complex(0., omega * dict_lc['c0'] * 1.e-9)) * length
+			dict_line.update({'z_matrix': z_matrix, 'y_half_matrix': y_matrix / 2.})
+			self.list_lines.append(dict_line)
+
+		elif elem_class == "load":
+			phases = int(props.get('phases', 3))
+			kw = float(props.get('kw', 10.))
+			if 'kvar' in props:
+				kvar = float(props['kvar'])
+			else:
+				pf = float(props.get('pf', 0.88))
+				kvar = math.copysign(kw * math.tan(math.acos(abs(pf))), pf)
+			kv = float(props.get('kv', 12.47))
+			v_base = kv * 1000. / math.sqrt(3.) if phases > 1 else kv * 1000.
+			dict_load = {'name': elem_name, 'bus1': props.get('bus1', ''), 'phases': phases,
+			             's_phase': complex(kw, kvar) * 1000. / phases, 'v_base': v_base,
+			             'vminpu': float(props.get('vminpu', 0.95)), 'vmaxpu': float(props.get('vmaxpu', 1.05))}
+			self.list_loads.append(dict_load)
+
+
+	'''
+	Method to build 3x3 phase matrix from positive and zero sequence values
+	'''
+	def sequence_to_phase(self, z1, z0):
+		zs = (2. * z1 + z0) / 3.
+		zm = (z0 - z1) / 3.
+		return np.full((3, 3), zm, dtype=complex) + np.eye(3) * (zs - zm)
+
+
+	'''
+	Method to return conversion factor from a given length unit to km
+	'''
+	def length_factor_km(self, units):
+		factors = {'km': 1., 'm': 0.001, 'kft': 0.3048, 'ft': 0.0003048, 'mi': 1.609344, 'cm': 0.00001, 'in': 0.0000254}
+		return factors.get(units, 1.)
+
+
+	'''
+	Method to split a DSS bus specification (ex: 20.1.2.3) into bus name and phase mask
+	'''
+	def bus_spec(self, spec, phases):
+		parts = spec.split(".")
+		mask = np.zeros(3, dtype=bool)
+		nodes = [int(p) for p in parts[1:] if p.isdigit() and 1 <= int(p) <= 3]
+		if len(nodes) == 0: nodes = list(range(1, min(phases, 3) + 1))
+		for node in nodes: mask[node - 1] = True
+		return parts[0], mask
+
+
+	'''
+	Method to convert network elements into NumPy arrays
+	'''
+	def build_arrays(self):
+		self.bus_names = [] ; self.dict_bus_index = {} ; list_bus_masks = []
+
+		def bus_index(spec, phases):
+			name, mask = self.bus_spec(spec, phases)
+			if name not in self.dict_bus_index:
+				self.dict_bus_index[name] = len(self.bus_names)
+				self.bus_names.append(name)
+				list_bus_masks.append(np.zeros(3, dtype=bool))
+			index = self.dict_bus_index[name]
+			list_bus_masks[index] |= mask
+			return index, mask
+
+		# source bus
+		source_index, source_mask = bus_index(self.dict_source['bus'] + ".1.2.3", 3)
+
+		# lines: terminal buses, impedance and shunt admittance matrices (with absent phases zeroed)
+		n_lines = len(self.list_lines)
+		self.line_bus1 = np.zeros(n_lines, dtype=int) ; self.line_bus2 = np.zeros(n_lines, dtype=int)
+		self.line_z = np.zeros((n_lines, 3, 3), dtype=complex) ; self.line_y_half = np.zeros((n_lines, 3, 3), dtype=complex)
+		self.line_enabled = np.zeros(n_lines, dtype=bool)
+		self.dict_line_index = {}
+		for i, dict_line in enumerate(self.list_lines):
+			self.line_bus1[i], mask = bus_index(dict_line['bus1'], dict_line['phases'])
+			self.line_bus2[i], _ = bus_index(dict_line['bus2'], dict_line['phases'])
+			mask_2d = np.outer(mask, mask)
+			self.line_z[i] = np.where(mask_2d, dict_line['z_matrix'], 0.)
+			self.line_y_half[i] = np.where(mask_2d, dict_line['y_half_matrix'], 0.)
+			self.line_enabled[i] = dict_line['enabled']
+			self.dict_line_index[dict_line['name']] = i
+
+		# loads: bus, constant power per phase and voltage limits
+		n_loads = len(self.list_loads)
+		self.load_bus = np.zeros(n_loads, dtype=int) ; self.load_s = np.zeros((n_loads, 3), dtype=complex)
+		self.load_vmin = np.zeros(n_loads) ; self.load_vmax = np.zeros(n_loads)
+		for i, dict_load in enumerate(self.list_loads):
+			self.load_bus[i], mask = bus_index(dict_load['bus1'], dict_load['phases'])
+			self.load_s[i] = np.where(mask, dict_load['s_phase'], 0.)
+			self.load_vmin[i] = dict_load['vminpu'] * dict_load['v_base']
+			self.load_vmax[i] = dict_load['vmaxpu'] * dict_load['v_base']
+		self.load_y_min = np.conj(self.load_s) / (self.load_vmin ** 2)[:, None]
+		self.load_y_max = np.conj(self.load_s) / (self.load_vmax ** 2)[:, None]
+
+		self.bus_mask = np.array(list_bus_masks, dtype=bool).reshape(len(self.bus_names), 3)
+		self.source_index = source_index
+		v_ph = self.dict_source['pu'] * self.dict_source['basekv'] * 1000. / math.sqrt(3.)
+		angles = np.radians(self.dict_source['angle'] + np.array([0., -120., 120.]))
+		self.E_source = v_ph * np.exp(1j * angles)
+		self.v_base = self.dict_source['basekv'] * 1000. / math.sqrt(3.)
+
+		self.V = np.zeros((len(self.bus_names), 3), dtype=complex)
+		self.I_lines = np.zeros((n_lines, 3), dtype=complex)
+		self.topology_changed = True
+
+
+	'''
+	Method to determine the radial structure fed by the source, considering enabled lines only.
+	Results: buses ordered by depth, upstream line of each bus and orientation of each line.
+	Enabled lines closing a loop are not part of the tree and carry no current.
+	'''
+	def determine_topology(self):
+		n_bus = len(self.bus_names)
+		adjacency = [[] for _ in range(n_bus)]
+		for i in np.flatnonzero(self.line_enabled):
+			adjacency[self.line_bus1[i]].append((i, self.line_bus2[i]))
+			adjacency[self.line_bus2[i]].append((i, self.line_bus1[i]))
+
+		self.bus_depth = np.full(n_bus, -1, dtype=int) ; self.bus_depth[self.source_index] = 0
+		self.bus_parent_line = np.full(n_bus, -1, dtype=int)
+		order = [self.source_index] ; k = 0
+		while k < len(order):
+			bus = order[k] ; k += 1
+			for line, other in adjacency[bus]:
+				if self.bus_depth[other] >= 0: continue
+				self.bus_depth[other] = self.bus_depth[bus] + 1
+				self.bus_parent_line[other] = line
+				order.append(other)
+
+		self.energized = self.bus_depth >= 0
+		self.tree_buses = np.array(order[1:], dtype=int)
+		self.tree_lines = self.bus_parent_line[self.tree_buses]
+		self.tree_parents = np.where(self.line_bus1[self.tree_lines] == self.tree_buses, self.line_bus2[self.tree_lines], self.line_bus1[self.tree_lines])
+		depths = self.bus_depth[self.tree_buses]
+		self.levels = [np.flatnonzero(depths == d) for d in range(1, depths.max() + 1)] if len(depths) > 0 else []
+		self.topology_changed = False
+
+
+	'''
+	Method to compute load currents for a given set of bus voltages
+	'''
+	def load_currents(self, V):
+		v_load = V[self.load_bus]
+		v_abs = np.abs(v_load)
+		with np.errstate(divide='ignore', invalid='ignore'):
+			i_pq = np.conj(self.load_s / v_load)
+		i_load = np.where(v_abs < self.load_vmin[:, None], self.load_y_min * v_load, i_pq)
+		i_load = np.where(v_abs > self.load_vmax[:, None], self.load_y_max * v_load, i_load)
+		i_load = np.where(v_abs > 0., i_load, 0.)
+		i_bus = np.zeros_like(V)
+		np.add.at(i_bus, self.load_bus, i_load)
+		return i_bus
+
+
+	'''
+	Command to execute power flow (backward/forward sweep). Voltages from the previous
+	solution are used as starting point (warm start).
+	'''
+	def solve_power_flow(self, show_results = False, plot_circuit = False):
+		if self.topology_changed:
+			self.determine_topology()
+
+		# warm start: keep previous voltages; newly energized buses start from source voltage
+		V = np.where(self.energized[:, None] & self.bus_mask, self.V, 0.)
+		cold = self.energized & (np.abs(V).sum(axis=1) == 0.)
+		V[cold] = np.where(self.bus_mask[cold], self.E_source, 0.)
+
+		z_tree = self.line_z[self.tree_lines] ; y_tree = self.line_y_half[self.tree_lines]
+		i_down = np.zeros((len(self.tree_lines), 3), dtype=complex)
+		i_up = np.zeros_like(i_down)
+		for iteration in range(self.max_iterations):
+			# backward sweep: accumulate currents from the deepest level up to the source
+			i_acc = self.load_currents(V)
+			for level in reversed(self.levels):
+				buses = self.tree_buses[level] ; parents = self.tree_parents[level]
+				i_down[level] = i_acc[buses] + np.einsum('kij,kj->ki', y_tree[level], V[buses])
+				i_up[level] = i_down[level] + np.einsum('kij,kj->ki', y_tree[level], V[parents])
+				np.add.at(i_acc, parents, i_up[level])
+
+			# forward sweep: update voltages from the source down to the deepest level
+			V_new = np.zeros_like(V)
+			V_new[self.source_index] = self.E_source - self.dict_source['z_matrix'] @ i_acc[self.source_index]
+			for level in self.levels:
+				buses = self.tree_buses[level] ; parents = self.tree_parents[level]
+				V_new[buses] = V_new[parents] - np.einsum('kij,kj->ki', z_tree[level], i_down[level])
+			V_new = np.where(self.bus_mask, V_new, 0.)
+
+			converged = np.max(np.abs(V_new - V)) < self.tolerance_pu * self.v_base
+			V = V_new
+			if converged: break
+
+		# element currents into terminal 1
+		self.V = V
+		self.I_lines = np.zeros((len(self.list_lines), 3), dtype=complex)
+		bus1_upstream = self.line_bus1[self.tree_lines] == self.tree_parents
+		self.I_lines[self.tree_lines] = np.where(bus1_upstream[:, None], i_up, -i_down)
+
+		if show_results:
+			self.print_results()
+
+
+	'''
+	Method to print bus voltages and line currents (debug)
+	'''
+	def print_results(self):
+		for i in range(len(self.bus_names)):
+			print(self.bus_names[i] + ": " + str(np.round(np.abs(self.V[i]) / 1000., 4)) + " kV")
+		for i in range(len(self.list_lines)):
+			print(self.list_lines[i]['name'] + ": " + str(np.round(np.abs(self.I_lines[i]), 3)) + " A")
+
+
+	'''
+	Method to get all buses' phases strings
+	'''
+	def get_buses_phases(self):
+		self.list_dict_buses = []
+		for i in range(len(self.bus_names)):
+			str_phases = "".join([ph for ph, present in zip("abc", self.bus_mask[i]) if present])
+			volt_list = [0., 0., 0.] # initially zero voltages
+			self.list_dict_buses.append({'name':self.bus_names[i], 'phases':str_phases, 'volt_list':volt_list})
+
+
+	'''
+	Method to get all sections' phases strings
+	'''
+	def get_sections_phases(self):
+		for dict_sw in self.list_sw_dicts:
+			index = self.dict_line_index.get(dict_sw['name'].lower())
+			if index is None: continue
+			bus_mask = self.bus_spec(self.list_lines[index]['bus1'], self.list_lines[index]['phases'])[1]
+			dict_sw.update({'str_phases': "".join([ph for ph, present in zip("abc", bus_mask) if present])})
+
+
+	'''
+	Method to get number of interrupted customers after
+	load flow execution
+	'''
+	def interrupted_customers(self):
+		# compute all buses' voltages, after load flow execution
+		self.get_buses_voltages()
+
+		num_interr_nodes = 0
+		for bus_info in self.list_dict_buses:
+			volt_list = bus_info['volt_list']
+			if volt_list[0] == 0.0 and volt_list[1] == 0.0 and volt_list[2] == 0.0:
+				num_interr_nodes += 1
+
+		return num_interr_nodes
+
+
+	'''
+	Method to read all nodes' voltages and store them in voltage dictionary
+	'''
+	def get_buses_voltages(self):
+		v_abs = np.round(np.abs(self.V), 2)
+		for i in range(len(self.list_dict_buses)):
+			self.list_dict_buses[i]['volt_list'][:] = v_abs[i].tolist()
+
+
+	'''
+	Method to enable/disable a line (switch)
+	'''
+	def set_line_state(self, sw_code, enabled):
+		index = self.dict_line_index.get(sw_code.lower())
+		if index is None or self.line_enabled[index] == enabled: return
+		self.line_enabled[index] = enabled
+		self.topology_changed = True
+
+
+	'''
+	Commands to open/close switches
+	'''
+	def change_sw_states(self, sw_changes):
+		for change in sw_changes:
+			self.change_single_sw_state(change)
+
+
+	'''
+	Command to open/close single switch
+	'''
+	def change_single_sw_state(self, sw_change):
+		self.set_line_state(sw_change['code'], sw_change['action'] == 'cl')
+
+
+	'''
+	Commands to restore switches initial states
+	'''
+	def restore_sw_states(self, sw_changes):
+		for change in sw_changes:
+			self.set_line_state(change['code'], change['action'] != 'cl') # reverse command
+
+
+	'''
+	Sets initially closed switches
+	'''
+	def set_initial_sw_states(self, dict_sw_states):
+		for sw_code in dict_sw_states['closed_switches']:
+			self.set_line_state(sw_code, True)
+		for sw_code in dict_sw_states['opened_switches']:
+			self.set_line_state(sw_code, False)
+
+
+	'''
+	Gets absolute values of all 3-phase computed currents
+	'''
+	def get_currents_abs(self):
+		currents = []
+		self.get_computed_currents()
+		for sw_dict in self.list_sw_dicts:
+			sw_currents = sw_dict.get('currents')
+			sw_name = sw_dict.get('name')
+			if sw_currents is None:
+				dict_sw_current = {'sw_name':sw_name, 'currents':[0.0, 0.0, 0.0]}
+			else:
+				ia = round(abs(sw_currents[0]), 3)
+				ib = round(abs(sw_currents[1]), 3)
+				ic = round(abs(sw_currents[2]), 3)
+				dict_sw_current = {'sw_name':sw_name, 'currents':[ia, ib, ic]}
+			currents.append(dict_sw_current)
+		return currents
+
+
+	'''
+	Method to get computed load flow currents, which are stored in switches dictionaries
+	'''
+	def get_computed_currents(self):
+		for sw_dict in self.list_sw_dicts:
+			index = self.dict_line_index.get(sw_dict['name'].lower())
+			if index is None: continue
+			ia, ib, ic = self.I_lines[index].tolist()
+			sw_dict.update({'currents':[ia, ib, ic]})
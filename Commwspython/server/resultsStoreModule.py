@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import sqlite3
+
+
+'''
+Function to get the path of the results store (and of its legacy text file) of a Dat folder
+Output: (path of the SQLite file, path of the text file)
+'''
+def results_paths(path_dat_folder, self_healing):
+	if self_healing == 1:
+		path_base = path_dat_folder + "/DMS/DadosSimulacoesManobraSH/bancoresultados_smsh"
+	else:
+		path_base = path_dat_folder + "/DMS/DadosSimulacoesManobra/bancoresultados_sm"
+	return os.path.normpath(path_base + ".db"), os.path.normpath(path_base + ".txt")
+
+
+'''
+Class to store simulation results (return data) in a SQLite file in WAL mode. Each result is
+appended as a new row, indexed by ID, ID_PLANO and timestamp, so storing a result does not depend on
+the size of the history, and several processes may write at the same time.
+The legacy text file (one JSON per line, newest first) is produced on demand by export_text.
+'''
+class ResultsStore(object):
+	def __init__(self, path_file, path_legacy_text_file=None):
+		self.db = sqlite3.connect(path_file, timeout=30.)
+		self.db.execute("PRAGMA journal_mode=WAL")
+		self.db.execute("PRAGMA synchronous=NORMAL")
+		self.db.execute("CREATE TABLE IF NOT EXISTS results (seq INTEGER PRIMARY KEY AUTOINCREMENT, id_sm INTEGER, "
+		                "id_plano INTEGER, timestamp REAL NOT NULL, data TEXT NOT NULL)")
+		self.db.execute("CREATE INDEX IF NOT EXISTS idx_results_id ON results (id_sm, id_plano)")
+		self.db.execute("CREATE INDEX IF NOT EXISTS idx_results_timestamp ON results (timestamp)")
+		self.db.commit()
+
+		# history of the legacy text file is imported when the store is created (empty store)
+		if path_legacy_text_file and os.path.isfile(path_legacy_text_file):
+			self.import_text(path_legacy_text_file)
+
+
+	'''
+	Method to append a result (return data dict)
+	'''
+	def append(self, dict_return_data, timestamp=None):
+		if timestamp is None:
+			timestamp = time.time()
+		with self.db:
+			self.db.execute("INSERT INTO results (id_sm, id_plano, timestamp, data) VALUES (?, ?, ?, ?)",
+			                (dict_return_data.get('ID'), dict_return_data.get('ID_PLANO'), timestamp, json.dumps(dict_return_data)))
+
+
+	'''
+	Method to get results of a simulation (all plans if id_plano is None), newest first
+	'''
+	def get(self, id_sm, id_plano=None):
+		if id_plano is None:
+			rows = self.db.execute("SELECT data FROM results WHERE id_sm = ? ORDER BY seq DESC", (id_sm,))
+		else:
+			rows = self.db.execute("SELECT data FROM results WHERE id_sm = ? AND id_plano = ? ORDER BY seq DESC", (id_sm, id_plano))
+		return [json.loads(row[0]) for row in rows]
+
+
+	'''
+	Method to get results stored in a time interval (timestamps in seconds since epoch), newest first
+	'''
+	def get_interval(self, start_time, end_time):
+		rows = self.db.execute("SELECT data FROM results WHERE timestamp >= ? AND timestamp <= ? ORDER BY seq DESC", (start_time, end_time))
+		return [json.loads(row[0]) for row in rows]
+
+
+	'''
+	Method to import a legacy text file (newest first), keeping its order. Nothing is imported if the
+	store already has results (e.g., imported by another process).
+	'''
+	def import_text(self, path_text_file):
+		if self.db.execute("SELECT 1 FROM results LIMIT 1").fetchone() is not None:
+			return
+		with open(path_text_file, "r") as f:
+			lines = [line for line in f if line.strip()]
+		mtime = os.path.getmtime(path_text_file)
+		with self.db:
+			self.db.execute("BEGIN IMMEDIATE")
+			if self.db.execute("SELECT 1 FROM results LIMIT 1").fetchone() is not None:
+				return
+			for line in reversed(lines):
+				dict_return_data = json.loads(line)
+				self.db.execute("INSERT INTO results (id_sm, id_plano, timestamp, data) VALUES (?, ?, ?, ?)",
+				                (dict_return_data.get('ID'), dict_return_data.get('ID_PLANO'), mtime, line.rstrip("\n")))
+
+
+	'''
+	Method to export the results to a text file in the legacy format (one JSON per line, newest first)
+	'''
+	def export_text(self, path_text_file):
+		path_tmp_file = path_text_file + ".tmp"
+		with open(path_tmp_file, "w") as f:
+			for row in self.db.execute("SELECT data FROM results ORDER BY seq DESC"):
+				f.write(row[0] + "\n")
+		os.replace(path_tmp_file, path_text_file)
+
+
+	'''
+	Method to release the store
+	'''
+	def close(self):
+		if self.db is not None:
+			self.db.close()
+			self.db = None
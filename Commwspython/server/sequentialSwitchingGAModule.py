@@ -1,11 +1,17 @@
 
 import random
-import itertools
+import numpy as np
 import graphModule
 import switchingAssessmentModule
+import instrumentationModule
+import logModule
+import logging
 import time
 
 
+logger = logModule.get_logger("ssga")
+
+
 ''' 
 Class to represent optimal switching Genetic Algorithm Individuals
 '''
@@ -13,13 +19,14 @@ Class to represent optimal switching Genetic Algorithm Individuals
 
 class IndivSS:
 	def __init__(self):
-		self.random_keys_list = []
+		self.order_keys = None  # indexes of switches to be closed, sorted by random keys (row of SSGA.keys_matrix)
 		self.fitness = {'FF': 0.0, 'LF_MI': 0.0, 'CD_MI': 0.0, 'OD_MI': 0.0, 'NS_MI': 0.0}
 		self.sw_pairs_cl_op = []           # Sintax: [[[u_cl,v_cl,w_cl],[u_op,v_op,w_op], ...]
 		self.sw_dicts_pairs_cl_op = []     # Sintax: [{'sw_code':[u,v,w], 'action':'op'}, ...]
 		self.dicts_sw_changes = []         # Sintax: {'code':sw_code, 'action':'op'}), following cl(reconn), [cl,op], [cl,op], ...
 		self.dicts_sw_inv_changes = []     # Sintax: {'code':sw_code, 'action':'op'}), following cl(reconn), [op,cl], [op,cl], ...
 		self.effective_dicts_sw_inv_changes = []  # Sintax: {'code':sw_code, 'action':'op'}), following cl(reconn), [op,cl], [op,cl], ...
+		self.evaluated = False             # fitness already computed (individuals are evaluated only once)
 
 ''' 
 Main class, aimed to implement the SSGA (SEQUENTIAL SWITCHING GENETIC ALGORITHM) 
@@ -27,7 +34,7 @@ Main class, aimed to implement the SSGA (SEQUENTIAL SWITCHING GENETIC ALGORITHM)
 
 
 class SSGA:
-	def __init__(self, graph, initial_edges, SSGA_settings, sw_assessment, networks_data, merit_index_conf):
+	def __init__(self, graph, initial_edges, SSGA_settings, sw_assessment, networks_data, merit_index_conf, edge_catalog=None, budget=None):
 		# all data concerning networks
 		self.networks_data = networks_data
 
@@ -44,12 +51,16 @@ class SSGA:
 
 		# local variables
 		self.initial_edges = initial_edges
+		if edge_catalog is None:
+			edge_catalog = graphModule.EdgeCatalog(graph.graph, initial_edges)
+		self.edge_catalog: graphModule.EdgeCatalog = edge_catalog  # catalog of candidate edges (bitmask representation)
 		self.initial_graph_data = {"vertices":[], "edges":[]}
 		self.final_graph_data = {"vertices":[], "edges":[]}
 		self.list_closed_switches = []  # (1) switches closed (initially opened ==> finally closed)
 		self.list_opened_switches = []  # (2) switches opened (initially closed ==> finally opened)
 		self.list_cl_op_sw = []         # (1) + (2)
 		self.list_ga_individuals = []   # list of GA individuals
+		self.keys_matrix = None         # random keys of all individuals (row i: self.list_ga_individuals[i])
 
 		# Sw. Sequencing GA settings
 		self.SSGA_settings = SSGA_settings
@@ -58,29 +69,57 @@ class SSGA:
 		self.num_individuals = SSGA_settings.get('num_individuals')
 		self.pc = SSGA_settings.get('pc')
 		self.pm = SSGA_settings.get('pm')
+		self.num_offspring = SSGA_settings.get('num_offspring', self.num_individuals)  # offspring per generation
+		self.selection = SSGA_settings.get('selection', 'tournament')  # parents' selection: 'tournament' or 'rank'
+		self.tournament_size = SSGA_settings.get('tournament_size', 2)
 		self.min_porc_fitness = SSGA_settings.get('min_porc_fitness')
 		self.start_switch = SSGA_settings.get('start_switch').lower()
 
+		# random keys generator (seeded from python's random module state, so each SSGA run gets its own stream)
+		self.rng = np.random.default_rng(random.getrandbits(64))
+
+		# optional computational budget (see budgetModule): generations stop when it is exhausted
+		self.budget = budget
+		self.num_evaluations = 0
+
 		# overall best individual
 		self.best_indiv = {'sw': None, 'sw_codes': None, 'sw_inv_codes': None, 'effective_dicts_sw_inv_changes': None, 'fitness': 0.0, 'fitness_components': {}}
 
 
 	'''
 	Method to convert a vector of random keys into an ordered list of switches supposed to be closed.
-	Ex: vector_random_keys: [0.25, 0.15, 0.98], aux_vector.sort() ==> [0.15, 0.25, 0.98], edges sequence: [1, 0, 2]
+	Ex: vector_random_keys: [0.25, 0.15, 0.98], argsort ==> edges sequence: [1, 0, 2]
 	'''
 	def random_keys_to_edge(self, vector_random_keys, lisEXT):
-		# 1 - Copy original list of random keys
-		aux_vector = vector_random_keys.copy()
+		for index in np.argsort(vector_random_keys, kind='stable'):
+			lisEXT.append(self.list_closed_switches[index])
+
+
+	'''
+	Method to decode the given individuals (rows) at once: each row of self.keys_matrix is sorted (argsort),
+	providing the sequence of switches to be closed. Ties keep the original order.
+	'''
+	def decode_individuals(self, rows):
+		with instrumentationModule.stage('decode'):
+			matrix_order = np.argsort(self.keys_matrix[rows], axis=1, kind='stable')
+			for i, order_keys in zip(rows, matrix_order):
+				self.list_ga_individuals[i].order_keys = order_keys
+
+
+	'''
+	Method to keep only the given rows of the population (list of individuals and random keys matrix)
+	'''
+	def keep_individuals(self, rows):
+		self.list_ga_individuals = [self.list_ga_individuals[i] for i in rows]
+		self.keys_matrix = self.keys_matrix[rows]
 
-		# 2 - Sort random keys in ascending order
-		aux_vector.sort()
 
-		# 3 - Pick edges to be closed, according to random keys indices in
-		# original list
-		for r_key in aux_vector:
-			index = vector_random_keys.index(r_key) ; edge = self.list_closed_switches[index]
-			lisEXT.append(edge)
+	'''
+	Method to sort individuals in terms of their fitness function (ascending order)
+	'''
+	def sort_individuals(self):
+		rows = sorted(range(len(self.list_ga_individuals)), key=lambda i: self.list_ga_individuals[i].fitness['FF'])
+		self.keep_individuals(rows)
 
 
 	'''
@@ -89,12 +128,9 @@ class SSGA:
 	def debug_print_individuals(self):
 		# print("Individuals' chromosomes:")
 		for i in range(len(self.list_ga_individuals)):
-			indiv = self.list_ga_individuals[i]
-			linha = ""
-			for gene in indiv.random_keys_list:
-				linha += str(gene) + " "
+			linha = " ".join(str(gene) for gene in self.keys_matrix[i])
 			closing_switches = []
-			self.random_keys_to_edge(indiv.random_keys_list, closing_switches)
+			self.random_keys_to_edge(self.keys_matrix[i], closing_switches)
 
 
 	''' 
@@ -123,8 +159,9 @@ class SSGA:
 			self.best_indiv['fitness_components'] = best_indiv['fitness_components']
 			return True
 
-		# Compute fitness function for each individual
+		# Compute fitness function for each individual. Population is kept sorted by fitness function
 		best_indiv = self.evaluate_ssga_individuals()
+		self.sort_individuals()
 
 		# Renew overall best individual
 		if self.best_indiv['sw'] is None or best_indiv['fitness'] < self.best_indiv['fitness']:
@@ -134,11 +171,12 @@ class SSGA:
 			self.best_indiv['effective_dicts_sw_inv_changes'] = best_indiv['effective_dicts_sw_inv_changes']
 			self.best_indiv['fitness_components'] = best_indiv['fitness_components']
 
-		# Iterate over generations
+		# Iterate over generations (while there is budget; initial population is always evaluated)
 		for i in range(self.num_generations):
+			if self.budget is not None and self.budget.expired():
+				break
 			# print("   SSGA generation #" + str(i+1))
-			self.mutation()
-			self.crossover()		
+			self.reproduction()
 			best_indiv = self.evaluate_ssga_individuals()
 
 			# select best individuals
@@ -158,26 +196,41 @@ class SSGA:
 		return True
 
 
+	'''
+	Method to estimate the fitness function of the final graph cheaply, without GA generations (screening of
+	topologies, see GraphGA.local_search): a single individual (switches closed in catalog order) is assessed
+	by LF, NS and CD merit indexes only. Returns None if no switching operation is necessary (or if the
+	switching sequence is invalid).
+	'''
+	def screen(self):
+		if not self.determine_necessary_switchings():
+			return None
+		self.list_ga_individuals = [IndivSS()]
+		self.keys_matrix = np.arange(len(self.list_closed_switches), dtype=float).reshape(1, -1)
+		self.assign_individuals_switching_operations()
+		if len(self.list_ga_individuals) == 0 or self.list_ga_individuals[0].sw_dicts_pairs_cl_op is None:
+			return None
+
+		ssga_indiv = self.list_ga_individuals[0]
+		with instrumentationModule.stage('LF_MI'):
+			LF_MI = self.compute_final_state_load_flow_merit_index(ssga_indiv)
+		NS_MI = self.compute_number_of_switchings_merit_index(ssga_indiv)
+		with instrumentationModule.stage('CD_MI'):
+			CD_MI, list_displ_times = self.sw_assessment.crew_displacement_merit_indexes(self.start_switch, [ssga_indiv.dicts_sw_inv_changes])[0]
+		self.compute_total_merit_index(ssga_indiv, LF_MI, CD_MI, 0., NS_MI)
+		return ssga_indiv.fitness['FF']
+
+
 	''' 
 	Method to pick generation's best SSGA individuals
 	'''
 	def ssga_selection(self):
 		# sort list of individuals in terms of their fitness function
-		self.list_ga_individuals.sort(reverse=False, key=self.f_indiv_fitness)
+		self.sort_individuals()
 
 		# take N best individuals, where N = num_individuals
-		while len(self.list_ga_individuals) > self.num_individuals:
-			obj_delete = self.list_ga_individuals[len(self.list_ga_individuals) - 1]
-			self.list_ga_individuals.remove(obj_delete)
-			del obj_delete
-		# if len(self.list_ga_individuals) > self.num_individuals:
-		# 	n_delete = len(self.list_ga_individuals) - self.num_individuals
-		# 	N_total = len(self.list_ga_individuals)
-		# 	for i in range(n_delete):
-		# 		indice = N_total - i - 1
-		# 		obj_delete = self.list_ga_individuals[indice]
-		# 		self.list_ga_individuals.remove(obj_delete)
-		# 		del obj_delete
+		if len(self.list_ga_individuals) > self.num_individuals:
+			self.keep_individuals(list(range(self.num_individuals)))
 
 
 	''' 
@@ -189,18 +242,13 @@ class SSGA:
 
 	'''
 	Method to generate initial population of SSGA individuals. Each individual has the following parameters:
-	random_keys_list, fitness_function
+	random keys (row of self.keys_matrix), fitness_function
 	'''
 	def initialize_individuals(self):
-		for i in range(self.num_individuals):
-			indiv = IndivSS()
-			self.list_ga_individuals.append(indiv)
-
-			# It resorts of RANDOM KEYS strategy to encode switching sequence.
-			# For each edge to be closed, a random number from [0,1] is appended to
-			# list: "random_keys_list"
-			for j in range(len(self.list_closed_switches)):
-				indiv.random_keys_list.append(random.random())
+		# It resorts of RANDOM KEYS strategy to encode switching sequence.
+		# For each edge to be closed, a random number from [0,1) is assigned (one column per edge)
+		self.list_ga_individuals = [IndivSS() for i in range(self.num_individuals)]
+		self.keys_matrix = self.rng.random((self.num_individuals, len(self.list_closed_switches)))
 
 
 	'''
@@ -238,9 +286,8 @@ class SSGA:
 			return
 
 		# 2 - Switching sequence (SS) has to be determined
-		list_edges_close = []  # list of edges to be closed
+		list_edges_close = [self.list_closed_switches[index] for index in ssga_indiv.order_keys]  # list of edges to be closed
 		list_edges_open = [] # list of edges to be opened
-		self.random_keys_to_edge(ssga_indiv.random_keys_list, list_edges_close)
 
 		# 3 - Initialize Graph object to assist the SS simulation
 		graph_simulation = graphModule.Graph(self.graph.V)
@@ -281,11 +328,15 @@ class SSGA:
 
 
 	'''
-	Method to assign all necessary switching operations to SSGA individuals
+	Method to assign all necessary switching operations to SSGA individuals not evaluated yet
 	'''
 	def assign_individuals_switching_operations(self):
+		# Decode random keys of new individuals
+		list_new = [i for i, ssga_indiv in enumerate(self.list_ga_individuals) if not ssga_indiv.evaluated]
+		self.decode_individuals(list_new)
 
-		for i in reversed(range(len(self.list_ga_individuals))):
+		list_removed = []
+		for i in reversed(list_new):
 			ssga_indiv = self.list_ga_individuals[i]
 
 			# 1 - Determine switchings (based on disturbance technique chromosome)
@@ -300,17 +351,18 @@ class SSGA:
 
 			# 3 - If there is some problem with individual's SS
 			if ssga_indiv.sw_dicts_pairs_cl_op is None:
-				self.list_ga_individuals.remove(ssga_indiv)
-				del ssga_indiv
+				list_removed.append(i)
+
+		if len(list_removed) > 0:
+			self.keep_individuals([i for i in range(len(self.list_ga_individuals)) if i not in list_removed])
 
 
 	'''
 	Method to compute LF_MI (Load flow merit index), based solely on initial and final states.
 	'''
-	def compute_final_state_load_flow_merit_index(self):
+	def compute_final_state_load_flow_merit_index(self, ssga_indiv):
 
-		# 1 - Pick one SSGA individual
-		ssga_indiv = self.list_ga_individuals[0]
+		# 1 - Switching operations of one SSGA individual (all individuals lead to the same final state)
 		dicts_sw_changes = ssga_indiv.dicts_sw_changes
 
 		# 2 - Determine initial states dictionary
@@ -327,25 +379,20 @@ class SSGA:
 		- Number of total manual switching operations;
 		- Number of total automatic switching operations;
 	'''
-	def compute_number_of_switchings_merit_index(self):
-		# 1 - Pick one individual (the 1st one, for instante)
-		ssga_indiv = self.list_ga_individuals[0]
+	def compute_number_of_switchings_merit_index(self, ssga_indiv):
+		# 1 - Switching operations of one individual (all individuals perform the same switchings)
 
 		# 2 - Determine numbers of manual and automatic swtiching operations
 		number_sw_manual = 0
 		number_sw_auto = 0
 		for change in ssga_indiv.dicts_sw_changes:
-			sw_code = change['code']
-
-			# Based on all switches register, search for switch's type.
-			sw_register = self.networks_data.get_list_switches()
-			for sw in sw_register:
-				if sw['code_sw'] != sw_code: continue
-				if sw['type_sw'] == 'disjuntor' or sw['type_sw'] == 'religadora':
-					number_sw_auto += 1
-				else:
-					number_sw_manual += 1
-				break
+			# Based on switches' index, search for switch's type.
+			sw_index = self.networks_data.switch_index(change['code'])
+			if sw_index is None: continue
+			if self.networks_data.array_switch_automated[sw_index]:
+				number_sw_auto += 1
+			else:
+				number_sw_manual += 1
 
 		# 3 - Compute NS_MI
 		max_sw_operations = 30
@@ -360,79 +407,103 @@ class SSGA:
 
 
 	'''
-	Method to compute fitness function of SSGA individuals. It is based on simulations that reproduce the
-	effects of the investigated switching steps.
+	Method to compute fitness function of SSGA individuals not evaluated yet (individuals kept from previous
+	generations are not evaluated again). It is based on simulations that reproduce the effects of the
+	investigated switching steps. Returns the best individual of the population.
 	'''
 	def evaluate_ssga_individuals(self):
 		best_indiv = {'sw': None, 'sw_codes': None, 'sw_inv_codes': None, 'effective_dicts_sw_inv_changes': None, 'fitness': 0.0, 'fitness_components': {}}
 
-		# 1 - Preparation: assign all necessary switching operations to individuals
+		# 1 - Preparation: assign all necessary switching operations to new individuals
 		self.assign_individuals_switching_operations()
+		list_new = [i for i, ssga_indiv in enumerate(self.list_ga_individuals) if not ssga_indiv.evaluated]
+		self.num_evaluations += len(list_new)
+		if self.budget is not None:
+			self.budget.add_evaluations(len(list_new))
+		if len(list_new) > 0:
+			self.evaluate_new_individuals(list_new)
+
+		# 2 - Best SSGA individual of the population (new and previously evaluated individuals)
+		for ssga_indiv in self.list_ga_individuals:
+			if best_indiv['sw'] is None or ssga_indiv.fitness['FF'] < best_indiv['fitness']:
+				best_indiv['sw'] = ssga_indiv.sw_pairs_cl_op
+				best_indiv['sw_codes'] = ssga_indiv.dicts_sw_changes
+				best_indiv['sw_inv_codes'] = ssga_indiv.dicts_sw_inv_changes
+				best_indiv['effective_dicts_sw_inv_changes'] = ssga_indiv.effective_dicts_sw_inv_changes
+				best_indiv['fitness'] = ssga_indiv.fitness['FF']
+				best_indiv['fitness_components'] = ssga_indiv.fitness
+		if logger.isEnabledFor(logging.DEBUG):
+			self.log_individuals()
+
+		return best_indiv
+
+
+	'''
+	Method to compute merit indexes and fitness function of the given individuals (rows)
+	'''
+	def evaluate_new_individuals(self, list_new):
+		list_new_indiv = [self.list_ga_individuals[i] for i in list_new]
 
 		# 2 - Compute load flow merit index, which depends solely on initial and final states.
 		# Then, a unique load flow to assess final state loading is enough.
-		LF_MI = self.compute_final_state_load_flow_merit_index()
+		with instrumentationModule.stage('LF_MI'):
+			LF_MI = self.compute_final_state_load_flow_merit_index(list_new_indiv[0])
 
 		# 3 - Compute number of switching operations merit index
-		NS_MI = self.compute_number_of_switchings_merit_index()
+		NS_MI = self.compute_number_of_switchings_merit_index(list_new_indiv[0])
 
-		for i in reversed(range(len(self.list_ga_individuals))):
-			ssga_indiv = self.list_ga_individuals[i]
+		if self.auxiliary_switching:
+			logger.debug(" \n ------- Considering aux switching")
+		else:
+			logger.debug(" \n ------- Disconsidering aux switching")
+
+		# 4 - Compute crew displacement merit index (all individuals at once)
+		with instrumentationModule.stage('CD_MI'):
+			list_crew_displacement = self.sw_assessment.crew_displacement_merit_indexes(self.start_switch, [ssga_indiv.dicts_sw_inv_changes for ssga_indiv in list_new_indiv])
 
-			# 4 - Compute crew displacement merit index
-			CD_MI, list_displ_times = self.sw_assessment.crew_displacement_merit_index(self.start_switch, ssga_indiv.dicts_sw_inv_changes)
+		all_init_closed_edges = self.networks_data.all_edges()[1]
+		for i in reversed(range(len(list_new_indiv))):
+			ssga_indiv = list_new_indiv[i]
+			CD_MI, list_displ_times = list_crew_displacement[i]
 
 			# 5 - Check if it is necessary to include auxiliary operations, such as opening upstreams recloser or circuit breaker
 			effective_dicts_sw_inv_changes = list()  # list to store effective sw sequence
 			if self.auxiliary_switching:  # option to consider auxiliary switching operations
-				print(" \n ------- Considering aux switching")
-				all_available_edges, all_init_closed_edges = self.networks_data.all_edges()
-				self.sw_assessment.determine_auxiliary_sw_operations(ssga_indiv.dicts_sw_inv_changes, all_available_edges, all_init_closed_edges, effective_dicts_sw_inv_changes)
+				with instrumentationModule.stage('aux_switching'):
+					self.sw_assessment.determine_auxiliary_sw_operations(ssga_indiv.dicts_sw_inv_changes, all_init_closed_edges, effective_dicts_sw_inv_changes)
 			else:  # option to not consider auxiliary switching operations
-				print(" \n ------- Disconsidering aux switching")
-				all_available_edges, all_init_closed_edges = self.networks_data.all_edges()
 				self.keep_init_switchings(ssga_indiv.dicts_sw_inv_changes, effective_dicts_sw_inv_changes)
 
 			ssga_indiv.effective_dicts_sw_inv_changes = effective_dicts_sw_inv_changes
 
 
 			# 6 - Compute outage duration merit index (power interruption during switching procedure)
-			vertice_dicts = self.networks_data.list_vertices_dicts
-			OD_MI = self.sw_assessment.outage_duration_merit_index(ssga_indiv.dicts_sw_inv_changes, list_displ_times, all_available_edges, all_init_closed_edges, vertice_dicts)
+			with instrumentationModule.stage('OD_MI'):
+				OD_MI = self.sw_assessment.outage_duration_merit_index(ssga_indiv.dicts_sw_inv_changes, list_displ_times, all_init_closed_edges)
 
 			# 7 - Compute SSGA individual total merit index
 			self.compute_total_merit_index(ssga_indiv, LF_MI, CD_MI, OD_MI, NS_MI)
+			ssga_indiv.evaluated = True
 
-			# 8 - Update best SSGA individual
-			if best_indiv['sw'] is None or ssga_indiv.fitness['FF'] < best_indiv['fitness']:
-				best_indiv['sw'] = ssga_indiv.sw_pairs_cl_op
-				best_indiv['sw_codes'] = ssga_indiv.dicts_sw_changes
-				best_indiv['sw_inv_codes'] = ssga_indiv.dicts_sw_inv_changes
-				best_indiv['effective_dicts_sw_inv_changes'] = ssga_indiv.effective_dicts_sw_inv_changes
-				best_indiv['fitness'] = ssga_indiv.fitness['FF']
-				best_indiv['fitness_components'] = ssga_indiv.fitness
-		#debug
-		print("\n")
-		print("     SSGA evaluation: ")
-		self.list_ga_individuals.sort(reverse=False, key=self.f_indiv_fitness)
+
+	'''
+	Debug method to log evaluated individuals, sorted by fitness function (population order is kept)
+	'''
+	def log_individuals(self):
+		logger.debug("\n\n     SSGA evaluation: ")
+		list_sorted = sorted(self.list_ga_individuals, key=self.f_indiv_fitness)
 		sum_fitness = 0.0
 		n_max = self.num_individuals
-		for i in range(len(self.list_ga_individuals)):
-			ssga_indiv = self.list_ga_individuals[i]
+		for i, ssga_indiv in enumerate(list_sorted):
 			if i < n_max:
 				sum_fitness += ssga_indiv.fitness['FF']
-				print("     #" + str(i + 1) + " - Fitness: " + str(round(ssga_indiv.fitness['FF'], 6)) + " - " + str(ssga_indiv.effective_dicts_sw_inv_changes))
+				logger.debug("     #%d - Fitness: %s - %s", i + 1, round(ssga_indiv.fitness['FF'], 6), ssga_indiv.effective_dicts_sw_inv_changes)
 			else:
-				print("     #" + str(i+1) + " - Fitness: " + str(round(ssga_indiv.fitness['FF'], 6)))
+				logger.debug("     #%d - Fitness: %s", i + 1, round(ssga_indiv.fitness['FF'], 6))
 		avg_fitness = sum_fitness / n_max
-		diff = round(100. * (avg_fitness - self.list_ga_individuals[0].fitness['FF']) / self.list_ga_individuals[0].fitness['FF'], 5)
-		texto  = "     MEDIA (melhores): " + str(round(avg_fitness, 4))
-		texto += " - MINIMO: " + str(round(self.list_ga_individuals[0].fitness['FF'], 4))
-		texto += " - DIFF(%): " + str(diff)
-		print(texto)
-		print("\n")
-
-		return best_indiv
+		min_fitness = list_sorted[0].fitness['FF']
+		diff = round(100. * (avg_fitness - min_fitness) / min_fitness, 5) if min_fitness != 0. else 0.
+		logger.debug("     MEDIA (melhores): %s - MINIMO: %s - DIFF(%%): %s\n", round(avg_fitness, 4), round(min_fitness, 4), diff)
 
 
 	'''
@@ -480,8 +551,9 @@ class SSGA:
 		for edge_set in self.initial_graph_data["edges"]:
 			sw = self.get_sw_code(list(edge_set))
 			closed_switches.append(sw)
+		set_closed_switches = set(closed_switches)
 		for sw in all_switches:
-			if sw not in closed_switches:
+			if sw not in set_closed_switches:
 				opened_switches.append(sw)
 		return {'closed_switches':closed_switches, 'opened_switches':opened_switches}
 
@@ -530,68 +602,73 @@ class SSGA:
 	def get_sw_code(self, edge):
 		if edge is None: return ""
 
-		# Get edge's vertices 'u' and 'v'
-		u = int(edge[0]) ; v = int(edge[1])
-
-		# Searche for [u,v] in list of network's graph topology
-		list_edges = self.networks_data.get_list_edges()
-		for edge_dict in list_edges:
-			if edge_dict['vertice_1'] == u and edge_dict['vertice_2'] == v:
-				return edge_dict['code_sw']
-			elif edge_dict['vertice_1'] == v and edge_dict['vertice_2'] == u:
-				return edge_dict['code_sw']
-		return ""
+		# Search for [u,v] in index of network's graph topology
+		return self.networks_data.switch_code_of_edge(edge[0], edge[1])
 
 
 	'''
-	Method to execute SSGA MUTATION operator
+	Method to generate the offspring of a generation ("num_offspring" individuals, all at once). For each child,
+	parents are picked by tournament or rank selection; crossover happens with probability pc (otherwise the
+	child is a copy of the 1st parent), then its genes are mutated with probability pm. Parents are kept
+	unchanged (and are not evaluated again); ssga_selection keeps the best of parents + offspring (elitism).
 	'''
-	def mutation(self):
-		for indiv in self.list_ga_individuals:
-			for i in range(len(indiv.random_keys_list)):
-				# randomly decides if the gene suffers mutation
-				if random.random() < self.pm:
-					indiv.random_keys_list[i] = random.random()
+	def reproduction(self):
+		num_indiv, num_genes = self.keys_matrix.shape
+		if num_indiv == 0 or num_genes == 0 or self.num_offspring <= 0:
+			return
+		parents1 = self.select_parents(self.num_offspring)
+		children_keys = self.keys_matrix[parents1]
+
+		# crossover
+		crossover_rows = np.flatnonzero(self.rng.random(self.num_offspring) <= self.pc)
+		if len(crossover_rows) > 0:
+			parents2 = self.select_parents(len(crossover_rows))
+			if num_genes == 1: # if one-gene-long chromosome, simply exchange
+				children_keys[crossover_rows] = self.keys_matrix[parents2]
+			else:
+				# randomly choose crossover initial positions, then generate individuals containing mixed characteristics
+				crossover_initial_indexes = self.rng.integers(1, num_genes + 1, size=len(crossover_rows))
+				children_keys[crossover_rows] = self.crossover_children_keys(parents1[crossover_rows], parents2, crossover_initial_indexes)
+
+		self.mutation(children_keys)
+		self.list_ga_individuals.extend(IndivSS() for i in range(self.num_offspring))
+		self.keys_matrix = np.vstack((self.keys_matrix, children_keys))
 
 
 	'''
-	Method to execute SSGA CROSSOVER operator
+	Method to pick "num_parents" parents (rows of the keys matrix) among evaluated individuals:
+		- 'tournament': best of "tournament_size" individuals picked at random;
+		- 'rank': individuals picked with probability proportional to (N - rank), rank 0 being the best.
 	'''
-	def crossover(self):
-		indexes = list(range(len(self.list_ga_individuals)))
-		indexes_pairs = list(itertools.combinations(indexes, 2)) # pairs of indexes
-		for pair in indexes_pairs:
-			if random.random() > self.pc:
-				continue
+	def select_parents(self, num_parents):
+		array_fitness = np.array([ssga_indiv.fitness['FF'] for ssga_indiv in self.list_ga_individuals])
+		num_indiv = len(array_fitness)
+		if self.selection == 'rank':
+			weights = np.empty(num_indiv)
+			weights[np.argsort(array_fitness, kind='stable')] = np.arange(num_indiv, 0, -1)
+			return self.rng.choice(num_indiv, size=num_parents, p=weights / weights.sum())
+		candidates = self.rng.integers(0, num_indiv, size=(num_parents, min(self.tournament_size, num_indiv)))
+		return candidates[np.arange(num_parents), np.argmin(array_fitness[candidates], axis=1)]
 
-			indiv1 = self.list_ga_individuals[pair[0]]
-			indiv2 = self.list_ga_individuals[pair[1]]
-			num_genes = len(indiv1.random_keys_list)
 
-			if num_genes == 1: # if one-gene-long chromosome, simply exchange
-				gene_aux = indiv1.random_keys_list[0]
-				indiv1.random_keys_list[0] = indiv2.random_keys_list[0]
-				indiv2.random_keys_list[0] = gene_aux
-			else:
-				# randomly choose crossover initial position
-				crossover_initial_index = random.randint(1, num_genes)
-				# generate individual containing mixed characteristics
-				child_indiv = self.crossover_child_indiv(indiv1, indiv2, crossover_initial_index)
-				self.list_ga_individuals.append(child_indiv)
+	'''
+	Method to execute SSGA MUTATION operator on the given random keys (in place)
+	'''
+	def mutation(self, keys_matrix):
+		# randomly decides which genes suffer mutation (all individuals at once)
+		mask = self.rng.random(keys_matrix.shape) < self.pm
+		keys_matrix[mask] = self.rng.random(int(mask.sum()))
 
 
 	'''
-	Method to provide child indiv (of class IndivSS) resulting from crossover operation between indiv1 and indiv2. 
-	crossover_initial_index: position index related to SSGA chromosome where crossover will take place
+	Method to provide random keys of children resulting from crossover operations between rows indexes1 and indexes2
+	of the keys matrix (one-point crossover, all pairs at once).
+	crossover_initial_indexes: position indexes related to SSGA chromosome where crossover will take place
 	'''
-	def crossover_child_indiv(self, indiv1, indiv2, crossover_initial_index):
-		new_indiv = IndivSS()
-		for i in range(len(indiv1.random_keys_list)):
-			if i < crossover_initial_index:
-				new_indiv.random_keys_list.append(indiv1.random_keys_list[i])
-			else:
-				new_indiv.random_keys_list.append(indiv2.random_keys_list[i])
-		return new_indiv
+	def crossover_children_keys(self, indexes1, indexes2, crossover_initial_indexes):
+		genes = np.arange(self.keys_matrix.shape[1])
+		mask = genes[np.newaxis, :] < crossover_initial_indexes[:, np.newaxis]
+		return np.where(mask, self.keys_matrix[indexes1], self.keys_matrix[indexes2])
 
 
 	''' 
@@ -615,15 +692,15 @@ class SSGA:
 			self.final_graph_data["edges"].append({edge[0], edge[1]})		# appends edge as set to avoid duplicity	
 		self.final_graph_data["vertices"] = list(set_vertices_final_graph)
 
-		# 3 - Get closed and opened switches
-		for edge in self.final_graph_data["edges"]:
-			if edge not in self.initial_graph_data["edges"]:
-				self.list_closed_switches.append(edge)
-		for edge in self.initial_graph_data["edges"]:
-			if edge not in self.final_graph_data["edges"]:
-				self.list_opened_switches.append(edge)
+		# 3 - Get closed and opened switches (bitmask difference between final and initial edges)
+		initial_mask = self.edge_catalog.mask(self.initial_edges)
+		final_mask = self.edge_catalog.mask(self.graph.edgesKRST)
+		for edge in self.edge_catalog.edges_of(final_mask & ~initial_mask):
+			self.list_closed_switches.append({edge[0], edge[1]})
+		for edge in self.edge_catalog.edges_of(initial_mask & ~final_mask):
+			self.list_opened_switches.append({edge[0], edge[1]})
 
 		# 4 - Concatenate lists:
 		self.list_cl_op_sw = self.list_closed_switches + self.list_opened_switches
 
-		return not(len(self.list_closed_switches) == 0 and len(self.list_opened_switches) == 0)
\ No newline at end of file
+		return not(len(self.list_closed_switches) == 0 and len(self.list_opened_switches) == 0)
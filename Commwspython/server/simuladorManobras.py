@@ -2,42 +2,176 @@ import graphGAModule
 import switchingAssessmentModule
 import requests
 import networksData
-import time
+import loadFlowCacheModule
+import parallelEvaluationModule
+import resultsStoreModule
+import instrumentationModule
+import logModule
+import budgetModule
 import datetime
 import os.path
 import json
 
+
+logger = logModule.get_logger("sm")
+
+# ===================================================================================#
+'''
+Class to keep the state of a network folder (networks' data, load flow engine and load flow cache), so
+it can be reused by several simulations (warm state). It is valid while network files are unchanged.
+'''
+
+class NetworkState(object):
+	def __init__(self, dss_files_folder, power_flow_engine, cache_conf):
+		self.key = NetworkState.state_key(dss_files_folder, power_flow_engine)
+		self.sm_folder = os.path.join(dss_files_folder, "..", "")
+		self.power_flow_engine = power_flow_engine
+
+		# Object with all networks' data
+		self.networks_data = networksData.NetworksData(self.sm_folder)
+		with instrumentationModule.stage('xml_load'):
+			self.networks_data.initialize()
+
+		# Object to assess sequential switching through load flow simulations
+		self.lf_cache = NetworkState.get_load_flow_cache(dss_files_folder, cache_conf, power_flow_engine)
+		self.sw_assessment = switchingAssessmentModule.AssessSSGAIndiv(dss_files_folder, self.networks_data, power_flow_engine, self.lf_cache)
+
+		# Optional pool of worker processes (warm copies of this state), created on demand (see get_parallel_evaluator)
+		self.dss_files_folder = dss_files_folder
+		self.cache_conf = cache_conf
+		self.parallel_evaluator = None
+
+
+	'''
+	Method to compute the key of a network state: folder, load flow engine and hashes of network files (DSS and XML)
+	'''
+	@staticmethod
+	def state_key(dss_files_folder, power_flow_engine):
+		sm_folder = os.path.join(dss_files_folder, "..", "")
+		return (os.path.normcase(os.path.abspath(dss_files_folder)), power_flow_engine,
+		        loadFlowCacheModule.network_file_hash(dss_files_folder), networksData.NetworksData(sm_folder).xml_file_hash())
+
+
+	'''
+	Method to create the load flow results cache. Optional settings (dados_simulacao['conf_cache_fluxo_carga']):
+		- 'tamanho_memoria': maximum number of switching states kept in memory
+		- 'arquivo': path of the persistent cache file, shared across executions (empty: memory only)
+	Results are keyed by network files and load flow engine, so engines sharing a file do not mix results.
+	'''
+	@staticmethod
+	def get_load_flow_cache(dss_files_folder, cache_conf, power_flow_engine):
+		max_size = int(cache_conf.get('tamanho_memoria', 512))
+		path_file = cache_conf.get('arquivo', '')
+		network_hash = loadFlowCacheModule.cache_network_hash(dss_files_folder, switchingAssessmentModule.power_flow_engine_in_use(power_flow_engine))
+		return loadFlowCacheModule.LoadFlowCache(network_hash, max_size, path_file)
+
+
+	'''
+	Method to get the pool of "num_workers" worker processes that evaluate GGA individuals in parallel (None
+	if num_workers <= 1). Workers load their own copy of this state once, and are reused by later simulations.
+	'''
+	def get_parallel_evaluator(self, num_workers):
+		if num_workers <= 1:
+			return None
+		if self.parallel_evaluator is not None and self.parallel_evaluator.num_workers == num_workers:
+			return self.parallel_evaluator
+		self.close_parallel_evaluator()
+		worker_settings = {'sm_folder': self.sm_folder, 'dss_folder': self.dss_files_folder,
+		                   'power_flow_engine': self.power_flow_engine, 'cache_conf': self.cache_conf,
+		                   'edges': [], 'initial_edges': []}
+		for dict_edge in self.networks_data.list_graph_operable_switches_dicts:
+			worker_settings['edges'].append([dict_edge['v1'], dict_edge['v2'], 1])
+			if dict_edge['initial']:
+				worker_settings['initial_edges'].append([dict_edge['v1'], dict_edge['v2'], 1])
+		self.parallel_evaluator = parallelEvaluationModule.ParallelEvaluator(num_workers, worker_settings, self.lf_cache)
+		return self.parallel_evaluator
+
+
+	'''
+	Method to terminate worker processes, if any
+	'''
+	def close_parallel_evaluator(self):
+		if self.parallel_evaluator is not None:
+			self.parallel_evaluator.close()
+			self.parallel_evaluator = None
+
+
+	'''
+	Method to release the state: worker processes and persistent tier of the load flow cache
+	'''
+	def close(self):
+		self.close_parallel_evaluator()
+		self.lf_cache.close()
+
+
 # ===================================================================================#
 '''
 Main class: SM (Simulador de Manobras)
 '''
 
 class SM(object):
-	def __init__(self, dados_diretorios, dados_isolacao_defeito, dados_simulacao, path_chv_sem_manobra_anel):
+	def __init__(self, dados_diretorios, dados_isolacao_defeito, dados_simulacao, path_chv_sem_manobra_anel, network_state=None):
 		# Get data provided through the Web Service call
 		self.dados_simulacao = dados_simulacao  # Dict with settings regarding simulations
 		self.dados_diretorios = dados_diretorios  # Dict with folders paths
 		self.dados_isolacao_defeito = dados_isolacao_defeito  # Dict with switches to be opened necessarily in order to isolate the fault
 		self.lista_chaves_excecoes = self.generate_sw_list_exceptions(path_chv_sem_manobra_anel)  # List of switches that cannot be operated (exception rules)
 		dss_files_folder = self.dados_diretorios['local_dss']  # Folder with DSS files
-		self.sm_folder = dss_files_folder + "\\..\\"
+		self.sm_folder = os.path.join(dss_files_folder, "..", "")
 
 		self.settings_graph_GA = self.get_GGA_settings()      # settings of Graph Genetic Algorithm
 		self.settings_switching_GA = self.get_SSGA_settings() # settings of Seq. Switching Genetic Algorithm
 
 		# Get configurations concerning merit index calculation
 		self.merit_index_conf = self.dados_simulacao['av_conf_indice_merito']
-		
-		# Object with all networks' data
-		self.networks_data = networksData.NetworksData(self.sm_folder)
-		self.networks_data.initialize()
 
 		# Results
 		self.dict_results: dict = None
 
-		# Object to assess sequential switching through load flow simulations
-		self.sw_assessment = switchingAssessmentModule.AssessSSGAIndiv(dss_files_folder, self.networks_data)
-		
+		# Optional computational budget (dados_simulacao['conf_orcamento'], see budgetModule.Budget.from_settings).
+		# It is created when the simulation starts (run_simulator); its statistics are taken at the end of the GA
+		self.budget = None
+		self.budget_statistics = None
+
+		# Instrumentation (per-stage timings and counters). Optional settings (dados_simulacao['conf_instrumentacao']):
+		#   - 'ativa': 'true' to record timings and counters (report saved next to the simulation log)
+		#   - 'no_retorno': 'true' to also include the report in the return data
+		# Log settings of this simulation (its thread), dados_simulacao['conf_log']:
+		#   - 'nivel': 'INFO' (default: generations and fitness summary) or 'DEBUG' (every GGA/SSGA individual)
+		#   - 'geracoes_memoria': number of recent GGA generations kept in memory, with all details, and saved next
+		#     to the simulation log (0: none)
+		log_conf = self.dados_simulacao.get('conf_log', {})
+		self.log_ring_buffer = logModule.configure(log_conf.get('nivel', 'INFO'), int(log_conf.get('geracoes_memoria', 0)))
+
+		instrumentation_conf = self.dados_simulacao.get('conf_instrumentacao', {})
+		self.instrumentation_in_response = instrumentation_conf.get('no_retorno', 'false').upper() == "TRUE"
+		if instrumentation_conf.get('ativa', 'false').upper() == "TRUE":
+			self.instrumentation = instrumentationModule.start()
+		else:
+			self.instrumentation = instrumentationModule.stop()
+
+		# Networks' data and object to assess sequential switching through load flow simulations. They are
+		# loaded here, unless a warm network state is provided (resident server, see wsserver.py)
+		# Load flow engine: 'opendss' (default) or 'numpy' (in-process, no COM server required)
+		# A state loaded here is only used by this simulation, so its worker processes end with the run
+		self.owns_network_state = network_state is None
+		if network_state is None:
+			network_state = NetworkState(dss_files_folder, self.get_power_flow_engine(self.dados_simulacao),
+			                             self.dados_simulacao.get('conf_cache_fluxo_carga', {}))
+		self.network_state = network_state
+		self.power_flow_engine = network_state.power_flow_engine
+		self.networks_data = network_state.networks_data
+		self.lf_cache = network_state.lf_cache
+		self.sw_assessment = network_state.sw_assessment
+
+
+	'''
+	Method to get the load flow engine ('opendss' or 'numpy') of simulation settings
+	'''
+	@staticmethod
+	def get_power_flow_engine(dados_simulacao):
+		return dados_simulacao.get('motor_fluxo_carga', 'opendss').lower()
+
 
 	'''
 	Method to update dictionary with GGA settings
@@ -49,6 +183,19 @@ class SM(object):
 		settings_graph_GA.update({'num_individuals': int(dict_conf['num_individuos'])})
 		settings_graph_GA.update({'pc': float(dict_conf['pc'].replace(',','.'))})
 		settings_graph_GA.update({'pm': float(dict_conf['pm'].replace(',','.'))})
+		self.update_reproduction_settings(dict_conf, settings_graph_GA)
+		# optional: initial population of uniform spanning trees (default: biased to the initial topology)
+		settings_graph_GA.update({'initial_population': 'uniform' if str(dict_conf.get('populacao_inicial', 'enviesada')).lower() == 'uniforme' else 'biased'})
+		# optional: maximum number of radial topologies of problems solved exhaustively (0: GA only)
+		if 'limite_enumeracao' in dict_conf:
+			settings_graph_GA.update({'max_enumerated_topologies': int(dict_conf['limite_enumeracao'])})
+		# optional: local search (memetic GA) on the best individuals of each generation (0: disabled)
+		settings_graph_GA.update({'local_search_elite': int(dict_conf.get('busca_local_elite', 0))})
+		settings_graph_GA.update({'local_search_neighbours': int(dict_conf.get('busca_local_vizinhos', 20))})
+		settings_graph_GA.update({'local_search_evaluations': int(dict_conf.get('busca_local_avaliacoes', 3))})
+		# optional: mutation avoids closing switches of the exception list (no meshed switching), if possible
+		if str(dict_conf.get('mutacao_evita_excecoes', 'false')).lower() == 'true':
+			settings_graph_GA.update({'avoided_switches': list(self.lista_chaves_excecoes)})
 		return settings_graph_GA
 
 
@@ -65,9 +212,30 @@ class SM(object):
 		settings_graph_GA.update({'pm': float(dict_conf['pm'].replace(',','.'))})
 		settings_graph_GA.update({'min_porc_fitness': float(dict_conf['min_porc_fitness'].replace(',','.'))})
 		settings_graph_GA.update({'start_switch': self.dados_simulacao['lis_chave_partida'][0]['chave_partida']})
+		self.update_reproduction_settings(dict_conf, settings_graph_GA)
 		return settings_graph_GA
 
 
+	'''
+	Method to update dictionary of GA settings with reproduction settings (optional):
+		- 'num_descendentes': number of offspring per generation (default: 'num_individuos')
+		- 'selecao': selection of parents, 'torneio' (tournament, default) or 'ranking'
+		- 'tamanho_torneio': number of individuals of each tournament (default 2)
+	'''
+	def update_reproduction_settings(self, dict_conf, settings_ga):
+		settings_ga.update({'num_offspring': int(dict_conf.get('num_descendentes', dict_conf['num_individuos']))})
+		settings_ga.update({'selection': 'rank' if str(dict_conf.get('selecao', 'torneio')).lower() == 'ranking' else 'tournament'})
+		settings_ga.update({'tournament_size': max(1, int(dict_conf.get('tamanho_torneio', 2)))})
+
+
+	'''
+	Method to get the pool of worker processes that evaluate GGA individuals in parallel, kept by the network state.
+	Optional setting dados_simulacao['num_processos'] (default 1: serial evaluation, returns None).
+	'''
+	def get_parallel_evaluator(self):
+		return self.network_state.get_parallel_evaluator(int(self.dados_simulacao.get('num_processos', 1)))
+
+
 	''' Method to generate list of switches that cannot be operated (exception rules) '''
 	def generate_sw_list_exceptions(self, path_chv_sem_manobra_anel):
 		if not os.path.isfile(path_chv_sem_manobra_anel):
@@ -101,6 +269,30 @@ class SM(object):
 	Method to send response to end-point and persist corresponding content to log file.
 	'''
 	def return_response(self, path_dat, id_sm, id_plano, self_healing):
+		return_data = self.build_return_data(id_sm, id_plano)
+
+		# Produce simple debug
+		self.save_log(return_data, path_dat)
+		if self.instrumentation is not None:
+			self.instrumentation.save(path_dat + "DMS\\logs\\instrumentacao_simulador_manobra.json")
+		if self.log_ring_buffer is not None:
+			with open(path_dat + "DMS\\logs\\log_geracoes_simulador_manobra.txt", "w") as f:
+				f.write("\n".join(self.log_ring_buffer.lines()) + "\n")
+
+		# Send return data via web service
+		# #r = requests.post('http://127.0.0.1:5011/retornosimulacao', json=return_data)
+		# url_local = 'http://localhost:8082/datasnap/rest/TServerMethods1/SaidaSM/'
+		# r = requests.get(url_local + str(return_data))
+
+		# Produce return through results store
+		self.store_return_data(path_dat, return_data, self_healing)
+		return return_data
+
+
+	'''
+	Method to compose the return data (switching sequence of the best plan)
+	'''
+	def build_return_data(self, id_sm, id_plano):
 		acao: str
 		list_actions = []
 
@@ -128,19 +320,13 @@ class SM(object):
 		return_data.update({'STATUS': 'OK'})
 		return_data.update({'COMMENT': '0'})
 		return_data.update({'DETAILS': sw_seq_details})
+		if self.budget_statistics is not None:  # 'esgotado': plan is the best one found within the budget
+			return_data.update({'ORCAMENTO': self.budget_statistics})
+		if self.instrumentation is not None and self.instrumentation_in_response:
+			return_data.update({'INSTRUMENTACAO': self.instrumentation.report()})
 
 		print("Fitness: " + str(self.dict_results['Fitness']))
-
-		# Produce simple debug
-		self.save_log(return_data, path_dat)
-
-		# Send return data via web service
-		# #r = requests.post('http://127.0.0.1:5011/retornosimulacao', json=return_data)
-		# url_local = 'http://localhost:8082/datasnap/rest/TServerMethods1/SaidaSM/'
-		# r = requests.get(url_local + str(return_data))
-
-		# Produce return through text file
-		self.return_data_to_text_file(path_dat, return_data, self_healing)
+		return return_data
 
 
 	'''
@@ -153,29 +339,16 @@ class SM(object):
 
 
 	'''
-	Method to return dictionary with results
+	Method to persist the return data in the results store (see resultsStoreModule). The legacy text
+	file (bancoresultados_sm.txt / bancoresultados_smsh.txt) is produced on demand: main.py --exportar-resultados
 	'''
-	def return_data_to_text_file(self, path_dat_folder, dict_return_data, self_healing):
-		if self_healing == 0:
-			path_out_file = path_dat_folder + "/DMS/DadosSimulacoesManobra/bancoresultados_sm.txt"
-		elif self_healing == 1:
-			path_out_file = path_dat_folder + "/DMS/DadosSimulacoesManobraSH/bancoresultados_smsh.txt"
-		path_out_file = os.path.normpath(path_out_file)
-		if os.path.isfile(path_out_file):
-			lines = list()
-			with open(path_out_file, "r") as f:
-				for line in f:
-					lines.append(line)
-			string_json_return_data = json.dumps(dict_return_data)
-			lines.insert(0, string_json_return_data + "\n")
-			with open(path_out_file, "w") as f:
-				f.writelines(lines)
-		else:
-			lines = list()
-			string_json_return_data = json.dumps(dict_return_data)
-			lines.insert(0, string_json_return_data + "\n")
-			with open(path_out_file, "w") as f:
-				f.writelines(lines)
+	def store_return_data(self, path_dat_folder, dict_return_data, self_healing):
+		path_store_file, path_text_file = resultsStoreModule.results_paths(path_dat_folder, self_healing)
+		results_store = resultsStoreModule.ResultsStore(path_store_file, path_text_file)
+		try:
+			results_store.append(dict_return_data)
+		finally:
+			results_store.close()
 
 
 	'''
@@ -448,14 +621,26 @@ class SM(object):
 	'''
 	Main method - execution of Graph GA (1st stage)
 	'''
-	def run_simulator(self, self_healing):
+	def run_simulator(self, self_healing, checkpoint=None):
 		# Initialize graph GA object
+		self.budget = budgetModule.Budget.from_settings(self.dados_simulacao.get('conf_orcamento', {}))
+		parallel_evaluator = self.get_parallel_evaluator()
 		gga = graphGAModule.GraphGA(self.sm_folder, self.settings_graph_GA, self.settings_switching_GA,
-		                            self.sw_assessment, self.networks_data, self.merit_index_conf)
+		                            self.sw_assessment, self.networks_data, self.merit_index_conf, parallel_evaluator, checkpoint,
+		                            self.budget)
 
 		# Run GA
-		gga.run_gga()
-		print("\nGGA finalizado")
+		try:
+			gga.run_gga()
+		finally:
+			if self.owns_network_state:
+				self.network_state.close_parallel_evaluator()
+		if self.budget is not None:
+			self.budget_statistics = self.budget.statistics()
+			logger.info("Orcamento: %s", self.budget_statistics)
+		logger.info("\nGGA finalizado")
+		logger.info("Cache de fluxo de carga: %s", self.lf_cache.statistics())
+		logger.info("Execucoes SSGA: %d - Topologias reaproveitadas: %d", gga.num_ssga_runs, gga.num_memo_hits)
 
 		# Obtain results
 		self.dict_results = gga.get_results()
@@ -465,5 +650,4 @@ class SM(object):
 		self.compose_final_sw_operations(self_healing)
 		
 		print("\nDict de resultados:\n")
-		print(self.dict_results)
-		time.sleep(1)
\ No newline at end of file
+		print(self.dict_results)
\ No newline at end of file
@@ -0,0 +1,240 @@
+import random
+import numpy as np
+import graphModule
+
+
+'''
+Class to sample random spanning trees (radial topologies) of the graph of candidate edges (EdgeCatalog),
+e.g., to seed GGA populations. Trees are returned as bitmasks of the catalog. Modes:
+	- biased_kruskal: Kruskal over edges in random order, with initially closed edges (chosen with probability
+	  "bias") ahead of the others. The order is given by a single keyed sort (O(E log E)).
+	- wilson: uniform spanning tree (Wilson's algorithm, loop-erased random walks)
+If the graph is disconnected, a spanning forest is returned (one tree per connected component).
+All random numbers come from a NumPy generator (seeded by "seed", or from python's random module state).
+Spanning trees can also be counted (matrix-tree theorem, see count) and enumerated (see enumerate), so small
+problems can be solved exhaustively.
+'''
+class SpanningTreeSampler(object):
+	def __init__(self, edge_catalog, seed=None):
+		self.edge_catalog: graphModule.EdgeCatalog = edge_catalog
+		self.rng = np.random.default_rng(seed if seed is not None else random.getrandbits(64))
+
+		edges = edge_catalog.edges
+		self.num_edges = len(edges)
+		self.num_vertices = edge_catalog.num_vertices
+		self.edge_u = [edge[0] for edge in edges]
+		self.edge_v = [edge[1] for edge in edges]
+		self.array_initial = np.array([(edge_catalog.initial_mask >> i) & 1 for i in range(self.num_edges)], dtype=bool)
+
+		# adjacency: vertex ==> list of (neighbour, edge index), self-loops excluded
+		self.adjacency = [[] for i in range(self.num_vertices)]
+		for i, (u, v) in enumerate(zip(self.edge_u, self.edge_v)):
+			if u == v: continue
+			self.adjacency[u].append((v, i))
+			self.adjacency[v].append((u, i))
+
+		# connected components: vertex ==> representative vertex (root of Wilson's random walks)
+		dsu = graphModule.DisjointSet(self.num_vertices)
+		for u, v in zip(self.edge_u, self.edge_v):
+			dsu.add_edge((u, v))
+		self.component = [dsu.find(vertex) for vertex in range(self.num_vertices)]
+		self.num_tree_edges = self.num_vertices - len(set(self.component))
+
+		# buffer of uniform random numbers, for random walks
+		self.buffer = [] ; self.buffer_position = 0
+
+
+	'''
+	Method to sample "num_trees" spanning trees. mode: 'biased' (biased_kruskal) or 'uniform' (wilson)
+	'''
+	def sample(self, num_trees, mode='biased', bias=1.0):
+		if mode == 'uniform':
+			return [self.wilson() for i in range(num_trees)]
+		return [self.biased_kruskal(bias) for i in range(num_trees)]
+
+
+	'''
+	Method to sample a spanning tree by Kruskal's algorithm over randomly ordered edges. Each initially closed
+	edge is placed ahead of all others with probability "bias" (keys in [-1, 0) instead of [0, 1)).
+	'''
+	def biased_kruskal(self, bias=1.0):
+		keys = self.rng.random(self.num_edges)
+		keys[self.array_initial & (self.rng.random(self.num_edges) < bias)] -= 1.
+		dsu = graphModule.DisjointSet(self.num_vertices)
+		mask = 0 ; num_tree_edges = 0
+		for i in np.argsort(keys, kind='stable').tolist():
+			if num_tree_edges == self.num_tree_edges: break
+			if dsu.add_edge((self.edge_u[i], self.edge_v[i])):
+				mask |= 1 << i ; num_tree_edges += 1
+		return mask
+
+
+	'''
+	Method to sample a uniform spanning tree by Wilson's algorithm: from each vertex out of the tree, a random
+	walk runs until it hits the tree; its loop-erased path (last exit of each vertex) is then added to the tree.
+	'''
+	def wilson(self):
+		in_tree = [False] * self.num_vertices
+		next_edge = [None] * self.num_vertices  # vertex ==> (next vertex, edge index) of the walk
+		for vertex in set(self.component):
+			in_tree[vertex] = True
+		for start in self.rng.permutation(self.num_vertices).tolist():
+			# random walk (only the last exit of each vertex is kept, which erases loops)
+			vertex = start
+			while not in_tree[vertex]:
+				list_neighbours = self.adjacency[vertex]
+				next_edge[vertex] = list_neighbours[int(self.uniform() * len(list_neighbours))]
+				vertex = next_edge[vertex][0]
+			# add loop-erased path to the tree
+			vertex = start
+			while not in_tree[vertex]:
+				in_tree[vertex] = True
+				vertex = next_edge[vertex][0]
+
+		mask = 0
+		for vertex in range(self.num_vertices):
+			if next_edge[vertex] is not None and self.component[vertex] != vertex:
+				mask |= 1 << next_edge[vertex][1]
+		return mask
+
+
+	'''
+	Method to return a uniform random number in [0, 1), drawn from the generator in blocks
+	'''
+	def uniform(self):
+		if self.buffer_position == len(self.buffer):
+			self.buffer = self.rng.random(4096).tolist() ; self.buffer_position = 0
+		self.buffer_position += 1
+		return self.buffer[self.buffer_position - 1]
+
+
+	'''
+	Method to return the indexes of bridges (edges belonging to every spanning tree) and of the other edges
+	(edges on cycles), by depth-first search (lowest reachable discovery time)
+	'''
+	def split_bridges(self):
+		discovery = [-1] * self.num_vertices ; low = [0] * self.num_vertices
+		set_bridges = set() ; time = 0
+		for source in range(self.num_vertices):
+			if discovery[source] >= 0: continue
+			discovery[source] = low[source] = time ; time += 1
+			stack = [(source, None, iter(self.adjacency[source]))]  # (vertex, edge to parent, neighbours iterator)
+			while stack:
+				vertex, parent_edge, neighbours = stack[-1]
+				for neighbour, edge in neighbours:
+					if edge == parent_edge: continue
+					if discovery[neighbour] < 0:
+						discovery[neighbour] = low[neighbour] = time ; time += 1
+						stack.append((neighbour, edge, iter(self.adjacency[neighbour])))
+						break
+					low[vertex] = min(low[vertex], discovery[neighbour])
+				else:
+					stack.pop()
+					if stack:
+						parent = stack[-1][0]
+						low[parent] = min(low[parent], low[vertex])
+						if low[vertex] > discovery[parent]: set_bridges.add(parent_edge)
+		list_bridges = sorted(set_bridges)
+		list_cycle_edges = [i for i in range(self.num_edges) if i not in set_bridges and self.edge_u[i] != self.edge_v[i]]
+		return list_bridges, list_cycle_edges
+
+
+	'''
+	Method to count spanning trees (forests, if the graph is disconnected) by the matrix-tree theorem: the
+	count is the determinant of the reduced Laplacian matrix. Bridges do not change the count, so only the
+	vertices of edges on cycles are considered. Returns a float (inf if too large to be represented).
+	'''
+	def count(self):
+		list_bridges, list_cycle_edges = self.split_bridges()
+		if len(list_cycle_edges) == 0:
+			return 1.
+		list_vertices = sorted(set(self.edge_u[i] for i in list_cycle_edges) | set(self.edge_v[i] for i in list_cycle_edges))
+		dict_index = {vertex: i for i, vertex in enumerate(list_vertices)}
+		laplacian = np.zeros((len(list_vertices), len(list_vertices)))
+		for i in list_cycle_edges:
+			u = dict_index[self.edge_u[i]] ; v = dict_index[self.edge_v[i]]
+			laplacian[u, u] += 1. ; laplacian[v, v] += 1.
+			laplacian[u, v] -= 1. ; laplacian[v, u] -= 1.
+
+		# one row/column removed per connected component of edges on cycles (the determinant is the product of
+		# components' counts)
+		dsu = graphModule.DisjointSet(len(list_vertices))
+		for i in list_cycle_edges:
+			dsu.add_edge((dict_index[self.edge_u[i]], dict_index[self.edge_v[i]]))
+		set_removed = set()
+		list_kept = []
+		for i in range(len(list_vertices)):
+			if dsu.find(i) in set_removed:
+				list_kept.append(i)
+			else:
+				set_removed.add(dsu.find(i))
+		if len(list_kept) == 0:
+			return 1.
+		sign, log_det = np.linalg.slogdet(laplacian[np.ix_(list_kept, list_kept)])
+		return float(round(np.exp(log_det))) if log_det < 700. else float('inf')
+
+
+	'''
+	Method to enumerate all spanning trees (forests, if the graph is disconnected), as bitmasks, up to
+	"max_trees" (None: no limit). Bridges are in every tree; edges on cycles are included or excluded by
+	backtracking, and an edge is only excluded if the remaining edges can still complete a tree, so every
+	branch yields a tree (O(m^2) per tree, m: number of edges on cycles).
+	'''
+	def enumerate(self, max_trees=None):
+		list_bridges, list_cycle_edges = self.split_bridges()
+		parent = list(range(self.num_vertices)) ; rank = [0] * self.num_vertices
+
+		def find(vertex):  # no path compression, so unions can be undone
+			while parent[vertex] != vertex:
+				vertex = parent[vertex]
+			return vertex
+
+		def union(x, y):  # x, y: roots. Returns information to undo the union
+			if rank[x] < rank[y]:
+				x, y = y, x
+			parent[y] = x
+			increment = rank[x] == rank[y]
+			if increment: rank[x] += 1
+			return y, x, increment
+
+		def undo(y, x, increment):
+			parent[y] = y
+			if increment: rank[x] -= 1
+
+		def can_complete(start, needed):  # whether edges list_cycle_edges[start:] provide "needed" unions
+			dict_parent = {}
+			def find_local(vertex):
+				while dict_parent.get(vertex, vertex) != vertex:
+					vertex = dict_parent[vertex]
+				return vertex
+			for i in list_cycle_edges[start:]:
+				x = find_local(find(self.edge_u[i])) ; y = find_local(find(self.edge_v[i]))
+				if x != y:
+					dict_parent[y] = x ; needed -= 1
+					if needed == 0: return True
+			return needed <= 0
+
+		bridges_mask = 0
+		for i in list_bridges:
+			union(find(self.edge_u[i]), find(self.edge_v[i]))
+			bridges_mask |= 1 << i
+		num_needed = self.num_tree_edges - len(list_bridges)
+
+		list_trees = []
+		stack = [(0, num_needed, 0, None)]  # (position in list_cycle_edges, unions needed, mask, union to undo)
+		while stack and (max_trees is None or len(list_trees) < max_trees):
+			position, needed, mask, undo_info = stack.pop()
+			if position < 0:  # marker: undo union of an included edge
+				undo(*undo_info) ; continue
+			if needed == 0:
+				list_trees.append(bridges_mask | mask) ; continue
+			i = list_cycle_edges[position]
+			# 1st branch: edge excluded (pushed first, so it is explored last)
+			if can_complete(position + 1, needed):
+				stack.append((position + 1, needed, mask, None))
+			# 2nd branch: edge included (if it does not close a cycle)
+			x = find(self.edge_u[i]) ; y = find(self.edge_v[i])
+			if x != y:
+				stack.append((-1, 0, 0, union(x, y)))
+				stack.append((position + 1, needed - 1, mask | (1 << i), None))
+		return list_trees
@@ -1,6 +1,20 @@
-import dss
+try:
+	import dss
+except ImportError:  # win32com/pythoncom not available (non-Windows hosts)
+	dss = None
+import powerFlowModule
+import loadFlowCacheModule
 import networksData
-import math
+import instrumentationModule
+import numpy as np
+
+
+'''
+Function to return the load flow engine effectively used for a requested engine: OpenDSS (COM) is replaced
+by the NumPy engine where win32com is not available
+'''
+def power_flow_engine_in_use(power_flow_engine):
+	return "numpy" if power_flow_engine == "numpy" or dss is None else "opendss"
 
 
 #===================================================================================#
@@ -8,13 +22,24 @@ import math
 Class to assess fitness function of an individual of SSGA (Sequential Switching GA) 
 '''
 class AssessSSGAIndiv(object):
-	def __init__(self, path_folder, networks_data):
+	def __init__(self, path_folder, networks_data, power_flow_engine="opendss", lf_cache=None):
 		self.networks_data : networksData.NetworksData = networks_data
 		self.feeders_info = networks_data.feeder_protections()
-		self.dss = dss.DSS(path_folder) # DSS object for load flow simulations
-		self.dss.initialize(self.feeders_info)
+		# Object for load flow simulations: OpenDSS (COM) or in-process NumPy engine
+		power_flow_engine = power_flow_engine_in_use(power_flow_engine)
+		if power_flow_engine == "numpy":
+			self.dss = powerFlowModule.PowerFlow(path_folder)
+		else:
+			self.dss = dss.DSS(path_folder)
+		with instrumentationModule.stage('dss_compile'):
+			self.dss.initialize(self.feeders_info)
 		self.list_switches = None
 
+		# Cache of load flow results, keyed by closed switches
+		if lf_cache is None:
+			lf_cache = loadFlowCacheModule.LoadFlowCache(loadFlowCacheModule.cache_network_hash(path_folder, power_flow_engine))
+		self.lf_cache: loadFlowCacheModule.LoadFlowCache = lf_cache
+
 
 	def update_list_switches(self, list_switches):
 		self.list_switches = list_switches
@@ -23,27 +48,45 @@ class AssessSSGAIndiv(object):
 	Method to assess load flow-based merit index
 	'''
 	def load_flow_merit_index(self, dict_sw_states, dicts_sw_changes):
-		# set initial conditions (right after fault clearing)
-		self.dss.set_initial_sw_states(dict_sw_states)
-
-		# solve initial load flow
-		self.dss.solve_power_flow(show_results=False, plot_circuit=False)
-
-		# gets all 3-phase currents
-		list_dict_curr_initial = self.dss.get_currents_abs()
+		# closed switches before and after switching operations (cache keys)
+		closed_initial = set(dict_sw_states['closed_switches'])
+		closed_final = set(closed_initial)
+		for change in dicts_sw_changes:
+			if change['action'] == 'cl': closed_final.add(change['code'])
+			else: closed_final.discard(change['code'])
+
+		# gets all 3-phase currents of initial conditions (right after fault clearing)
+		list_dict_curr_initial = self.lf_cache.get(closed_initial)
+		if list_dict_curr_initial is None:
+			# set initial conditions
+			self.dss.set_initial_sw_states(dict_sw_states)
+
+			# solve initial load flow
+			self.dss.solve_power_flow(show_results=False, plot_circuit=False)
+			instrumentationModule.count('power_flow_solves')
+
+			list_dict_curr_initial = self.dss.get_currents_abs()
+			self.lf_cache.put(closed_initial, list_dict_curr_initial)
+
+		# Get list of dictionaries with all 3-phase currents after switching operations.
+		# Format: {'sw_name':sw_name, 'currents':[ia, ib, ic]}
+		list_dict_curr_final = self.lf_cache.get(closed_final)
+		if list_dict_curr_final is None:
+			# set initial conditions
+			self.dss.set_initial_sw_states(dict_sw_states)
 
-		# closes or opens switches
-		self.dss.change_sw_states(dicts_sw_changes)
+			# closes or opens switches
+			self.dss.change_sw_states(dicts_sw_changes)
 
-		# solve load flow after switching operations
-		self.dss.solve_power_flow(show_results=False, plot_circuit=False)
+			# solve load flow after switching operations
+			self.dss.solve_power_flow(show_results=False, plot_circuit=False)
+			instrumentationModule.count('power_flow_solves')
 
-		# revert switching
-		self.dss.restore_sw_states(dicts_sw_changes)
+			# revert switching
+			self.dss.restore_sw_states(dicts_sw_changes)
 
-		# Get list of dictionaries with all 3-phase currents.
-		# Format: {'sw_name':sw_name, 'currents':[ia, ib, ic]}
-		list_dict_curr_final = self.dss.get_currents_abs()
+			list_dict_curr_final = self.dss.get_currents_abs()
+			self.lf_cache.put(closed_final, list_dict_curr_final)
 
 		LF_MI = self.compute_load_flow_merit_index(list_dict_curr_initial, list_dict_curr_final)
 		return LF_MI
@@ -55,91 +98,52 @@ class AssessSSGAIndiv(object):
 	'''
 
 	def crew_displacement_merit_index(self, st_switch, sw_changes):
-		if len(sw_changes) < 1:
-			return 0., []
-
-		list_pairs = []
-		list_displ_times = []
-
-		# 1st displacement: between start switch and sw_changes' 1st switch
-		sw_code1 = st_switch
-		sw_code2 = sw_changes[0]['code']
-		list_pairs.append([sw_code1, sw_code2])
-
-		# determine pairs of displacement
-		for i in range(len(sw_changes) - 1):
-			sw_code1 = sw_changes[i]['code']
-			sw_code2 = sw_changes[i+1]['code']
-			list_pairs.append([sw_code1, sw_code2])
-
-		# for each displacement, determine total time
-		tot_time_minutes = 0.
-		for displ in list_pairs:
-			sw1 = displ[0] ; sw2 = displ[1]
-			delta_t = self.displacement_time(sw1, sw2)
-			list_displ_times.append(delta_t)
-			tot_time_minutes += delta_t
-
-		# calculate crew displacement merit index (cd_mi),
-		# based on total time and maximum allowable time (max_time_minutes)
-		max_time_minutes = 120. ; tot_time_pu = 1000.
-		if tot_time_minutes < max_time_minutes:
-			tot_time_pu = tot_time_minutes / max_time_minutes
-
-		return tot_time_pu, list_displ_times
-
+		return self.crew_displacement_merit_indexes(st_switch, [sw_changes])[0]
 
 
 	'''
-	Method to identify all isolated vertices, from edges [u,v,w]
+	Method to compute crew displacement MI for a whole population of switching sequences at once.
+	Displacements are: start switch ==> 1st switch, 1st switch ==> 2nd switch, ...
+	Sequences are padded with an unregistered switch index (zero travel time), so travel times of all
+	sequences are gathered from the travel times matrix in a single operation.
+	Output: list of tuples (CD_MI, list of displacement times), one per sequence
 	'''
-	def isolated_vertices(self, all_closed_edges):
-
-		list_edges = []
-		for edge_dict in all_closed_edges:
-			edge = [edge_dict['v1'], edge_dict['v2'], 1]
-			list_edges.append(edge)
-
-		repeat = True
-		vertices_set = {0}
-		while repeat:
-			repeat = False
-			for i in reversed(range(len(list_edges))):
-				edge = list_edges[i]
-				if edge[0] in vertices_set or edge[1] in vertices_set:
-					vertices_set.add(edge[0])
-					vertices_set.add(edge[1])
-					list_edges.remove(edge)
-					repeat = True
-
-		isol_vertices = set()
-		for edge in list_edges:
-			isol_vertices.add(edge[0])
-			isol_vertices.add(edge[1])
-		return(list(isol_vertices))
+	def crew_displacement_merit_indexes(self, st_switch, list_sw_changes):
+		list_results = [(0., []) for sw_changes in list_sw_changes]
+		lengths = np.array([len(sw_changes) for sw_changes in list_sw_changes], dtype=int)
+		if len(lengths) == 0 or lengths.max() < 1:
+			return list_results
+
+		# 1 - Matrix of switch indexes (one row per sequence, 1st column: start switch)
+		pad_index = self.networks_data.matrix_travel_times.shape[0] - 1
+		matrix_indexes = np.full((len(list_sw_changes), lengths.max() + 1), pad_index, dtype=int)
+		matrix_indexes[:, 0] = self.networks_data.switch_indexes([st_switch])[0]
+		for i, sw_changes in enumerate(list_sw_changes):
+			matrix_indexes[i, 1:lengths[i] + 1] = self.networks_data.switch_indexes([change['code'] for change in sw_changes])
+
+		# 2 - Gather displacement times and sum them
+		matrix_times = self.networks_data.matrix_travel_times[matrix_indexes[:, :-1], matrix_indexes[:, 1:]]
+		tot_times_minutes = matrix_times.sum(axis=1)
+
+		# 3 - Calculate crew displacement merit index (cd_mi),
+		# based on total time and maximum allowable time (max_time_minutes)
+		max_time_minutes = 120.
+		tot_times_pu = np.where(tot_times_minutes < max_time_minutes, tot_times_minutes / max_time_minutes, 1000.)
 
+		for i in range(len(list_sw_changes)):
+			if lengths[i] < 1: continue
+			list_results[i] = (float(tot_times_pu[i]), matrix_times[i, :lengths[i]].tolist())
+		return list_results
 
-	'''
-	Method to determine the number of isolated customers, based on list of isolated vertices
-	'''
-	def isolated_customers(self, vertice_dicts, list_isol_vertices):
-		isol_cust = 0
-		for vert in list_isol_vertices:
-			for dict in vertice_dicts:
-				if dict['id'] == int(vert):
-					isol_cust += dict['customers']
-					break
-		return isol_cust
 
 
 	'''
 	Method to return the type of a given switch
 	'''
 	def switch_type(self, sw_code):
-		for dict_sw in self.list_switches:
-			if dict_sw['code_sw'] == sw_code:
-				return dict_sw['type_sw']
-		return ""
+		dict_sw = self.networks_data.switch_record(sw_code)
+		if dict_sw is None: return ""
+		return dict_sw['type']
 
 
 	'''
@@ -147,26 +151,24 @@ class AssessSSGAIndiv(object):
 	automated switch (circ. breaker or recloser) has to be opened and, then, reclosed.
 		Inputs:
 			- ori_dicts_sw_inv_changes: list of dicts with the format: {'code': 'switch_code', 'action': 'op'}
-			- all_available_edges: list of all available edges
 			- all_init_closed_edges: list of all initially closed edges
 		Output:
 			- lis_ext: list of dicts of switches to be closed or opened, now considering auxiliary operations
 	'''
-	def determine_auxiliary_sw_operations(self, ori_dicts_sw_inv_changes, all_available_edges, all_init_closed_edges, lis_ext):
-		closed_edges = all_init_closed_edges.copy()
-		all_edges = all_available_edges.copy()
+	def determine_auxiliary_sw_operations(self, ori_dicts_sw_inv_changes, all_init_closed_edges, lis_ext):
+		# Feeder tree of initially closed edges, updated as switching operations are applied
+		feeder_tree = self.networks_data.feeder_tree(all_init_closed_edges)
 
 		# Check the whole switching sequence. Each dict_sw_inv_change
 		# has the following format: {'code': 'switch_code', 'action': 'op'})
 		for i in range(len(ori_dicts_sw_inv_changes)):
 			dict_sw_change = ori_dicts_sw_inv_changes[i]
+			index_edge = self.networks_data.edge_index_of_switch(dict_sw_change['code'])
 
 			# If the switch has to be closed:
 			if dict_sw_change['action'] == 'cl':
 				lis_ext.append(dict_sw_change)  # Fill output list of sw changes
-				for edge_dict in all_edges:  # Update temp list of closed edges
-					if edge_dict['switch'] == dict_sw_change['code']:
-						closed_edges.append(edge_dict); break
+				if index_edge is not None: feeder_tree.close_edge(index_edge)
 
 			# If the switch has to be opened:
 			elif dict_sw_change['action'] == 'op':
@@ -175,13 +177,10 @@ class AssessSSGAIndiv(object):
 				# SW to be opened is automated:
 				if type_sw == "disjuntor" or type_sw == "religadora":
 					lis_ext.append(dict_sw_change)  # Fill output list of sw changes
-					for edge_dict in all_edges:  # Update temp list of closed edges
-						if edge_dict['switch'] == dict_sw_change['code']:
-							closed_edges.remove(edge_dict)
 
 				# SW to be opened is not automated => check if any auxiliary switching operation is necessary
 				else:
-					upstreams_automated_sw = str(self.determine_upstreams_automated_switch(dict_sw_change['code'], closed_edges))
+					upstreams_automated_sw = str(self.determine_upstreams_automated_switch(dict_sw_change['code'], feeder_tree))
 
 					if upstreams_automated_sw == "":  # switch to be opened was initially isolated ==> aux. sw. op. is unnecessary
 						lis_ext.append(dict_sw_change)
@@ -190,59 +189,26 @@ class AssessSSGAIndiv(object):
 						lis_ext.append(dict_sw_change)
 						lis_ext.append({'code': upstreams_automated_sw, 'action': 'cl'})
 
+				if index_edge is not None: feeder_tree.open_edge(index_edge)
+
 
 	'''
 	Method to determine if auxiliary switching operation is necessary in order to open manual switch. If necessary,
 	the upstream automated switch code is returned.
 		Inputs:
 			- sw_code: code of the manual switch to be opened
-			- closed_edges: list of edges that are currently closed
+			- feeder_tree: feeder tree (graphModule.FeederTree) of currently closed edges
 		Output:
 			- code of the automated upstream switch to be opened and closed (auxiliary operation)  
 	'''
-	def determine_upstreams_automated_switch(self, sw_code, closed_edges):
-		tmp_closed_edges = closed_edges.copy()
-		list_energized_edges = list()
-		set_energized_nodes = {0}
-		finish = False
-		while not finish:
-			finish = True
-			for i in reversed(range(len(tmp_closed_edges))):
-				edge = tmp_closed_edges[i]
-				if edge['v1'] in set_energized_nodes or edge['v2'] in set_energized_nodes:
-					set_energized_nodes.add(edge['v1'])
-					set_energized_nodes.add(edge['v2'])
-					list_energized_edges.append(edge)
-					tmp_closed_edges.remove(edge)
-					finish = False
-
-		# Get list index according to the ref. edge's position
-		index_edge = -1
-		for i in range(len(list_energized_edges)):
-			edge = list_energized_edges[i]
-			if edge['switch'] == sw_code: index_edge = i; break
-		if index_edge == -1: return ""
-
-		# Try oo identify upstream protection switch (circuit breaker or recloser)
-		edge_ref = list_energized_edges[index_edge]
-		upstream_automated_sw_code = ""
-		while index_edge > 0:
-			# Identify parent edge, towards subestation (node 0)
-			edge = None
-			for i in range(index_edge-1, -1, -1):
-				edge = list_energized_edges[i]
-				if edge['v1'] == edge_ref['v1'] or edge['v1'] == edge_ref['v2'] or edge['v2'] == edge_ref['v1'] or edge['v2'] == edge_ref['v2']:
-					index_edge = i; break
-				else: edge = None
-			if edge is None: break
-
-			# If it is circ. breaker (disjuntor) or recloser (religadora), then its code is returned
-			edge_ref = edge; edge_ref_code = edge_ref['switch']
-			sw_type : str = str(self.switch_type(edge_ref_code))
-			if sw_type == "disjuntor" or sw_type == "religadora":
-				upstream_automated_sw_code = edge_ref_code
-				break
-		return upstream_automated_sw_code
+	def determine_upstreams_automated_switch(self, sw_code, feeder_tree):
+		index_edge = self.networks_data.edge_index_of_switch(sw_code)
+		if index_edge is None: return ""
+
+		# Nearest protection switch (circuit breaker or recloser) towards subestation (node 0)
+		index_upstream = feeder_tree.upstream_automated_edge(index_edge)
+		if index_upstream is None or index_upstream < 0: return ""
+		return self.networks_data.list_graph_operable_switches_dicts[index_upstream]['switch']
 
 
 
@@ -251,37 +217,28 @@ class AssessSSGAIndiv(object):
 	among switching operations. Parameters:
 		- sw_changes:       list of switching operations, containing: switch code and action (op/cl)
 		- list_displ_times: list of crew displacement times for all switching operations		
-		- all_available_edges: dicts with information regarding all available edges
 		- all_closed_edges: dicts with information regarding closed edges
-		- vertice_dicts: list of dicts with vertice_dicts' info (id and number of customers)
 	'''
-	def outage_duration_merit_index(self, sw_changes, list_displ_times, all_available_edges, all_closed_edges, vertice_dicts):
+	def outage_duration_merit_index(self, sw_changes, list_displ_times, all_closed_edges):
 
 		interr_cust = []        # list with number of interrupted customers
 		avg_tot_duration = 0.0  # average total duration
 		sum_cust_interr = 0     # summation of total customers' interruptions
 
-		# 1 - Interr. customers at initial condition
-		list_isol_vertices = self.isolated_vertices(all_closed_edges)
-		num_interr_cust = self.isolated_customers(vertice_dicts, list_isol_vertices)
-		interr_cust.append(num_interr_cust)
+		# 1 - Interr. customers at initial condition (feeder tree keeps them updated along switching operations)
+		feeder_tree = self.networks_data.feeder_tree(all_closed_edges)
+		interr_cust.append(feeder_tree.interrupted_customers)
 
 		# 2 - For each switching operation, evaluate number of interrupted customers
 		for i in range(len(sw_changes)):
 			change = sw_changes[i]
-			if change['action'] == 'cl':
-				for edge_dict in all_available_edges:
-					if edge_dict['switch'] == change['code']:
-						all_closed_edges.append(edge_dict)
-						break
-			elif change['action'] == 'op':
-				for edge_dict in all_available_edges:
-					if edge_dict['switch'] == change['code']:
-						all_closed_edges.remove(edge_dict)
-
-			list_isol_vertices = self.isolated_vertices(all_closed_edges)
-			num_interr_cust = self.isolated_customers(vertice_dicts, list_isol_vertices)
-			interr_cust.append(num_interr_cust)
+			index_edge = self.networks_data.edge_index_of_switch(change['code'])
+			if index_edge is not None:
+				if change['action'] == 'cl':
+					feeder_tree.close_edge(index_edge)
+				elif change['action'] == 'op':
+					feeder_tree.open_edge(index_edge)
+			interr_cust.append(feeder_tree.interrupted_customers)
 
 		# 3 - Compute average total interruptions durations
 		for i in range(len(list_displ_times)):
@@ -307,63 +264,8 @@ class AssessSSGAIndiv(object):
 	'''
 
 	def displacement_time(self, sw1, sw2):
-
-		sw1 = sw1.replace('.', '')
-		sw2 = sw2.replace('.', '')
-
-		# displacement time is zero if sw2 is automatic (circuit breaker or recloser)
-		for sw in self.list_switches:
-			if sw['code_sw'] == sw2:
-				if sw['type_sw'].lower() == "disjuntor" or sw['type_sw'].lower() == "religadora":
-					return 0.
-
-		# get switches' geographic positions
-		x1 = 0 ; x2 = 0 ; y1 = 0 ; y2 = 0
-		for sw in self.networks_data.list_switches_dicts:
-			if sw1.lower() == sw['code'].lower():
-				x1 = int(sw['coord_x_m'])
-				y1 = int(sw['coord_y_m'])
-				break
-		for sw in self.networks_data.list_switches_dicts:
-			if sw2.lower() == sw['code'].lower():
-				x2 = int(sw['coord_x_m'])
-				y2 = int(sw['coord_y_m'])
-				break
-
-		# verifies if one the keys was not found
-		if (x1 == 0 and y1 == 0) or (x2 == 0 and y2 == 0):
-			return 0.0
-
-		# compute geographic distance between sw1 and sw2
-		dist_m = math.sqrt(math.pow(x1-x2, 2) + math.pow(y1-y2, 2))
-		# average displacement speed
-		avg_spd_km_h = 50.
-		avg_spd_m_s = avg_spd_km_h / 3.6
-		# compute displacement time, in minutes
-		displ_time_min = (dist_m / avg_spd_m_s) / 60.
-
-		# # determine switches' index, regarding the incidence matrix
-		# sw1_index, sw2_index = -1, -1
-		# for sw in self.list_switches:
-		# 	if sw['code_sw'] == sw1:
-		# 		sw1_index = int(sw['id_sw'])
-		# 	elif sw['code_sw'] == sw2:
-		# 		sw2_index = int(sw['id_sw'])
-		# if sw1_index == -1 or sw2_index == -1:
-		# 	return 0.
-		#
-		# # get displacement time from incidence matrix
-		# displ_time = 0.
-		# mtx = self.networks_data.crew_displ_times_mtx
-		#
-		# if sw1_index < sw2_index:
-		# 	mtx_line = mtx[sw1_index]
-		# 	displ_time = mtx_line[sw2_index]
-		# elif sw2_index < sw1_index:
-		# 	mtx_line = mtx[sw2_index]
-		# 	displ_time = mtx_line[sw1_index]
-
-		return displ_time_min
+		sw_indexes = self.networks_data.switch_indexes([sw1, sw2])
+		return float(self.networks_data.matrix_travel_times[sw_indexes[0], sw_indexes[1]])
 
 
 
@@ -387,10 +289,7 @@ class AssessSSGAIndiv(object):
 			currents_final = currents_data_final['currents']
 
 			# I_capacity: power feeder maximum allowable current
-			I_capacity = 0.
-			for cap_data in self.feeders_info:
-				if cap_data['prot_switch'] == sw_name:
-					I_capacity = cap_data['max_curr']; break
+			I_capacity = self.networks_data.feeder_capacity(sw_name)
 			if I_capacity == 0.: continue
 
 			# 1 - M_b: margin related to base condition
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# modules of the server are imported by name (as in main.py and wsserver.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,61 @@
+import random
+import graphModule
+
+
+'''
+Function to build a random network: a random tree over vertices 0..n-1 plus extra edges (meshes and parallel
+edges), some of them automated, with random customers per vertex
+'''
+def random_network(rng):
+	num_vertices = rng.randint(2, 12)
+	list_edges = [[rng.randrange(v), v] for v in range(1, num_vertices)]
+	for i in range(rng.randint(0, 5)):
+		list_edges.append([rng.randrange(num_vertices), rng.randrange(num_vertices)])
+	topology = graphModule.CSRTopology(list_edges)
+	edge_automated = [rng.random() < 0.3 for edge in list_edges]
+	vertex_customers = [rng.randint(0, 20) for vertex in range(num_vertices)]
+	return topology, edge_automated, vertex_customers
+
+
+'''
+Function to check a feeder tree against one computed from scratch for the same closed edges
+'''
+def check_feeder_tree(feeder_tree, topology, edge_automated, vertex_customers):
+	expected = graphModule.FeederTree(topology, edge_automated, feeder_tree.edge_mask, vertex_customers=vertex_customers)
+	num_vertices = len(topology.vertices)
+	assert [feeder_tree.energized(i) for i in range(num_vertices)] == [expected.energized(i) for i in range(num_vertices)]
+	assert feeder_tree.interrupted_customers == expected.interrupted_customers
+
+	# parent edges form a tree of closed edges rooted at the source, and nearest automated edges follow it
+	for i in range(num_vertices):
+		edge = feeder_tree.parent_edge[i]
+		if edge < 0: continue
+		assert feeder_tree.edge_mask[edge]
+		u, v = int(topology.edge_u[edge]), int(topology.edge_v[edge])
+		parent = u if v == i else v
+		assert i in (u, v) and feeder_tree.depth[parent] == feeder_tree.depth[i] - 1
+		assert feeder_tree.nearest_automated[i] == (edge if edge_automated[edge] else feeder_tree.nearest_automated[parent])
+
+	# without meshes of closed edges, the tree is unique
+	dsu = graphModule.DisjointSet(num_vertices)
+	for edge, closed in enumerate(feeder_tree.edge_mask):
+		if closed: dsu.add_edge((int(topology.edge_u[edge]), int(topology.edge_v[edge])))
+	if dsu.num_cycles == 0:
+		assert feeder_tree.parent_edge == expected.parent_edge
+		assert feeder_tree.nearest_automated == expected.nearest_automated
+
+
+def test_incremental_updates_match_recomputation():
+	rng = random.Random(3)
+	for case in range(400):
+		topology, edge_automated, vertex_customers = random_network(rng)
+		edge_mask = [rng.random() < 0.7 for i in range(topology.num_edges)]
+		feeder_tree = graphModule.FeederTree(topology, edge_automated, edge_mask, vertex_customers=vertex_customers)
+		check_feeder_tree(feeder_tree, topology, edge_automated, vertex_customers)
+		for step in range(10):
+			edge = rng.randrange(topology.num_edges)
+			if rng.random() < 0.5:
+				feeder_tree.close_edge(edge)
+			else:
+				feeder_tree.open_edge(edge)
+			check_feeder_tree(feeder_tree, topology, edge_automated, vertex_customers)
@@ -0,0 +1,83 @@
+import threading
+import jobSchedulerModule
+
+
+TIMEOUT = 10.
+
+
+'''
+Function to build a job function that signals when it starts, then calls checkpoints until released
+'''
+def blocking_job(started, release, log=None, name=None):
+	def func(job):
+		if log is not None: log.append(name)
+		started.set()
+		while not release.wait(0.005):
+			job.checkpoint()
+		job.checkpoint()
+		return name
+	return func
+
+
+def test_admission_control():
+	scheduler = jobSchedulerModule.JobScheduler(max_concurrency=1, max_job_cost=10)
+	job = scheduler.submit('a', jobSchedulerModule.PRIORITY_EMERGENCY, 11, lambda job: None)
+	assert job.status == 'rejected'
+	job = scheduler.submit('b', jobSchedulerModule.PRIORITY_SELF_HEALING, 11, lambda job: 'ok')
+	assert job.finished.wait(TIMEOUT) and job.status == 'done' and job.result == 'ok'
+
+
+def test_self_healing_preempts_scheduled_job():
+	scheduler = jobSchedulerModule.JobScheduler(max_concurrency=1)
+	started, release = threading.Event(), threading.Event()
+	scheduled = scheduler.submit('p', jobSchedulerModule.PRIORITY_SCHEDULED, 1, blocking_job(started, release))
+	assert started.wait(TIMEOUT)
+
+	self_healing = scheduler.submit('sh', jobSchedulerModule.PRIORITY_SELF_HEALING, 1, lambda job: 'sh')
+	assert self_healing.finished.wait(TIMEOUT) and self_healing.status == 'done'
+	assert scheduled.num_pauses == 1
+
+	release.set()
+	assert scheduled.finished.wait(TIMEOUT) and scheduled.status == 'done' and scheduled.num_pauses == 1
+
+
+def test_exclusive_jobs_never_overlap():
+	scheduler = jobSchedulerModule.JobScheduler(max_concurrency=2)
+	log = []
+	started_a, release_a = threading.Event(), threading.Event()
+	started_b, release_b = threading.Event(), threading.Event()
+	job_a = scheduler.submit('a', jobSchedulerModule.PRIORITY_SCHEDULED, 1, blocking_job(started_a, release_a, log, 'a'), exclusive='opendss')
+	assert started_a.wait(TIMEOUT) and not job_a.preemptible
+	job_b = scheduler.submit('b', jobSchedulerModule.PRIORITY_SELF_HEALING, 1, blocking_job(started_b, release_b, log, 'b'), exclusive='opendss')
+	job_c = scheduler.submit('c', jobSchedulerModule.PRIORITY_SCHEDULED, 1, lambda job: 'c')
+
+	# "c" takes the free slot, "b" waits for the resource and "a" is not paused
+	assert job_c.finished.wait(TIMEOUT) and job_c.status == 'done'
+	assert not started_b.wait(0.05) and job_b.status == 'queued' and job_a.num_pauses == 0
+
+	release_a.set()
+	assert started_b.wait(TIMEOUT)
+	release_b.set()
+	assert job_b.finished.wait(TIMEOUT) and log == ['a', 'b']
+
+
+def test_shutdown_cancels_preemptible_and_queued_jobs():
+	scheduler = jobSchedulerModule.JobScheduler(max_concurrency=2)
+	started_p, release_p = threading.Event(), threading.Event()
+	started_e, release_e = threading.Event(), threading.Event()
+	scheduled = scheduler.submit('p', jobSchedulerModule.PRIORITY_SCHEDULED, 1, blocking_job(started_p, release_p))
+	emergency = scheduler.submit('e', jobSchedulerModule.PRIORITY_EMERGENCY, 1, blocking_job(started_e, release_e))
+	queued = scheduler.submit('q', jobSchedulerModule.PRIORITY_EMERGENCY, 1, lambda job: 'q')
+	assert started_p.wait(TIMEOUT) and started_e.wait(TIMEOUT)
+
+	result = []
+	thread = threading.Thread(target=lambda: result.append(scheduler.shutdown(TIMEOUT)))
+	thread.start()
+	assert scheduled.finished.wait(TIMEOUT) and scheduled.status == 'cancelled'
+	assert queued.finished.wait(TIMEOUT) and queued.status == 'cancelled'
+	assert not emergency.finished.is_set()  # not preemptible: runs to the end
+
+	release_e.set()
+	thread.join(TIMEOUT)
+	assert result == [True] and emergency.status == 'done'
+	assert scheduler.submit('late', jobSchedulerModule.PRIORITY_SELF_HEALING, 1, lambda job: None).status == 'cancelled'
@@ -0,0 +1,69 @@
+import itertools
+import random
+import graphModule
+import spanningTreeSamplerModule
+
+
+'''
+Function to build a random multigraph (parallel edges and self-loops included) whose vertices are 0..n-1,
+possibly disconnected
+'''
+def random_multigraph(rng):
+	num_vertices = rng.randint(1, 6)
+	list_edges = []
+	for v in range(num_vertices):  # every vertex has an edge (vertices of the catalog are 0..n-1)
+		list_edges.append([rng.randrange(v), v, 1] if v > 0 and rng.random() < 0.8 else [v, v, 1])
+	for i in range(rng.randint(0, 6)):
+		list_edges.append([rng.randrange(num_vertices), rng.randrange(num_vertices), 1])
+	rng.shuffle(list_edges)
+	return list_edges
+
+
+'''
+Function to enumerate spanning forests by brute force: edge subsets with one edge per vertex not being the
+root of its connected component, and no cycle
+'''
+def brute_force_trees(edge_catalog):
+	edges = edge_catalog.edges
+	dsu = graphModule.DisjointSet(edge_catalog.num_vertices)
+	for edge in edges:
+		dsu.add_edge((edge[0], edge[1]))
+	num_tree_edges = edge_catalog.num_vertices - len(set(dsu.find(v) for v in range(edge_catalog.num_vertices)))
+
+	set_trees = set()
+	for combination in itertools.combinations(range(len(edges)), num_tree_edges):
+		forest = graphModule.DisjointSet(edge_catalog.num_vertices)
+		if all(forest.add_edge((edges[i][0], edges[i][1])) for i in combination):
+			set_trees.add(sum(1 << i for i in combination))
+	return set_trees
+
+
+def test_count_and_enumerate_match_brute_force():
+	rng = random.Random(1)
+	for case in range(300):
+		edge_catalog = graphModule.EdgeCatalog(random_multigraph(rng))
+		sampler = spanningTreeSamplerModule.SpanningTreeSampler(edge_catalog, seed=case)
+		set_expected = brute_force_trees(edge_catalog)
+
+		list_trees = sampler.enumerate()
+		assert len(list_trees) == len(set(list_trees))
+		assert set(list_trees) == set_expected
+		assert sampler.count() == len(set_expected)
+
+
+def test_enumerate_limit():
+	edge_catalog = graphModule.EdgeCatalog([[0, 1, 1], [1, 2, 1], [1, 2, 1], [2, 3, 1], [0, 3, 1], [0, 2, 1]])
+	sampler = spanningTreeSamplerModule.SpanningTreeSampler(edge_catalog, seed=0)
+	set_all = set(sampler.enumerate())
+	list_trees = sampler.enumerate(max_trees=3)
+	assert len(list_trees) == 3 and set(list_trees) <= set_all
+
+
+def test_samples_are_spanning_trees():
+	rng = random.Random(2)
+	for case in range(100):
+		edge_catalog = graphModule.EdgeCatalog(random_multigraph(rng))
+		sampler = spanningTreeSamplerModule.SpanningTreeSampler(edge_catalog, seed=case)
+		set_expected = brute_force_trees(edge_catalog)
+		for mode in ('biased', 'uniform'):
+			assert set(sampler.sample(5, mode)) <= set_expected
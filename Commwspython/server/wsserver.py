@@ -0,0 +1,224 @@
+from flask import Flask, jsonify, request
+import simuladorManobras
+import jobSchedulerModule
+import switchingAssessmentModule
+import threading
+import requests
+import networksData
+import os
+
+app = Flask(__name__)
+
+# Estados "quentes" das redes (dados das redes, motor de fluxo de carga, cache e processos de avaliação
+# paralela), por pasta de rede.
+# Cada estado é usado por uma simulação de cada vez; simulações simultâneas (ou pausadas) da mesma
+# rede usam estados distintos. Somente estados do motor 'numpy' são reaproveitados: o OpenDSS é um
+# objeto COM, único no processo e ligado à thread que o criou, de modo que cada simulação OpenDSS cria
+# seu estado na própria thread, e as simulações OpenDSS são executadas uma de cada vez, sem pausas.
+dict_network_states = {}  # pasta de rede ==> {'key': chave, 'livres': [estados]}
+lock_estados = threading.Lock()
+
+# Número de chaves operáveis de cada rede (estimativa de custo): pasta de rede ==> (hash do XML, número de chaves)
+dict_num_chaves = {}
+
+# Requisições de simulação em andamento (aguardadas na finalização do servidor)
+cond_requisicoes = threading.Condition()
+num_requisicoes = 0
+
+# Escalonador de simulações (concorrência, prioridades, controle de admissão e preempção)
+scheduler = jobSchedulerModule.JobScheduler(max_concurrency=1)
+
+
+'''
+	Função para obter (reservar) um estado da rede de uma simulação. O estado é carregado uma única vez
+	por pasta de rede, e recarregado somente se os arquivos da rede (DSS ou XML) forem alterados.
+	Estados do OpenDSS não são reaproveitados (ver dict_network_states).
+'''
+def get_network_state(dados_diretorios, dados_simulacao):
+	dss_files_folder = dados_diretorios['local_dss']
+	power_flow_engine = simuladorManobras.SM.get_power_flow_engine(dados_simulacao)
+	if not pooled_engine(power_flow_engine):
+		return simuladorManobras.NetworkState(dss_files_folder, power_flow_engine, dados_simulacao.get('conf_cache_fluxo_carga', {}))
+	key = simuladorManobras.NetworkState.state_key(dss_files_folder, power_flow_engine)
+
+	with lock_estados:
+		dict_pool = dict_network_states.get(key[0])
+		if dict_pool is None or dict_pool['key'] != key:
+			if dict_pool is not None:
+				for network_state in dict_pool['livres']: network_state.close()
+			dict_pool = {'key': key, 'livres': []}
+			dict_network_states[key[0]] = dict_pool
+		if len(dict_pool['livres']) > 0:
+			return dict_pool['livres'].pop()
+
+	return simuladorManobras.NetworkState(dss_files_folder, power_flow_engine, dados_simulacao.get('conf_cache_fluxo_carga', {}))
+
+
+'''
+	Função para liberar um estado da rede, após a simulação
+'''
+def release_network_state(network_state):
+	with lock_estados:
+		dict_pool = dict_network_states.get(network_state.key[0])
+		if pooled_engine(network_state.power_flow_engine) and dict_pool is not None and dict_pool['key'] == network_state.key:
+			dict_pool['livres'].append(network_state)
+		else:  # OpenDSS, ou arquivos da rede foram alterados
+			network_state.close()
+
+
+'''
+	Função para verificar se os estados de um motor de fluxo de carga podem ser reaproveitados entre
+	simulações (somente 'numpy'; o OpenDSS é usado se solicitado e disponível)
+'''
+def pooled_engine(power_flow_engine):
+	return switchingAssessmentModule.power_flow_engine_in_use(power_flow_engine) == "numpy"
+
+
+'''
+	Função para estimar o custo de uma simulação (controle de admissão): número de chaves operáveis
+	multiplicado pelo número de avaliações do AG de grafos (gerações x indivíduos). O número de chaves é
+	obtido somente dos dados da rede (XML ou sua cópia binária), sem carregar o motor de fluxo de carga, e
+	guardado enquanto o XML não for alterado.
+'''
+def estimate_cost(dados_diretorios, dados_simulacao):
+	dss_files_folder = dados_diretorios['local_dss']
+	networks_data = networksData.NetworksData(os.path.join(dss_files_folder, "..", ""))
+	xml_hash = networks_data.xml_file_hash()
+	folder = os.path.normcase(os.path.abspath(dss_files_folder))
+	with lock_estados:
+		item = dict_num_chaves.get(folder)
+	if item is None or item[0] != xml_hash:
+		item = (xml_hash, networks_data.num_operable_switches(xml_hash))
+		with lock_estados:
+			dict_num_chaves[folder] = item
+	num_switches = item[1]
+	dict_conf = dados_simulacao['conf_ag_grafo']
+	return num_switches * (int(dict_conf['num_geracoes']) + 1) * int(dict_conf['num_individuos'])
+
+
+'''
+	Função para definir a classe de prioridade de uma simulação
+'''
+def job_priority(self_healing, dados_simulacao):
+	if self_healing == 1:
+		return jobSchedulerModule.PRIORITY_SELF_HEALING
+	if dados_simulacao.get('tipo_simulacao', 'e').lower() == 'e':
+		return jobSchedulerModule.PRIORITY_EMERGENCY
+	return jobSchedulerModule.PRIORITY_SCHEDULED
+
+
+'''
+	Endpoint para executar uma simulação de manobras. Os dados têm o mesmo formato do arquivo
+	ParametrosExecucao.txt ('id', 'dados_diretorios', 'dados_isolacao_defeito', 'dados_simulacao'). Opcionais:
+		- 'id_plano' (1) e 'self_healing' (0: não, 1: sim)
+		- 'path_dat': pasta Dat; se informada, o retorno também é gravado em arquivos (como em main.py)
+		- 'path_chv_sem_manobra_anel': arquivo com chaves que não podem ser manobradas em anel
+		- 'url_retorno': endpoint para o qual o retorno é enviado (POST)
+	A simulação é executada pelo escalonador: self-healing tem prioridade sobre emergências, que têm
+	prioridade sobre simulações programadas (estas podem ser pausadas entre gerações do AG, exceto com o
+	OpenDSS, cujas simulações são executadas uma de cada vez).
+	Sintaxe da chamada:
+		requests.post('http://127.0.0.1:5010/novasimulacao', json=json_param)
+'''
+@app.route('/novasimulacao', methods=['POST'])
+def nova_simulacao():
+	global num_requisicoes
+	with cond_requisicoes:
+		num_requisicoes += 1
+	try:
+		return run_request()
+	finally:
+		with cond_requisicoes:
+			num_requisicoes -= 1
+			cond_requisicoes.notify_all()
+
+
+'''
+	Função para tratar uma requisição de simulação (ver nova_simulacao)
+'''
+def run_request():
+	json_param = request.get_json()
+	id_sm = int(json_param['id'])
+	id_plano = int(json_param.get('id_plano', 1))
+	self_healing = int(json_param.get('self_healing', 0))
+	path_dat = json_param.get('path_dat', '')
+
+	def run_simulation(job):
+		network_state = get_network_state(json_param['dados_diretorios'], json_param['dados_simulacao'])
+		try:
+			simulador = simuladorManobras.SM(json_param['dados_diretorios'], json_param['dados_isolacao_defeito'],
+			                                 json_param['dados_simulacao'], json_param.get('path_chv_sem_manobra_anel', ''),
+			                                 network_state)
+			simulador.run_simulator(self_healing, job.checkpoint)
+			if path_dat:
+				return simulador.return_response(path_dat, id_sm, id_plano, self_healing)
+			return simulador.build_return_data(id_sm, id_plano)
+		finally:
+			release_network_state(network_state)
+
+	try:
+		cost = estimate_cost(json_param['dados_diretorios'], json_param['dados_simulacao'])
+	except Exception as e:
+		return jsonify({'ID': id_sm, 'ID_PLANO': id_plano, 'STATUS': 'ERRO', 'COMMENT': 'Falha ao estimar custo: ' + str(e)}), 500
+	exclusive = None if pooled_engine(simuladorManobras.SM.get_power_flow_engine(json_param['dados_simulacao'])) else 'opendss'
+	job = scheduler.submit(id_sm, job_priority(self_healing, json_param['dados_simulacao']), cost, run_simulation, exclusive=exclusive)
+	job.finished.wait()
+	if job.status == 'rejected':
+		return jsonify({'ID': id_sm, 'ID_PLANO': id_plano, 'STATUS': 'REJEITADA', 'COMMENT': 'Capacidade do servidor excedida'}), 503
+	if job.status == 'cancelled':
+		return jsonify({'ID': id_sm, 'ID_PLANO': id_plano, 'STATUS': 'CANCELADA', 'COMMENT': 'Servidor em finalização'}), 503
+	if job.status == 'failed':
+		return jsonify({'ID': id_sm, 'ID_PLANO': id_plano, 'STATUS': 'ERRO', 'COMMENT': str(job.exception)}), 500
+	return_data = job.result
+
+	url_retorno = json_param.get('url_retorno', '')
+	if url_retorno:
+		requests.post(url_retorno, json=return_data)
+
+	return jsonify(return_data), 200
+
+
+'''
+	Endpoint para consultar a fila de simulações (tempos de espera e de execução de cada simulação)
+'''
+@app.route('/fila', methods=['GET'])
+def fila():
+	return jsonify(scheduler.statistics()), 200
+
+
+'''
+	Endpoint para finalizar o servidor. Novas simulações deixam de ser aceitas; simulações que não
+	iniciaram são canceladas, simulações programadas (em execução ou pausadas) são canceladas na próxima
+	geração do AG e as demais são concluídas. Todos os clientes recebem resposta, os caches de fluxo de
+	carga e os processos de avaliação paralela de todos os estados são fechados e o processo é encerrado.
+'''
+@app.route('/finalizar', methods=['GET'])
+def finalizar():
+	scheduler.shutdown()
+
+	# aguarda as respostas das demais requisições de simulação
+	with cond_requisicoes:
+		cond_requisicoes.wait_for(lambda: num_requisicoes == 0)
+
+	with lock_estados:
+		for dict_pool in dict_network_states.values():
+			for network_state in dict_pool['livres']: network_state.close()
+			dict_pool['livres'] = []
+		dict_network_states.clear()
+	threading.Timer(0.5, os._exit, (0,)).start()  # após enviar as respostas
+	return jsonify(scheduler.statistics()), 200
+
+
+'''
+	Função para iniciar o servidor. Parâmetros do escalonador: número máximo de simulações simultâneas,
+	custo máximo de uma simulação e custo máximo das simulações em espera (None: sem limite)
+'''
+def run(port=5010, max_concurrency=1, max_job_cost=None, max_queued_cost=None):
+	scheduler.max_concurrency = max_concurrency
+	scheduler.max_job_cost = max_job_cost
+	scheduler.max_queued_cost = max_queued_cost
+	app.run(port=port, threaded=True)
+
+
+if __name__ == '__main__':
+	run()